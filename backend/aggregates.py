@@ -0,0 +1,62 @@
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger("spendsense.aggregates")
+
+# Rollup rows are keyed by (uid, month, category, txn_type) with '' standing in
+# for a NULL category, since primary key columns cannot be NULL. Only Credit
+# and Debit rows are rolled up; no endpoint reads any other txn_type.
+_ROLLUP_SELECT = """
+    SELECT uid, date_trunc('month', created_at)::date, COALESCE(category, ''), txn_type,
+           SUM(amount), COUNT(*)
+    FROM sms_records
+    WHERE txn_type IN ('Credit', 'Debit') AND created_at IS NOT NULL {where}
+    GROUP BY 1, 2, 3, 4
+"""
+
+
+_APPLY_INSERTED = (
+    """INSERT INTO sms_monthly_aggregates AS agg (uid, month, category, txn_type, total, txn_count)"""
+    + _ROLLUP_SELECT.format(where="AND uid = {uid} AND sms_hash = ANY({hashes})")
+    + """ON CONFLICT (uid, month, category, txn_type) DO UPDATE SET
+        total = COALESCE(agg.total + EXCLUDED.total, agg.total, EXCLUDED.total),
+        txn_count = agg.txn_count + EXCLUDED.txn_count"""
+)
+
+
+def apply_inserted_records(cur, uid: str, sms_hashes: List[str]) -> None:
+    """Adds freshly inserted sms_records rows to the monthly rollup.
+
+    Call on the same cursor, before the commit that inserted the rows, so
+    the rollup and the raw rows change atomically.
+    """
+    if not sms_hashes:
+        return
+    cur.execute(_APPLY_INSERTED.format(uid="%s", hashes="%s"), (uid, sms_hashes))
+
+
+async def apply_inserted_records_async(conn, uid: str, sms_hashes: List[str]) -> None:
+    """``apply_inserted_records`` for an asyncpg connection inside a transaction."""
+    if not sms_hashes:
+        return
+    await conn.execute(_APPLY_INSERTED.format(uid="$1", hashes="$2::bpchar[]"), uid, sms_hashes)
+
+
+def rebuild(cur, uid: Optional[str] = None) -> int:
+    """Recomputes the rollup from sms_records for one user or everyone."""
+    # Hold off concurrent ingestion so no insert lands between DELETE and INSERT.
+    cur.execute("LOCK TABLE sms_records IN SHARE MODE")
+    if uid is None:
+        cur.execute("DELETE FROM sms_monthly_aggregates")
+        cur.execute(
+            "INSERT INTO sms_monthly_aggregates (uid, month, category, txn_type, total, txn_count)"
+            + _ROLLUP_SELECT.format(where="")
+        )
+    else:
+        cur.execute("DELETE FROM sms_monthly_aggregates WHERE uid = %s", (uid,))
+        cur.execute(
+            "INSERT INTO sms_monthly_aggregates (uid, month, category, txn_type, total, txn_count)"
+            + _ROLLUP_SELECT.format(where="AND uid = %s"),
+            (uid,),
+        )
+    return cur.rowcount
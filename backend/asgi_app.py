@@ -0,0 +1,233 @@
+"""Async (ASGI) serving mode for the SpendSense API.
+
+``POST /api/predictions-bulk`` and ``POST /api/bills/parse`` run as async
+handlers on aiohttp and asyncpg, so a request waiting on the LLM holds no
+worker thread and no database connection. Every other route is the
+unchanged Flask app, mounted through a bounded WSGI thread pool.
+
+Run from the ``backend`` directory:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+``asgi_app:flask_app`` serves the all-sync Flask app on the same server and
+thread pool, for side-by-side comparisons.
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import aiohttp
+import asyncpg
+from a2wsgi import WSGIMiddleware
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+import aggregates
+import categorizer_API as api
+from bulk_write import bulk_insert_async
+from database import DB_CONFIG
+from ingest import SMS_RECORD_COLUMNS, IngestBatch, existing_hashes_async
+from llm_extraction import (
+    HF_API_URL,
+    LLM_CONCURRENCY,
+    LLM_TIMEOUT,
+    query_llm_bulk_async,
+)
+from jobs import accepted_body, enqueue_ingest_async, wants_job
+from json_provider import dumps_bytes
+from response_cache import invalidate_uid
+from validation import bill_parse_schema, bulk_prediction_schema, validate_payload
+
+load_dotenv()
+
+logger = logging.getLogger("spendsense.asgi")
+
+# === Config ===
+ASYNC_DB_POOL_MIN = int(os.getenv("ASYNC_DB_POOL_MIN", "1"))
+ASYNC_DB_POOL_MAX = int(os.getenv("ASYNC_DB_POOL_MAX", "10"))
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", "100"))
+WSGI_THREADS = int(os.getenv("WSGI_THREADS", "10"))
+
+SMS_RECORD_TYPES = (
+    "varchar", "text", "varchar", "numeric", "varchar", "varchar", "varchar",
+    "varchar", "timestamp", "numeric", "varchar", "timestamp", "bpchar",
+)
+BILL_TYPES = (
+    "varchar", "varchar", "varchar", "date", "numeric", "varchar", "varchar", "text",
+    "timestamp", "timestamp",
+)
+
+DB_ERRORS = (asyncpg.PostgresError, asyncpg.InterfaceError, OSError)
+
+
+# === Helpers ===
+class OrjsonResponse(JSONResponse):
+    """JSONResponse rendered like the Flask app's ``OrjsonProvider``."""
+
+    def render(self, content) -> bytes:
+        return dumps_bytes(content)
+
+
+def json_response(body, status: int = 200, headers=None) -> JSONResponse:
+    """JSON response carrying the same security headers as the Flask app."""
+    return OrjsonResponse(body, status_code=status, headers={**api.SECURITY_HEADERS, **(headers or {})})
+
+
+async def read_json(request):
+    """Returns the parsed JSON body, or None if it is missing or malformed."""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def predict_bill_category_async(session, text, sender) -> str:
+    """``predict_bill_category`` over the shared aiohttp session."""
+    headers, payload = api.build_bill_category_request(text, sender)
+    try:
+        async with session.post(HF_API_URL, headers=headers, json=payload) as response:
+            body = await response.json(content_type=None) if response.status == 200 else None
+            return api.bill_category_from_response(response.status, body)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        logger.error(f"Bill category request failed: {e}")
+        return "Other"
+
+
+# === Async Routes ===
+async def predict_bulk(request):
+    """Async twin of ``categorizer_API.predict_bulk``."""
+    data = await read_json(request) or {}
+    errors = validate_payload(data, bulk_prediction_schema)
+    if errors:
+        return json_response({"status": "error", "message": errors}, 400)
+
+    uid = data.get("uid")
+    messages = data.get("messages", [])
+    db = request.app.state.db
+    timestamp = datetime.utcnow()
+
+    try:
+        if wants_job(request.query_params, len(messages)):
+            job_id = await enqueue_ingest_async(db, uid, messages)
+            body = accepted_body(job_id, len(messages))
+            return json_response(body, 202, {"Location": body["status_url"]})
+
+        # Same steps as ingest.ingest_messages, with the LLM fan-out on the
+        # event loop. Embedding, the parse cache and sender templates are CPU
+        # work or sync Postgres calls, so they run in a thread.
+        batch = IngestBatch(uid, messages, timestamp)
+        batch.skip_existing(await existing_hashes_async(db, uid, list(batch.candidates)))
+        texts = await asyncio.to_thread(batch.resolve)
+        llm_results = await query_llm_bulk_async(request.app.state.session, texts)
+        insert_values = await asyncio.to_thread(batch.finish, llm_results)
+
+        inserted = []
+        if insert_values:
+            async with db.acquire() as conn:
+                async with conn.transaction():
+                    inserted = await bulk_insert_async(
+                        conn,
+                        "sms_records",
+                        SMS_RECORD_COLUMNS,
+                        SMS_RECORD_TYPES,
+                        insert_values,
+                        on_conflict="ON CONFLICT (uid, sms_hash) DO NOTHING",
+                        returning=("sms_hash",),
+                    )
+                    await aggregates.apply_inserted_records_async(conn, uid, [row[0] for row in inserted])
+            if inserted:
+                await asyncio.to_thread(invalidate_uid, uid)
+
+        return json_response(batch.body([row[0] for row in inserted]), 200)
+    except DB_ERRORS as e:
+        logger.error(f"Database error in predict_bulk: {e}")
+        return json_response({"status": "error", "message": "Database error"}, 500)
+
+
+async def parse_bills_from_sms(request):
+    """Async twin of ``categorizer_API.parse_bills_from_sms``."""
+    data = await read_json(request)
+    if data is None:
+        return json_response({
+            "status": "error",
+            "message": "The browser (or proxy) sent a request that this server could not understand."
+        }, 400)
+    errors = validate_payload(data, bill_parse_schema)
+    if errors:
+        return json_response({"status": "error", "message": errors}, 400)
+
+    uid = data["uid"]
+    session = request.app.state.session
+
+    try:
+        found = api.find_bills(data["messages"])
+        categories = await asyncio.gather(
+            *(predict_bill_category_async(session, body, sender) for body, sender, _, _ in found)
+        )
+        bill_values = api.build_bill_rows(uid, found, categories)
+        now = datetime.utcnow()
+        inserted = []
+        if bill_values:
+            async with request.app.state.db.acquire() as conn:
+                inserted = await bulk_insert_async(
+                    conn,
+                    "bills",
+                    api.BILL_COLUMNS,
+                    BILL_TYPES,
+                    [row + (now, now) for row in bill_values],
+                    returning=("id",),
+                )
+            await asyncio.to_thread(invalidate_uid, uid)
+
+        new_bills = [api.bill_response_entry(row[0], values) for row, values in zip(inserted, bill_values)]
+        return json_response({"parsed_bills": new_bills})
+    except DB_ERRORS + (ValueError,) as e:
+        logger.error(f"Error in parse_bills_from_sms: {e}")
+        return json_response({"status": "error", "message": "Error parsing bills"}, 500)
+
+
+# === App ===
+@asynccontextmanager
+async def lifespan(app):
+    app.state.db = await asyncpg.create_pool(
+        host=DB_CONFIG["host"],
+        port=int(DB_CONFIG["port"]),
+        database=DB_CONFIG["dbname"],
+        user=DB_CONFIG["user"],
+        password=DB_CONFIG["password"],
+        min_size=ASYNC_DB_POOL_MIN,
+        max_size=ASYNC_DB_POOL_MAX,
+    )
+    app.state.session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=ASYNC_HTTP_MAX_CONNECTIONS),
+        timeout=aiohttp.ClientTimeout(total=LLM_TIMEOUT),
+    )
+    logger.info(f"✅ Async pools ready (db max={ASYNC_DB_POOL_MAX}, llm concurrency={LLM_CONCURRENCY})")
+    try:
+        yield
+    finally:
+        await app.state.session.close()
+        await app.state.db.close()
+
+
+if api.CORS_ORIGINS:
+    _cors = Middleware(CORSMiddleware, allow_origins=api.CORS_ORIGINS, allow_methods=["*"], allow_headers=["*"])
+else:
+    _cors = Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+flask_app = WSGIMiddleware(api.app, workers=WSGI_THREADS)
+
+app = Starlette(
+    routes=[
+        Route("/api/predictions-bulk", predict_bulk, methods=["POST"]),
+        Route("/api/bills/parse", parse_bills_from_sms, methods=["POST"]),
+        Mount("/", app=flask_app),
+    ],
+    middleware=[_cors],
+    lifespan=lifespan,
+)
@@ -0,0 +1,86 @@
+"""Rows/sec for the three sms_records insert strategies against local Postgres.
+
+Uses the DB_* settings from the environment, loads a temp copy of
+``sms_records`` with rows built from ``categorized_sms.csv`` and times
+``executemany``, ``execute_values`` and ``COPY FROM STDIN`` via
+``bulk_write.bulk_insert``.
+
+Run from the ``backend`` directory:
+    python -m benchmarks.bench_bulk_insert [--rows 5000] [--chunk 1000]
+"""
+import argparse
+import time
+from datetime import datetime
+
+import psycopg2
+
+from benchmarks.bench_regex_parser import DEFAULT_CSV, load_messages
+from bulk_write import STRATEGIES, bulk_insert
+from database import DB_CONFIG, init_db
+from sms_regex import parse_sms_with_regex
+
+COLUMNS = (
+    "uid", "sms", "category", "amount", "txn_type", "mode", "ref_no",
+    "account", "date", "balance", "sender", "created_at",
+)
+
+
+def build_rows(count: int):
+    """Builds ``count`` sms_records rows by cycling the CSV messages."""
+    messages = load_messages(DEFAULT_CSV)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        sms = messages[i % len(messages)]
+        parsed = parse_sms_with_regex(sms)
+        rows.append((
+            f"bench-{i % 50}",
+            sms,
+            parsed["category"],
+            float(parsed["amount"]) if parsed.get("amount") else None,
+            parsed["txn_type"],
+            parsed["mode"],
+            (parsed["ref_no"] or "")[:100] or None,
+            parsed["account"],
+            None,
+            None,
+            "VM-BENCH",
+            now,
+        ))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--chunk", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    init_db()
+    rows = build_rows(args.rows)
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    cur.execute("CREATE TEMP TABLE bench_sms_records (LIKE sms_records INCLUDING DEFAULTS)")
+    conn.commit()
+
+    print(f"📦 Rows per run: {len(rows)} (chunk {args.chunk})")
+    for strategy in STRATEGIES:
+        best = float("inf")
+        for _ in range(args.repeat):
+            cur.execute("TRUNCATE bench_sms_records")
+            conn.commit()
+            start = time.perf_counter()
+            bulk_insert(cur, "bench_sms_records", COLUMNS, rows, strategy=strategy, chunk_size=args.chunk)
+            conn.commit()
+            best = min(best, time.perf_counter() - start)
+        cur.execute("SELECT COUNT(*) FROM bench_sms_records")
+        assert cur.fetchone()[0] == len(rows)
+        print(f"• {strategy:<12} {len(rows) / best:>12,.0f} rows/s ({best:.3f}s)")
+
+    cur.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
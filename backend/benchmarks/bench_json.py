@@ -0,0 +1,106 @@
+"""Benchmark for serializing a ``/records/<uid>`` page.
+
+Builds a synthetic page of rows shaped like the ``sms_records`` SELECT
+(Decimal amounts, date and datetime columns) and times two paths. The old
+one converts every value with ``json_safe`` and serializes with Flask's
+default provider. The new one hands the raw rows to ``OrjsonProvider``.
+Both response bodies must decode to the same JSON.
+
+Run from the ``backend`` directory:
+    python -m benchmarks.bench_json [--rows 200] [--repeat 200]
+"""
+import argparse
+import json
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from json_provider import OrjsonProvider
+
+
+def json_safe(val):
+    """The per-value conversion the records view used to run, kept as the baseline."""
+    if isinstance(val, Decimal):
+        return float(val)
+    if isinstance(val, (datetime, date)):
+        return val.isoformat()
+    return val
+
+
+def build_rows(count: int) -> List[Dict[str, Any]]:
+    """Builds rows with the records endpoint's columns and value types."""
+    start = datetime(2024, 11, 5, 9, 30, 12, 345678)
+    return [
+        {
+            "id": 100000 + i,
+            "uid": "bench-user",
+            "sms": f"Rs.{100 + i}.00 debited from A/c XX1234 on 05-11-24 to VPA shop{i}@upi. UPI Ref {i:012d}",
+            "category": ("Food", "Shopping", "Bills", "Travel")[i % 4],
+            "amount": Decimal(f"{100 + i}.50"),
+            "txn_type": "Debit" if i % 3 else "Credit",
+            "mode": "UPI",
+            "ref_no": f"{i:012d}",
+            "account": "1234",
+            "date": (start - timedelta(days=i)).date(),
+            "balance": Decimal(f"{50000 - i * 7}.25") if i % 5 else None,
+            "created_at": start - timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+
+def old_body(app: Flask, rows) -> bytes:
+    data = [{k: json_safe(v) for k, v in row.items()} for row in rows]
+    page = {"status": "success", "count": len(data), "limit": len(rows), "next_cursor": None, "data": data}
+    return app.json.response(page).get_data()
+
+
+def new_body(app: Flask, rows) -> bytes:
+    page = {"status": "success", "count": len(rows), "limit": len(rows), "next_cursor": None, "data": rows}
+    return app.json.response(page).get_data()
+
+
+def measure(build, app: Flask, rows, repeat: int) -> float:
+    """Returns the best wall time in seconds over ``repeat`` serializations."""
+    best = float("inf")
+    with app.app_context():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            build(app, rows)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows)
+    stdlib_app = Flask("bench_stdlib")
+    stdlib_app.json = DefaultJSONProvider(stdlib_app)
+    orjson_app = Flask("bench_orjson")
+    orjson_app.json = OrjsonProvider(orjson_app)
+
+    with stdlib_app.app_context():
+        expected = json.loads(old_body(stdlib_app, rows))
+    with orjson_app.app_context():
+        got = json.loads(new_body(orjson_app, rows))
+    if expected != got:
+        raise SystemExit("❌ The two paths produced different JSON")
+
+    before = measure(old_body, stdlib_app, rows, args.repeat)
+    after = measure(new_body, orjson_app, rows, args.repeat)
+    print(f"📄 Page of {args.rows} rows (outputs identical)")
+    print(f"🐢 Before (json_safe + stdlib provider): {before * 1000:.3f} ms")
+    print(f"🚀 After (orjson provider): {after * 1000:.3f} ms")
+    print(f"📈 Speed-up: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
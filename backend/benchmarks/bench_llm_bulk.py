@@ -0,0 +1,62 @@
+"""Sequential vs concurrent LLM extraction against the stub endpoint.
+
+Starts ``stub_llm_server`` in-process, then times one-by-one
+``extract_transaction_details_with_llm`` calls against
+``extract_transaction_details_bulk`` on the same messages, and shows how many
+messages fell back to regex under a tight time budget.
+
+Run from the ``backend`` directory:
+    python -m benchmarks.bench_llm_bulk [--messages 100] [--delay 0.2] [--budget 1.0]
+"""
+import argparse
+import os
+import time
+
+from benchmarks.bench_regex_parser import DEFAULT_CSV, load_messages
+from benchmarks.stub_llm_server import start_stub_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--delay", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds for the capped run")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(delay=args.delay)
+    os.environ["HF_API_URL"] = url
+    os.environ.setdefault("HF_API_KEY", "stub")
+
+    import llm_extraction  # configured from the environment set above
+
+    messages = load_messages(DEFAULT_CSV)[: args.messages]
+
+    start = time.perf_counter()
+    for sms in messages:
+        llm_extraction.extract_transaction_details_with_llm(sms)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = llm_extraction.extract_transaction_details_bulk(
+        messages, concurrency=args.concurrency
+    )
+    concurrent = time.perf_counter() - start
+    assert len(results) == len(messages)
+
+    start = time.perf_counter()
+    budgeted = llm_extraction.extract_transaction_details_bulk(
+        messages, concurrency=args.concurrency, time_budget=args.budget
+    )
+    capped = time.perf_counter() - start
+    from_llm = sum(1 for r in budgeted if r.get("vendor") == "Stub Merchant")
+
+    server.shutdown()
+    print(f"📨 Messages: {len(messages)} (stub delay {args.delay}s)")
+    print(f"🐢 Sequential: {sequential:.2f}s")
+    print(f"🚀 Concurrent x{args.concurrency}: {concurrent:.2f}s")
+    print(f"⏱️  Budget {args.budget}s: {capped:.2f}s, {from_llm} via LLM, {len(messages) - from_llm} via regex")
+
+
+if __name__ == "__main__":
+    main()
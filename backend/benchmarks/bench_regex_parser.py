@@ -0,0 +1,125 @@
+"""Microbenchmark for the regex SMS parser.
+
+Compares the legacy chain of per-field ``re.search`` calls with the compiled
+single-pass scanner in ``sms_regex`` on ``categorized_sms.csv`` and checks
+that both produce identical dicts.
+
+Run from the ``backend`` directory:
+    python -m benchmarks.bench_regex_parser [--repeat 20]
+"""
+import argparse
+import ast
+import csv
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+from sms_regex import parse_sms_with_regex
+
+# === CONFIGURATION ===
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CSV = os.path.join(BACKEND_DIR, "categorized_sms.csv")
+
+
+def legacy_parse_sms_with_regex(sms: str) -> Dict[str, Optional[str]]:
+    """The original per-message regex chain, kept as the baseline."""
+    if not sms:
+        return {}
+    data = {
+        "amount": None,
+        "txn_type": None,
+        "mode": None,
+        "ref_no": None,
+        "account": None,
+        "date": None,
+        "balance": None,
+        "vendor": None,
+        "category": "Other",
+    }
+    amount_match = re.search(r"(?i)(?:INR|Rs\.?|₹)\s*([\d,]+\.?\d*)", sms)
+    if amount_match:
+        data["amount"] = amount_match.group(1).replace(",", "")
+    ref_match = re.search(
+        r"(?i)(?:Ref(?:erence)?(?:\s*No)?\.?)\s*[:\-]?\s*([A-Za-z0-9\-_/]+)", sms
+    )
+    if ref_match:
+        data["ref_no"] = ref_match.group(1)
+    account_match = re.search(r"(?i)(?:A/c(?:\s*XX)?\s*)(\d+)", sms)
+    if account_match:
+        data["account"] = account_match.group(1)
+    date_match = re.search(
+        r"(\d{1,2}[-/][A-Za-z]{3}[-/]\d{2,4}|\d{1,2}[-/]\d{1,2}[-/]\d{2,4})", sms
+    )
+    if date_match:
+        data["date"] = date_match.group(1)
+    balance_match = re.search(
+        r"(?i)(?:Avl Bal|balance)[\s:]*[₹Rs\.]*\s*([\d,]+\.?\d*)", sms
+    )
+    if balance_match:
+        data["balance"] = balance_match.group(1).replace(",", "")
+    if re.search(r"(?i)\b(debited?|spent|withdrawn|deducted|purchas(?:e|ed))\b", sms):
+        data["txn_type"] = "Debit"
+    elif re.search(r"(?i)\b(credited?|received|deposited|refunded?)\b", sms):
+        data["txn_type"] = "Credit"
+    if re.search(r"(?i)\b(UPI|GPay|PhonePe|Paytm)\b", sms):
+        data["mode"] = "UPI"
+    elif re.search(r"(?i)\b(ATM|Cash)\b", sms):
+        data["mode"] = "ATM"
+    elif re.search(r"(?i)\b(NEFT|IMPS|RTGS|Net\s*Banking)\b", sms):
+        data["mode"] = "NetBanking"
+    return data
+
+
+def load_messages(path: str) -> List[str]:
+    """Loads SMS bodies from the exported CSV (``{'message': ...}`` cells)."""
+    messages = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            raw = row.get("sms") or ""
+            try:
+                value = ast.literal_eval(raw)
+                raw = value.get("message", "") if isinstance(value, dict) else str(value)
+            except (ValueError, SyntaxError):
+                pass
+            if raw:
+                messages.append(raw)
+    return messages
+
+
+def measure(parse, messages: List[str], repeat: int) -> float:
+    """Returns the best messages/sec over ``repeat`` passes."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for sms in messages:
+            parse(sms)
+        best = min(best, time.perf_counter() - start)
+    return len(messages) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    messages = load_messages(args.csv)
+    mismatches = [
+        sms for sms in messages
+        if legacy_parse_sms_with_regex(sms) != parse_sms_with_regex(sms)
+    ]
+    if mismatches:
+        raise SystemExit(f"❌ {len(mismatches)} messages parsed differently, e.g.: {mismatches[0]!r}")
+
+    before = measure(legacy_parse_sms_with_regex, messages, args.repeat)
+    after = measure(parse_sms_with_regex, messages, args.repeat)
+
+    print(f"📨 Messages: {len(messages)} (outputs identical)")
+    print(f"🐢 Before (re.search chain): {before:,.0f} msg/s")
+    print(f"🚀 After (compiled scanner): {after:,.0f} msg/s")
+    print(f"📈 Speed-up: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Requests/sec and latency of the sync (WSGI) and async (ASGI) serving modes.
+
+Starts ``stub_llm_server`` with a fixed delay in a subprocess, then serves
+the API with uvicorn twice, also in a subprocess: once as ``asgi_app:flask_app``
+(the plain Flask app behind a bounded WSGI thread pool, standing in for a
+threaded WSGI server) and once as ``asgi_app:app``. Each mode gets the same
+closed-loop load of ``/api/predictions-bulk`` and ``/api/bills/parse``
+requests. Messages and senders are unique per run so the parse cache and
+template learner never short-circuit the LLM.
+
+Needs the DB_* settings for a reachable Postgres. Run from the ``backend``
+directory:
+    python -m benchmarks.bench_serving_modes [--requests 200] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"nothing listening on port {port} after {timeout}s")
+
+
+def spawn(args, port: int, env) -> subprocess.Popen:
+    """Starts ``python -m <args>`` and waits until it listens on ``port``."""
+    proc = subprocess.Popen([sys.executable, "-m", *args], env=env)
+    try:
+        wait_for_port(port)
+    except RuntimeError:
+        proc.kill()
+        raise
+    return proc
+
+
+def build_payload(endpoint: str, run: str, i: int, per_request: int):
+    """Builds one request body with messages no earlier request has sent."""
+    uid = f"bench-{run}-{i % 20}"
+    if endpoint == "predictions":
+        return "/api/predictions-bulk", {
+            "uid": uid,
+            "messages": [
+                {
+                    "sms": f"Rs.{100 + j}.00 debited from A/c XX{i % 10000:04d} on 05-11-24 "
+                           f"to VPA shop{j}@upi. UPI Ref {run}{i:06d}{j:02d}.",
+                    "sender": f"VM-{run[:4].upper()}{i:05d}{j:02d}",
+                }
+                for j in range(per_request)
+            ],
+        }
+    return "/api/bills/parse", {
+        "uid": uid,
+        "messages": [
+            {
+                "body": f"Your bill {run}{i:06d}{j:02d} of {200 + j} INR is due on 15-11-2026.",
+                "sender": f"VM-BILL{i:05d}{j:02d}",
+            }
+            for j in range(per_request)
+        ],
+    }
+
+
+async def run_load(base_url: str, endpoint: str, requests: int, concurrency: int, per_request: int):
+    """Closed-loop load: ``concurrency`` clients issue ``requests`` in total."""
+    import aiohttp
+
+    run = uuid.uuid4().hex[:8]
+    latencies, failures = [], 0
+    counter = iter(range(requests))
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=120)
+
+    async with aiohttp.ClientSession(base_url, connector=connector, timeout=timeout) as session:
+        async def worker():
+            nonlocal failures
+            for i in counter:
+                path, body = build_payload(endpoint, run, i, per_request)
+                start = time.perf_counter()
+                async with session.post(path, json=body) as resp:
+                    await resp.read()
+                    if resp.status != 200:
+                        failures += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=5, help="messages per request")
+    parser.add_argument("--delay", type=float, default=0.2, help="stub LLM latency in seconds")
+    parser.add_argument("--threads", type=int, default=10, help="worker threads for the sync mode")
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    env = {
+        **os.environ,
+        "HF_API_URL": f"http://127.0.0.1:{stub_port}/",
+        "HF_API_KEY": os.environ.get("HF_API_KEY", "stub"),
+        "WSGI_THREADS": str(args.threads),
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "CRITICAL"),
+    }
+    stub = spawn(["benchmarks.stub_llm_server", "--port", str(stub_port), "--delay", str(args.delay)], stub_port, env)
+
+    modes = {
+        f"sync  (WSGI x{args.threads} threads)": "asgi_app:flask_app",
+        "async (ASGI)": "asgi_app:app",
+    }
+    print(
+        f"📨 {args.requests} requests x {args.messages} messages, "
+        f"{args.concurrency} concurrent clients, stub delay {args.delay}s"
+    )
+    try:
+        for label, target in modes.items():
+            port = free_port()
+            server = spawn(["uvicorn", target, "--port", str(port), "--log-level", "warning"], port, env)
+            try:
+                for endpoint in ("predictions", "bills"):
+                    stats = asyncio.run(
+                        run_load(f"http://127.0.0.1:{port}", endpoint, args.requests, args.concurrency, args.messages)
+                    )
+                    print(
+                        f"• {label:<26} {endpoint:<12} {stats['rps']:>8.1f} req/s  "
+                        f"p50 {stats['p50'] * 1000:>7.0f} ms  p99 {stats['p99'] * 1000:>7.0f} ms  "
+                        f"failures {stats['failures']}"
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark for request validation on the hot endpoints.
+
+Validates synthetic ``/predictions-bulk`` and ``/bills/parse`` payloads of
+10, 1k and 10k messages with a fresh ``cerberus.Validator`` per call (the
+previous ``validate_payload``) and with the compiled checkers in
+``validation``. Before timing, both must return identical errors on valid
+payloads and on payloads with malformed messages mixed in.
+
+Run from the ``backend`` directory:
+    python -m benchmarks.bench_validation [--repeat 5]
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from cerberus import Validator
+
+from validation import (
+    bill_parse_schema,
+    budget_schema,
+    bulk_prediction_schema,
+    update_budget_schema,
+    validate_payload,
+)
+
+SIZES = (10, 1_000, 10_000)
+
+
+def cerberus_validate(payload, schema):
+    """The original ``validate_payload``, kept as the baseline."""
+    v = Validator(schema)
+    if not v.validate(payload):
+        return v.errors
+    return None
+
+
+def build_payload(text_key: str, size: int, bad_every: int = 0, seed: int = 0) -> Dict[str, Any]:
+    """Builds a payload; every ``bad_every``-th message is malformed in a random way."""
+    rng = random.Random(seed)
+    broken = [
+        lambda m: m.pop(text_key),
+        lambda m: m.update(sender=None),
+        lambda m: m.update({text_key: 42}),
+        lambda m: m.update(extra="x"),
+        lambda m: m.clear(),
+    ]
+    messages: List[Any] = []
+    for i in range(size):
+        msg = {
+            text_key: f"Rs.{100 + i}.00 debited from A/c XX1234 on 05-11-24. UPI Ref {i:08d}",
+            "sender": f"VM-BANK{i % 50:02d}",
+        }
+        if bad_every and i % bad_every == 0:
+            if rng.random() < 0.2:
+                msg = rng.choice([None, "text", 7])
+            else:
+                rng.choice(broken)(msg)
+        messages.append(msg)
+    return {"uid": "bench-user", "messages": messages}
+
+
+def check_equivalence() -> int:
+    """Compares both validators on a spread of payloads; returns the number checked."""
+    cases = [
+        ({}, bulk_prediction_schema),
+        ({"uid": None, "messages": None}, bulk_prediction_schema),
+        ({"uid": 1, "messages": "x", "foo": 1}, bulk_prediction_schema),
+        ({"uid": "u", "name": "n", "cap": True, "currency": "c", "period": "p"}, budget_schema),
+        ({"uid": "u", "name": "n", "cap": "1", "currency": "c"}, budget_schema),
+        ({"cap": None, 1: 2}, update_budget_schema),
+    ]
+    for seed in range(20):
+        cases.append((build_payload("sms", 200, bad_every=7, seed=seed), bulk_prediction_schema))
+        cases.append((build_payload("body", 200, bad_every=9, seed=seed), bill_parse_schema))
+    for payload, schema in cases:
+        expected, got = cerberus_validate(payload, schema), validate_payload(payload, schema)
+        if expected != got:
+            raise SystemExit(f"❌ Errors differ for {payload!r:.200}:\n  cerberus {expected}\n  compiled {got}")
+    return len(cases)
+
+
+def measure(validate, payload, schema, repeat: int) -> float:
+    """Returns the best wall time in seconds over ``repeat`` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        validate(payload, schema)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"✅ {check_equivalence()} payloads validated identically")
+    for name, schema, text_key in (
+        ("predictions-bulk", bulk_prediction_schema, "sms"),
+        ("bills/parse", bill_parse_schema, "body"),
+    ):
+        for size in SIZES:
+            payload = build_payload(text_key, size)
+            before = measure(cerberus_validate, payload, schema, args.repeat)
+            after = measure(validate_payload, payload, schema, args.repeat)
+            print(
+                f"• {name:<17} {size:>6} msgs  cerberus {before * 1000:>9.2f} ms  "
+                f"compiled {after * 1000:>8.3f} ms  ({before / after:,.0f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Startup time and per-worker memory of the API under gunicorn.
+
+Serves ``categorizer_API:app`` with ``gunicorn.conf.py`` four ways: with and
+without ``preload_app``, and with model arrays memory-mapped or copied
+(``MODEL_MMAP``). Startup is the time from launch until every worker has
+answered ``/api/models/stats``. Memory is read from
+``/proc/<pid>/smaps_rollup`` for the master and each worker. RSS counts
+shared pages in full. PSS splits them between the processes sharing them.
+USS is the memory private to one process. Total PSS is what the whole
+server really costs.
+
+Needs gunicorn, Linux and the DB_* settings for a reachable Postgres (the
+app runs init_db on import). Run from the ``backend`` directory:
+    python -m benchmarks.bench_worker_memory [--workers 4]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.bench_serving_modes import free_port, wait_for_port
+
+CONFIGS = {
+    "preload + mmap": {"GUNICORN_PRELOAD": "true", "MODEL_MMAP": "true"},
+    "preload": {"GUNICORN_PRELOAD": "true", "MODEL_MMAP": "false"},
+    "per-worker + mmap": {"GUNICORN_PRELOAD": "false", "MODEL_MMAP": "true"},
+    "per-worker": {"GUNICORN_PRELOAD": "false", "MODEL_MMAP": "false"},
+}
+
+
+def memory_kb(pid: int):
+    """(rss, pss, uss) in kB from smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields["Rss"], fields["Pss"], fields["Private_Clean"] + fields["Private_Dirty"]
+
+
+def children(pid: int):
+    """Pids whose parent is ``pid``."""
+    found = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after ')'.
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            found.append(int(entry))
+    return found
+
+
+def wait_for_workers(port: int, workers: int, timeout: float = 120) -> set:
+    """Polls /api/models/stats until ``workers`` distinct pids have answered."""
+    seen = set()
+    deadline = time.monotonic() + timeout
+    while len(seen) < workers and time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/models/stats", timeout=5) as resp:
+                seen.add(json.loads(resp.read())["data"]["pid"])
+        except OSError:
+            time.sleep(0.05)
+    return seen
+
+
+def measure(label: str, overrides: dict, workers: int, env: dict):
+    port = free_port()
+    env = {
+        **env,
+        **overrides,
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_WORKERS": str(workers),
+    }
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "categorizer_API:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port, timeout=120)
+        seen = wait_for_workers(port, workers)
+        startup = time.perf_counter() - start
+        if len(seen) < workers:
+            print(f"⚠️ {label}: only {len(seen)}/{workers} workers answered")
+        master = memory_kb(proc.pid)
+        per_worker = [memory_kb(pid) for pid in children(proc.pid)]
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    n = len(per_worker) or 1
+    avg = [sum(m[i] for m in per_worker) / n / 1024 for i in range(3)]
+    total_pss = (master[1] + sum(m[1] for m in per_worker)) / 1024
+    print(
+        f"• {label:<18} startup {startup:>6.2f} s  per worker: RSS {avg[0]:>6.1f} MB  "
+        f"PSS {avg[1]:>6.1f} MB  USS {avg[2]:>6.1f} MB  |  total PSS {total_pss:>7.1f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--configs", nargs="+", choices=list(CONFIGS), default=list(CONFIGS))
+    args = parser.parse_args()
+
+    env = {**os.environ, "LOG_LEVEL": os.environ.get("LOG_LEVEL", "CRITICAL")}
+    print(f"🚀 gunicorn with {args.workers} workers")
+    for label in args.configs:
+        measure(label, CONFIGS[label], args.workers, env)
+
+
+if __name__ == "__main__":
+    main()
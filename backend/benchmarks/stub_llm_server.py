@@ -0,0 +1,94 @@
+"""Local stand-in for the HuggingFace inference endpoint.
+
+Answers every POST with ``[{"generated_text": "<json>"}]`` after a fixed
+delay, building the JSON from the regex parse of the SMS in the prompt.
+Point the API at it with ``HF_API_URL=http://127.0.0.1:<port>/`` and any
+``HF_API_KEY``.
+
+Run from the ``backend`` directory:
+    python -m benchmarks.stub_llm_server [--port 8099] [--delay 0.5]
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+from sms_regex import parse_sms_with_regex
+
+_SMS_IN_PROMPT = re.compile(r'SMS: "(.*)"\s*\[/INST\]', re.DOTALL)
+
+
+def make_handler(delay: float, fail_every: int = 0):
+    """Builds a request handler class bound to the given latency/failure rate."""
+    counter = {"n": 0}
+    lock = threading.Lock()
+
+    class StubLLMHandler(BaseHTTPRequestHandler):
+        # Keep-alive, and no Nagle delay between the header and body writes.
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            with lock:
+                counter["n"] += 1
+                n = counter["n"]
+            time.sleep(delay)
+
+            if fail_every and n % fail_every == 0:
+                self.send_response(400)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            match = _SMS_IN_PROMPT.search(body.get("inputs", ""))
+            parsed = parse_sms_with_regex(match.group(1) if match else "")
+            parsed.update({"vendor": "Stub Merchant", "category": "Shopping"})
+            out = json.dumps([{"generated_text": json.dumps(parsed)}]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubLLMHandler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # load tests open many connections at once
+
+
+def start_stub_server(
+    port: int = 0, delay: float = 0.5, fail_every: int = 0
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Starts the stub in a daemon thread and returns (server, url)."""
+    server = StubServer(("127.0.0.1", port), make_handler(delay, fail_every))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--delay", type=float, default=0.5)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.port, args.delay, args.fail_every)
+    print(f"🤖 Stub LLM listening on {url} (delay={args.delay}s)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Builds or extends the SMS embedding index served by ``sms_index``.
+
+``build`` creates the index with the KMeans centroids of
+``models/op/kmeans_sms_model.pkl`` as its cells and fills it with the
+labelled messages of the training workbook. ``append`` adds categorized
+``sms_records`` rows past the last indexed id. SERIAL ids are handed out at
+insert time, not at commit, so a row can become visible after a higher id
+was read; each append re-reads the ``ID_LAG`` ids below the checkpoint and
+skips the ones already indexed. New rows go to their nearest existing cell,
+nothing is re-clustered or rewritten, and running API workers pick them up
+on their next search. A rebuild needs a restart.
+
+Run from the ``backend`` directory:
+    python build_sms_index.py build [--workbook ...] [--kmeans ...] [--force]
+    python build_sms_index.py append [--batch-size 5000]
+"""
+import argparse
+import os
+import re
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from category_model import CATEGORY_BATCH_SIZE, CATEGORY_EMBEDDER
+from database import db_connection
+from sms_index import SMS_INDEX_DIR, SmsIndex, shared_embedder
+
+# === CONFIGURATION ===
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_ROOT = os.path.join(BACKEND_DIR, "..", "models")
+WORKBOOK_PATH = os.path.join(MODELS_ROOT, "datasets", "SMS_Categorized_Expanded_Final.xlsx")
+KMEANS_PATH = os.path.join(MODELS_ROOT, "op", "kmeans_sms_model.pkl")
+FETCH_SIZE = 5000
+ID_LAG = 10_000  # sms_records ids re-read below the checkpoint
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def distinct(texts, categories):
+    """Drops repeats of a text (case and spacing folded, first label kept)."""
+    seen = set()
+    kept_texts, kept_categories = [], []
+    for text, category in zip(texts, categories):
+        key = _WHITESPACE.sub(" ", text).strip().lower()
+        if key not in seen:
+            seen.add(key)
+            kept_texts.append(text)
+            kept_categories.append(category)
+    return kept_texts, kept_categories
+
+
+def load_workbook(path):
+    df = pd.read_excel(path)[["SMS", "Category"]].dropna()
+    categories = df["Category"].astype(str).str.strip().str.title()
+    return distinct(df["SMS"].astype(str).tolist(), categories.tolist())
+
+
+def db_batches(last_id, seen, batch_size):
+    """Yields (ids, texts, categories) for categorized sms_records rows past ``last_id`` not in ``seen``."""
+    with db_connection() as conn:
+        with conn.cursor(name="build_sms_index") as cur:
+            cur.itersize = batch_size
+            cur.execute(
+                "SELECT id, sms, category FROM sms_records WHERE id > %s AND category IS NOT NULL ORDER BY id",
+                (last_id,),
+            )
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                rows = [r for r in rows if r[0] not in seen]
+                if rows:
+                    yield [r[0] for r in rows], [r[1] for r in rows], [r[2].strip().title() for r in rows]
+        conn.rollback()
+
+
+def db_checkpoint(meta, ids):
+    """The ``db_*`` metadata once ``ids`` are indexed: the last id and the ids within ``ID_LAG`` of it."""
+    last_id = max(meta["db_last_id"], *ids)
+    recent = set(meta.get("db_recent_ids", ())).union(ids)
+    return {"db_last_id": last_id, "db_recent_ids": sorted(i for i in recent if i > last_id - ID_LAG)}
+
+
+def add(index, embedder, texts, categories, checkpoint=None):
+    texts, categories = distinct(texts, categories)
+    vectors = embedder.encode(texts, batch_size=CATEGORY_BATCH_SIZE) if texts else np.empty((0, index.meta["dim"]))
+    return index.add(vectors, categories, checkpoint)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("build", "append"))
+    parser.add_argument("--index", default=SMS_INDEX_DIR)
+    parser.add_argument("--workbook", default=WORKBOOK_PATH)
+    parser.add_argument("--kmeans", default=KMEANS_PATH)
+    parser.add_argument("--force", action="store_true", help="replace an existing index")
+    parser.add_argument("--batch-size", type=int, default=FETCH_SIZE, help="sms_records rows per append batch")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    embedder = shared_embedder(CATEGORY_EMBEDDER)
+    if args.command == "build":
+        if os.path.exists(args.index):
+            if not args.force:
+                raise SystemExit(f"{args.index} exists; use append, or --force to rebuild it.")
+            shutil.rmtree(args.index)
+        centroids = joblib.load(args.kmeans).cluster_centers_
+        index = SmsIndex.create(args.index, centroids, CATEGORY_EMBEDDER)
+        texts, categories = load_workbook(args.workbook)
+        print(f"🧱 Indexing {len(texts)} labelled workbook messages into {len(centroids)} cells")
+        added = add(index, embedder, texts, categories)
+    else:
+        index = SmsIndex(args.index, enabled=False)
+        index.open()
+        added = 0
+        if "db_recent_ids" in index.meta:
+            since, seen = index.meta["db_last_id"] - ID_LAG, set(index.meta["db_recent_ids"])
+        else:
+            # Index from before the re-read window: start it at the last id.
+            since, seen = index.meta["db_last_id"], set()
+        for ids, texts, categories in db_batches(since, seen, args.batch_size):
+            n = add(index, embedder, texts, categories, checkpoint=db_checkpoint(index.meta, ids))
+            added += n
+            print(f"• {n} rows up to sms_records id {max(ids)}")
+
+    elapsed = time.perf_counter() - start
+    cells = index.stats()["cell_rows"]
+    print(
+        f"✅ {added} rows added in {elapsed:.1f}s; {index.size} rows total, "
+        f"{cells['min']}-{cells['max']} per cell. Saved {args.index}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import io
+import logging
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence
+
+from dotenv import load_dotenv
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+load_dotenv()
+
+logger = logging.getLogger("spendsense.bulk_write")
+
+# === Config ===
+BULK_INSERT_STRATEGY = os.getenv("BULK_INSERT_STRATEGY", "values")  # values, copy or executemany
+BULK_INSERT_CHUNK = int(os.getenv("BULK_INSERT_CHUNK", "1000"))
+
+STRATEGIES = ("executemany", "values", "copy")
+
+
+def _copy_text(value: Any) -> str:
+    """Formats one value for COPY ... FROM STDIN text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    elif isinstance(value, bool):
+        value = "t" if value else "f"
+    elif not isinstance(value, (str, int, float, Decimal)):
+        value = str(value)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def bulk_insert(
+    cur,
+    table: str,
+    columns: Sequence[str],
+    rows: Sequence[Sequence[Any]],
+    strategy: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    on_conflict: str = "",
+    returning: Sequence[str] = (),
+    template: Optional[str] = None,
+) -> List[tuple]:
+    """Inserts ``rows`` into ``table`` in chunks using the chosen strategy.
+
+    - ``values``: ``execute_values``, one multi-row INSERT per chunk.
+    - ``copy``: ``COPY FROM STDIN`` from an in-memory buffer per chunk.
+    - ``executemany``: one round trip per row (the old behaviour).
+
+    ``on_conflict`` (e.g. ``"ON CONFLICT DO NOTHING"``), ``returning`` and a
+    per-row ``template`` (e.g. ``"(%s, %s, NOW())"``) need an INSERT, so they
+    force ``values``. Returns the RETURNING rows, if any. Does not commit;
+    the caller owns the transaction.
+    """
+    if not rows:
+        return []
+    strategy = strategy or BULK_INSERT_STRATEGY
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown bulk insert strategy: {strategy}")
+    if strategy == "copy" and (on_conflict or returning or template):
+        strategy = "values"
+    chunk_size = max(1, chunk_size or BULK_INSERT_CHUNK)
+
+    target = sql.SQL("{} ({})").format(
+        sql.Identifier(table), sql.SQL(", ").join(map(sql.Identifier, columns))
+    )
+    suffix = sql.SQL(on_conflict)
+    if returning:
+        suffix = sql.SQL("{} RETURNING {}").format(
+            suffix, sql.SQL(", ").join(map(sql.Identifier, returning))
+        )
+
+    fetched = []
+    if strategy == "copy":
+        copy_sql = sql.SQL("COPY {} FROM STDIN").format(target).as_string(cur)
+        for start in range(0, len(rows), chunk_size):
+            buf = io.StringIO()
+            for row in rows[start:start + chunk_size]:
+                buf.write("\t".join(_copy_text(v) for v in row))
+                buf.write("\n")
+            buf.seek(0)
+            cur.copy_expert(copy_sql, buf)
+    elif strategy == "values":
+        query = sql.SQL("INSERT INTO {} VALUES %s {}").format(target, suffix).as_string(cur)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            result = execute_values(
+                cur, query, chunk, template=template, page_size=len(chunk), fetch=bool(returning)
+            )
+            if returning:
+                fetched.extend(result)
+    else:
+        values = sql.SQL(template) if template else sql.SQL("({})").format(
+            sql.SQL(", ").join(sql.Placeholder() * len(columns))
+        )
+        query = sql.SQL("INSERT INTO {} VALUES {} {}").format(target, values, suffix).as_string(cur)
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            if returning:
+                for row in chunk:
+                    cur.execute(query, row)
+                    fetched.extend(cur.fetchall())
+            else:
+                cur.executemany(query, chunk)
+    logger.debug(f"Inserted {len(rows)} rows into {table} via {strategy}")
+    return fetched
+
+
+def _unnest_text(value: Any) -> Optional[str]:
+    """Formats one value as text for a ``text[]`` unnest parameter."""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+async def bulk_insert_async(
+    conn,
+    table: str,
+    columns: Sequence[str],
+    column_types: Sequence[str],
+    rows: Sequence[Sequence[Any]],
+    chunk_size: Optional[int] = None,
+    on_conflict: str = "",
+    returning: Sequence[str] = (),
+) -> List[tuple]:
+    """``bulk_insert`` for an asyncpg connection.
+
+    Each chunk is one ``INSERT ... SELECT FROM unnest(...)`` with a ``text[]``
+    parameter per column, cast to ``column_types`` (e.g. ``"numeric"``) in
+    the SELECT, so values convert the way psycopg2's literals do. Does not
+    open a transaction; the caller owns it.
+    """
+    if not rows:
+        return []
+    chunk_size = max(1, chunk_size or BULK_INSERT_CHUNK)
+    names = ", ".join(f'"{c}"' for c in columns)
+    query = (
+        f'INSERT INTO "{table}" ({names}) SELECT '
+        + ", ".join(f'"{c}"::{t}' for c, t in zip(columns, column_types))
+        + " FROM unnest("
+        + ", ".join(f"${i}::text[]" for i in range(1, len(columns) + 1))
+        + f") AS t({names}) {on_conflict}"
+    )
+    if returning:
+        query += " RETURNING " + ", ".join(f'"{c}"' for c in returning)
+
+    fetched = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        params = [[_unnest_text(row[i]) for row in chunk] for i in range(len(columns))]
+        if returning:
+            fetched.extend(tuple(r) for r in await conn.fetch(query, *params))
+        else:
+            await conn.execute(query, *params)
+    logger.debug(f"Inserted {len(rows)} rows into {table} via unnest")
+    return fetched
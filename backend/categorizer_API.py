@@ -1,29 +1,41 @@
+import base64
 import json
 import logging
 import os
 import re
-import uuid
-from datetime import datetime, date
-from decimal import Decimal
+from datetime import datetime
 from functools import wraps
 from time import sleep
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List
 
 import psycopg2
 import requests
 from dotenv import load_dotenv
-from flask import Flask, Blueprint, jsonify, request
+from flask import Flask, Blueprint, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 from psycopg2.extras import RealDictCursor
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
-from database import get_db_connection, init_db, put_db_connection
+from bulk_write import bulk_insert
+from category_model import CATEGORY_CONFIDENCE, CATEGORY_TOP_K, category_model
+from database import db_connection, init_db, pool_stats
 from errors import register_error_handlers
+from ingest import ingest_messages, iter_ndjson
+from jobs import accepted_body, enqueue_ingest, get_job, wants_job
+from json_provider import OrjsonProvider
+from llm_extraction import HF_API_URL, HUGGINGFACE_API_KEY
+from model_registry import model_registry
+from parse_cache import parse_cache
+from promo_filter import promo_filter
+from response_cache import cached_per_uid, invalidate_uid, response_cache_stats
+from sms_index import SMS_INDEX_K, SMS_INDEX_MAX_K, sms_index
+from sms_templates import template_learner
 from validation import (
     bill_parse_schema,
     bulk_prediction_schema,
     budget_schema,
+    category_nearest_schema,
+    category_predict_schema,
+    sms_message_schema,
     update_budget_schema,
     validate_payload,
 )
@@ -40,6 +52,7 @@ logger = logging.getLogger("spendsense.api")
 
 # === Flask App ===
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 register_error_handlers(app)
 
 # === CORS Configuration ===
@@ -52,175 +65,41 @@ else:
     CORS(app)
 
 # === Config ===
-HUGGINGFACE_API_KEY = os.getenv("HF_API_KEY")
-HUGGINGFACE_MODEL = os.getenv("HF_MODEL", "mistralai/Mixtral-8x7B-Instruct-v0.1")
-HF_API_URL = f"https://api-inference.huggingface.co/models/{HUGGINGFACE_MODEL}"
-
 MAX_LIMIT = int(os.getenv("MAX_LIMIT", "200"))
 DEFAULT_LIMIT = int(os.getenv("DEFAULT_LIMIT", "50"))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "500"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
 
-# === HTTP Session for HuggingFace ===
-def build_http_session() -> requests.Session:
-    """Builds a requests session with retry logic."""
-    session = requests.Session()
-    retries = Retry(
-        total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)
-    )
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount("https://", adapter)
-    session.mount("http://", adapter)
-    return session
-
-http = build_http_session()
+BILL_COLUMNS = (
+    "user_id", "name", "category", "due_date", "amount", "status",
+    "sms_sender", "sms_body", "created_at", "updated_at",
+)
 
 # === Database Initialization ===
 with app.app_context():
     init_db()
 
 # === Helpers ===
-def is_promotional(text: Optional[str]) -> bool:
-    """Checks if an SMS is promotional based on keywords."""
-    if not text:
-        return True
-    text_lower = text.lower()
-    promo_keywords = [
-        "insurance",
-        "loan offer",
-        "apply now",
-        "limited period offer",
-        "download app",
-        "sale",
-        "discount",
-        "emi offer",
-    ]
-    txn_keywords = [
-        "debited",
-        "credited",
-        "withdrawn",
-        "payment",
-        "transfer",
-        "txn",
-        "transaction",
-        "purchase",
-    ]
-    if any(word in text_lower for word in txn_keywords):
-        return False
-    if any(word in text_lower for word in promo_keywords):
-        return True
-    return False
-
-
-def parse_sms_with_regex(sms: str) -> Dict[str, Optional[str]]:
-    """Parses an SMS using regex as a fallback."""
-    if not sms:
-        return {}
-    data = {
-        "amount": None,
-        "txn_type": None,
-        "mode": None,
-        "ref_no": None,
-        "account": None,
-        "date": None,
-        "balance": None,
-        "vendor": None,
-        "category": "Other",
-    }
-    amount_match = re.search(r"(?i)(?:INR|Rs\.?|₹)\s*([\d,]+\.?\d*)", sms)
-    if amount_match:
-        data["amount"] = amount_match.group(1).replace(",", "")
-    ref_match = re.search(
-        r"(?i)(?:Ref(?:erence)?(?:\s*No)?\.?)\s*[:\-]?\s*([A-Za-z0-9\-_/]+)", sms
-    )
-    if ref_match:
-        data["ref_no"] = ref_match.group(1)
-    account_match = re.search(r"(?i)(?:A/c(?:\s*XX)?\s*)(\d+)", sms)
-    if account_match:
-        data["account"] = account_match.group(1)
-    date_match = re.search(
-        r"(\d{1,2}[-/][A-Za-z]{3}[-/]\d{2,4}|\d{1,2}[-/]\d{1,2}[-/]\d{2,4})", sms
-    )
-    if date_match:
-        data["date"] = date_match.group(1)
-    balance_match = re.search(
-        r"(?i)(?:Avl Bal|balance)[\s:]*[₹Rs\.]*\s*([\d,]+\.?\d*)", sms
-    )
-    if balance_match:
-        data["balance"] = balance_match.group(1).replace(",", "")
-    if re.search(r"(?i)\b(debited?|spent|withdrawn|deducted|purchas(?:e|ed))\b", sms):
-        data["txn_type"] = "Debit"
-    elif re.search(r"(?i)\b(credited?|received|deposited|refunded?)\b", sms):
-        data["txn_type"] = "Credit"
-    if re.search(r"(?i)\b(UPI|GPay|PhonePe|Paytm)\b", sms):
-        data["mode"] = "UPI"
-    elif re.search(r"(?i)\b(ATM|Cash)\b", sms):
-        data["mode"] = "ATM"
-    elif re.search(r"(?i)\b(NEFT|IMPS|RTGS|Net\s*Banking)\b", sms):
-        data["mode"] = "NetBanking"
-    return data
-
-
-def extract_transaction_details_with_llm(sms_body: str) -> Dict[str, Any]:
-    """Extracts transaction details from an SMS using an LLM."""
-    if not HUGGINGFACE_API_KEY:
-        logger.warning("HF_API_KEY not set. Falling back to regex.")
-        return parse_sms_with_regex(sms_body)
-
-    prompt = f"""[INST] You are an expert financial transaction parser. Analyze the following SMS message and extract the transaction details.
-    Your response MUST be a single, valid JSON object and nothing else.
-    The JSON object should have these keys: "amount", "txn_type" (must be "Credit" or "Debit"), "vendor" (the merchant name, e.g., "Zomato", "Amazon"), "category" (e.g., "Food", "Shopping", "Salary", "Travel"), "mode" (e.g., "UPI", "Card", "ATM", "NetBanking"), "date".
-    If a value is not present, use null. Extract the amount as a number, without currency symbols.
-
-    SMS: "{sms_body}"
-    [/INST]"""
-
-    headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
-    payload = {"inputs": prompt, "parameters": {"max_new_tokens": 256, "return_full_text": False}}
-
-    try:
-        resp = http.post(HF_API_URL, headers=headers, json=payload, timeout=20)
-        resp.raise_for_status()
-        response_text = resp.json()[0]["generated_text"]
-        json_match = re.search(r"\{.*\}", response_text, re.DOTALL)
-        if json_match:
-            parsed_json = json.loads(json_match.group(0))
-            logger.info(f"LLM successfully parsed: {parsed_json}")
-            return parsed_json
-        else:
-            raise ValueError("No valid JSON object found in LLM response")
-    except Exception as e:
-        logger.error(f"LLM parsing failed: {e}. Falling back to regex.")
-        return parse_sms_with_regex(sms_body)
-
-
-def parse_sms(sms: str) -> Dict[str, Any]:
-    """Parses an SMS by trying the LLM first and falling back to regex."""
-    llm_result = extract_transaction_details_with_llm(sms)
-    if not llm_result or not all(
-        llm_result.get(k) for k in ["amount", "txn_type", "vendor", "category"]
-    ):
-        regex_result = parse_sms_with_regex(sms)
-        return {**regex_result, **llm_result}
-    return llm_result
-
-
-def classify_text(text: str) -> str:
-    """Classifies text into a category."""
-    # Placeholder for a more sophisticated classification model
-    return "Other"
+def clamp_limit(val):
+    """Clamps a value to be within the allowed limit."""
+    return max(1, min(int(val), MAX_LIMIT))
 
 
-def json_safe(val):
-    """Converts Decimal and date/datetime objects to JSON serializable types."""
-    if isinstance(val, Decimal):
-        return float(val)
-    if isinstance(val, (datetime, date)):
-        return val.isoformat()
-    return val
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    """Encodes a (created_at, id) keyset position as an opaque token."""
+    raw = json.dumps([created_at.isoformat(), record_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
 
-def clamp_limit(val):
-    """Clamps a value to be within the allowed limit."""
-    return max(1, min(int(val), MAX_LIMIT))
+def decode_cursor(token: str):
+    """Decodes a cursor token; returns (created_at, id) or None if invalid."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, record_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (ValueError, TypeError):
+        return None
 
 
 # === Blueprints ===
@@ -231,6 +110,7 @@ bills_bp = Blueprint("bills", __name__)
 categories_bp = Blueprint("categories", __name__)
 budgets_bp = Blueprint("budgets", __name__)
 wallets_bp = Blueprint("wallets", __name__)
+jobs_bp = Blueprint("jobs", __name__)
 
 
 # === Prediction Route ===
@@ -245,145 +125,257 @@ def predict_bulk():
     uid = data.get("uid")
     messages = data.get("messages", [])
 
-    conn = None
+    if wants_job(request.args, len(messages)):
+        return enqueue_bulk_prediction(uid, messages)
+
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        timestamp = datetime.utcnow()
-
-        results = []
-        insert_values = []
-        for msg in messages:
-            sms = msg.get("sms")
-            sender = msg.get("sender")
-            if not sms or is_promotional(sms):
-                continue
-            parsed = parse_sms(sms)
-            amount = float(parsed["amount"]) if parsed.get("amount") else None
-            balance = float(parsed["balance"]) if parsed.get("balance") else None
-            txn_type = parsed.get("txn_type")
-            category = parsed.get("category", "Other")
-            insert_values.append(
-                (
-                    uid,
-                    sms,
-                    category,
-                    amount,
-                    txn_type,
-                    parsed.get("mode"),
-                    parsed.get("ref_no"),
-                    parsed.get("account"),
-                    parsed.get("date"),
-                    balance,
-                    sender,
-                    timestamp,
-                )
-            )
-            results.append(
-                {
-                    "uid": uid,
-                    "sms": sms,
-                    "sender": sender,
-                    "category": category,
-                    "amount": amount,
-                    "txn_type": txn_type,
-                    "mode": parsed.get("mode"),
-                    "ref_no": parsed.get("ref_no"),
-                    "account": parsed.get("account"),
-                    "date": parsed.get("date"),
-                    "balance": balance,
-                    "created_at": timestamp.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                }
-            )
-        if insert_values:
-            cur.executemany(
-                """INSERT INTO sms_records (uid, sms, category, amount, txn_type, mode, ref_no, account, date, balance, sender, created_at) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)""",
-                insert_values,
-            )
+        with db_connection() as conn:
+            cur = conn.cursor()
+            body = ingest_messages(cur, uid, messages, datetime.utcnow())
             conn.commit()
-        
-        cur.close()
-
-        return jsonify({"status": "success", "count": len(results), "data": results}), 200
+            cur.close()
+        if body["count"]:
+            invalidate_uid(uid)
+        return jsonify(body), 200
     except psycopg2.Error as e:
         logger.error(f"Database error in predict_bulk: {e}")
-        if conn:
-            conn.rollback()
         return jsonify({"status": "error", "message": "Database error"}), 500
-    finally:
-        if conn:
-            put_db_connection(conn)
+
+
+def enqueue_bulk_prediction(uid, messages):
+    """Queues a /predictions-bulk batch for the ingest workers; answers 202."""
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            job_id = enqueue_ingest(cur, uid, messages)
+            conn.commit()
+            cur.close()
+    except psycopg2.Error as e:
+        logger.error(f"Database error in enqueue_bulk_prediction: {e}")
+        return jsonify({"status": "error", "message": "Database error"}), 500
+    body = accepted_body(job_id, len(messages))
+    return jsonify(body), 202, {"Location": body["status_url"]}
+
+
+@prediction_bp.route("/predictions-stream", methods=["POST"])
+def predict_stream():
+    """Ingests an NDJSON upload of ``{"sms", "sender"}`` lines for ``?uid=``.
+
+    Messages are validated as they arrive and committed every
+    ``STREAM_CHUNK_SIZE`` lines; the response streams one NDJSON result per
+    chunk and a final summary line.
+    """
+    uid = request.args.get("uid", "")
+    if not uid:
+        return jsonify({"status": "error", "message": {"uid": ["required field"]}}), 400
+    if request.mimetype not in NDJSON_MIMETYPES:
+        return jsonify({"status": "error", "message": "Expected an application/x-ndjson body"}), 415
+    return Response(
+        stream_with_context(stream_ingest(uid, request.stream)),
+        mimetype="application/x-ndjson",
+    )
+
+
+def stream_ingest(uid, stream):
+    """Generator behind ``predict_stream``; yields encoded NDJSON result lines."""
+    totals = {"count": 0, "duplicates": 0, "promotional": 0, "invalid": 0, "llm_calls_avoided": 0}
+    batch, invalid = [], []
+    first_line = last_line = 0
+    chunk = 0
+
+    def flush():
+        body = {"status": "success", "count": 0, "skipped": {"duplicates": 0, "promotional": 0}, "data": []}
+        if batch:
+            with db_connection() as conn:
+                cur = conn.cursor()
+                body = ingest_messages(cur, uid, batch, datetime.utcnow())
+                conn.commit()
+                cur.close()
+            if body["count"]:
+                invalidate_uid(uid)
+        totals["count"] += body["count"]
+        totals["duplicates"] += body["skipped"]["duplicates"]
+        totals["promotional"] += body["skipped"]["promotional"]
+        totals["llm_calls_avoided"] += body.get("llm_calls_avoided", 0)
+        totals["invalid"] += len(invalid)
+        body.update(chunk=chunk, lines=[first_line, last_line], invalid=list(invalid))
+        return app.json.dumps(body) + "\n"
+
+    try:
+        for line_no, msg, error in iter_ndjson(stream, STREAM_MAX_LINE_BYTES):
+            if not first_line:
+                first_line = line_no
+            last_line = line_no
+            if error is None and not isinstance(msg, dict):
+                error = "expected a JSON object"
+            if error is None:
+                error = validate_payload(msg, sms_message_schema)
+            if error is None:
+                batch.append(msg)
+            else:
+                invalid.append({"line": line_no, "errors": error})
+
+            if len(batch) + len(invalid) >= STREAM_CHUNK_SIZE:
+                chunk += 1
+                yield flush()
+                batch, invalid = [], []
+                first_line = 0
+
+        if batch or invalid:
+            chunk += 1
+            yield flush()
+    except psycopg2.Error as e:
+        # Headers are already sent; earlier chunks stay committed.
+        logger.error(f"Database error in predict_stream: {e}")
+        yield app.json.dumps({
+            "status": "error", "message": "Database error", "chunk": chunk, "lines": [first_line, last_line]
+        }) + "\n"
+        return
+
+    yield app.json.dumps({
+        "status": "success",
+        "done": True,
+        "chunks": chunk,
+        "lines": last_line,
+        "count": totals["count"],
+        "skipped": {k: totals[k] for k in ("duplicates", "promotional", "invalid")},
+        "llm_calls_avoided": totals["llm_calls_avoided"],
+    }) + "\n"
+
+
+# === Jobs Route ===
+@jobs_bp.route("/jobs/<int:job_id>", methods=["GET"])
+def get_job_status(job_id):
+    """Reports an ingest job's progress, counts and throughput."""
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            job = get_job(cur, job_id)
+            cur.close()
+    except psycopg2.Error as e:
+        logger.error(f"Database error in get_job_status: {e}")
+        return jsonify({"status": "error", "message": "Database error"}), 500
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify({"status": "success", "data": job}), 200
 
 
 # === Records Route ===
 @records_bp.route("/records/<uid>", methods=["GET"])
+@cached_per_uid
 def get_user_records(uid):
-    """Fetches transaction records for a user."""
+    """Fetches transaction records for a user.
+
+    Pages by an opaque ``cursor`` over (created_at, id) when given, else by
+    ``offset``. ``include=summary,total`` picks the extra aggregates; offset
+    requests default to both, cursor requests to neither.
+    """
     limit = clamp_limit(request.args.get("limit", DEFAULT_LIMIT))
     offset = max(0, int(request.args.get("offset", 0)))
+    cursor = request.args.get("cursor")
+    position = None
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return jsonify({"status": "error", "message": "Invalid cursor"}), 400
+    include_arg = request.args.get("include")
+    if include_arg is None:
+        include = set() if cursor else {"summary", "total"}
+    else:
+        include = {part.strip() for part in include_arg.split(",") if part.strip()}
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        query = """WITH user_records AS (
-            SELECT * FROM sms_records WHERE uid = %s
-        ),
-        monthly_summary AS (
-            SELECT
-                COALESCE(SUM(CASE WHEN txn_type = 'Credit' THEN amount ELSE 0 END), 0) AS monthly_income,
-                COALESCE(SUM(CASE WHEN txn_type = 'Debit' THEN amount ELSE 0 END), 0) AS monthly_expenses
-            FROM user_records
-            WHERE date_trunc('month', created_at) = date_trunc('month', CURRENT_DATE)
-        )
-        SELECT
-            (SELECT COUNT(*) FROM user_records) AS total_count,
-            (SELECT monthly_income FROM monthly_summary) AS monthly_income,
-            (SELECT monthly_expenses FROM monthly_summary) AS monthly_expenses,
-            id, uid, sms, category, amount, txn_type, mode, ref_no, account, date, balance, created_at
-        FROM user_records
-        ORDER BY created_at DESC
-        LIMIT %s OFFSET %s;"""
-
-        cur.execute(query, (uid, limit, offset))
-        rows = cur.fetchall()
-        cur.close()
-
-        if not rows:
-            return jsonify({"status": "success", "total": 0, "count": 0, "limit": limit, "offset": offset, "data": [], "summary": {"monthlyIncome": 0, "monthlyExpenses": 0}})
-
-        total_count = rows[0]["total_count"]
-        monthly_income = rows[0]["monthly_income"]
-        monthly_expenses = rows[0]["monthly_expenses"]
-
-        data = [{k: json_safe(v) for k, v in row.items() if k not in ["total_count", "monthly_income", "monthly_expenses"]} for row in rows]
-
-        response = {
-            "status": "success",
-            "total": total_count,
-            "count": len(data),
-            "limit": limit,
-            "offset": offset,
-            "data": data,
-            "summary": {
-                "monthlyIncome": json_safe(monthly_income),
-                "monthlyExpenses": json_safe(monthly_expenses),
-            },
-        }
-
-        return jsonify(response), 200
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            columns = "id, uid, sms, category, amount, txn_type, mode, ref_no, account, date, balance, created_at"
+            if position:
+                cur.execute(
+                    f"""SELECT {columns} FROM sms_records
+                    WHERE uid = %s AND (created_at, id) < (%s, %s)
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s""",
+                    (uid, position[0], position[1], limit),
+                )
+            else:
+                cur.execute(
+                    f"""SELECT {columns} FROM sms_records
+                    WHERE uid = %s
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s OFFSET %s""",
+                    (uid, limit, offset),
+                )
+            rows = cur.fetchall()
+
+            total_count = None
+            if "total" in include:
+                cur.execute("SELECT COUNT(*) AS total_count FROM sms_records WHERE uid = %s", (uid,))
+                total_count = cur.fetchone()["total_count"]
+
+            summary = None
+            if "summary" in include:
+                cur.execute(
+                    """SELECT
+                        COALESCE(SUM(CASE WHEN txn_type = 'Credit' THEN total ELSE 0 END), 0) AS monthly_income,
+                        COALESCE(SUM(CASE WHEN txn_type = 'Debit' THEN total ELSE 0 END), 0) AS monthly_expenses
+                    FROM sms_monthly_aggregates
+                    WHERE uid = %s AND month = date_trunc('month', LOCALTIMESTAMP)::date""",
+                    (uid,),
+                )
+                row = cur.fetchone()
+                summary = {
+                    "monthlyIncome": row["monthly_income"],
+                    "monthlyExpenses": row["monthly_expenses"],
+                }
+            cur.close()
+
+            next_cursor = None
+            if len(rows) == limit:
+                next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+            response = {
+                "status": "success",
+                "count": len(rows),
+                "limit": limit,
+                "next_cursor": next_cursor,
+                "data": rows,
+            }
+            if not cursor:
+                response["offset"] = offset
+            if total_count is not None:
+                response["total"] = total_count
+            if summary is not None:
+                response["summary"] = summary
+
+            return jsonify(response), 200
     except psycopg2.Error as e:
         logger.error(f"Database error in get_user_records: {e}")
         return jsonify({"status": "error", "message": "Database error"}), 500
-    finally:
-        if conn:
-            put_db_connection(conn)
 
 
 # === Bills Routes ===
-def predict_bill_category(text, sender):
-    """Predicts the category of a bill based on its text and sender."""
+BILL_DUE_PATTERN = re.compile(
+    r"(?P<amount>\d+\.?\d*)\s*(?:INR|₹)?(?:\s*is)?\s*(?:due|due date|due on)\s*(?P<date>\d{2}[-/]\d{2}[-/]\d{4})",
+    re.IGNORECASE,
+)
+
+
+def find_bills(messages: List[Dict[str, Any]]):
+    """Returns (body, sender, due_date, amount) for each message mentioning a due amount."""
+    found = []
+    for msg in messages:
+        body = msg.get("body", "")
+        sender = msg.get("sender", "")
+        match = BILL_DUE_PATTERN.search(body)
+        if match:
+            due_date_str = match.group("date").replace("/", "-")
+            due_date = datetime.strptime(due_date_str, "%d-%m-%Y").date()
+            found.append((body, sender, due_date, float(match.group("amount"))))
+    return found
+
+
+def build_bill_category_request(text, sender):
+    """Returns the (headers, payload) for the zero-shot bill category call."""
     headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
     payload = {
         "inputs": f"{text} From: {sender}",
@@ -391,13 +383,46 @@ def predict_bill_category(text, sender):
             "candidate_labels": ["Electricity", "Water", "Internet", "Phone", "Other"]
         },
     }
-    response = requests.post(HF_API_URL, headers=headers, json=payload)
-    if response.status_code == 200:
-        result = response.json()
-        return result["labels"][0]
+    return headers, payload
+
+
+def bill_category_from_response(status_code, body) -> str:
+    """Reads the top label from a zero-shot response, or "Other"."""
+    if status_code == 200 and isinstance(body, dict) and body.get("labels"):
+        return body["labels"][0]
     return "Other"
 
 
+def predict_bill_category(text, sender):
+    """Predicts the category of a bill based on its text and sender."""
+    headers, payload = build_bill_category_request(text, sender)
+    response = requests.post(HF_API_URL, headers=headers, json=payload)
+    body = response.json() if response.status_code == 200 else None
+    return bill_category_from_response(response.status_code, body)
+
+
+def build_bill_rows(uid, found, categories):
+    """Pairs each found bill with its category as a bills row (without id)."""
+    return [
+        (uid, category, category, due_date, amount, "Unpaid", sender, body)
+        for (body, sender, due_date, amount), category in zip(found, categories)
+    ]
+
+
+def bill_response_entry(bill_id, row) -> Dict[str, Any]:
+    """Shapes an inserted bills row for the /bills/parse response."""
+    uid, name, category, due_date, amount, status, _, _ = row
+    return {
+        "id": bill_id,
+        "user_id": uid,
+        "name": name,
+        "category": category,
+        "due_date": due_date.isoformat(),
+        "amount": amount,
+        "status": status,
+    }
+
+
 @bills_bp.route("/bills/parse", methods=["POST"])
 def parse_bills_from_sms():
     """Parses bills from a list of SMS messages."""
@@ -408,106 +433,107 @@ def parse_bills_from_sms():
 
     uid = data["uid"]
     messages = data["messages"]
-    new_bills = []
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        for msg in messages:
-            body = msg.get("body", "")
-            sender = msg.get("sender", "")
-            match = re.search(
-                r"(?P<amount>\d+\.?\d*)\s*(?:INR|₹)?(?:\s*is)?\s*(?:due|due date|due on)\s*(?P<date>\d{2}[-/]\d{2}[-/]\d{4})",
-                body,
-                re.IGNORECASE,
+        found = find_bills(messages)
+        categories = [predict_bill_category(body, sender) for body, sender, _, _ in found]
+        bill_values = build_bill_rows(uid, found, categories)
+        with db_connection() as conn:
+            cur = conn.cursor()
+            inserted = bulk_insert(
+                cur,
+                "bills",
+                BILL_COLUMNS,
+                bill_values,
+                returning=("id",),
+                template="(%s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())",
             )
-            if match:
-                category = predict_bill_category(body, sender)
-                bill_id = str(uuid.uuid4())
-                due_date_str = match.group("date").replace("/", "-")
-                due_date = datetime.strptime(due_date_str, "%d-%m-%Y").date()
-                amount = float(match.group("amount"))
-
-                cur.execute(
-                    """INSERT INTO bills (id, user_id, name, category, due_date, amount, status, sms_sender, sms_body, created_at, updated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW()) ON CONFLICT (id) DO NOTHING""",
-                    (
-                        bill_id,
-                        uid,
-                        category,
-                        category,
-                        due_date,
-                        amount,
-                        "Unpaid",
-                        sender,
-                        body,
-                    ),
-                )
-
-                new_bills.append(
-                    {
-                        "id": bill_id,
-                        "user_id": uid,
-                        "name": category,
-                        "category": category,
-                        "due_date": due_date.isoformat(),
-                        "amount": amount,
-                        "status": "Unpaid",
-                    }
-                )
-
-        conn.commit()
-        cur.close()
+            conn.commit()
+            if bill_values:
+                invalidate_uid(uid)
+            cur.close()
 
+        new_bills = [bill_response_entry(row[0], values) for row, values in zip(inserted, bill_values)]
         return jsonify({"parsed_bills": new_bills})
     except (psycopg2.Error, ValueError) as e:
         logger.error(f"Error in parse_bills_from_sms: {e}")
-        if conn:
-            conn.rollback()
         return jsonify({"status": "error", "message": "Error parsing bills"}), 500
-    finally:
-        if conn:
-            put_db_connection(conn)
 
 
 @bills_bp.route("/bills/<uid>", methods=["GET"])
+@cached_per_uid
 def get_bills(uid):
     """Fetches bills for a user, with optional status filtering."""
     filter_status = request.args.get("filter", "All")
     if filter_status not in ["All", "Paid", "Unpaid"]:
         return jsonify({"status": "error", "message": "Invalid filter status"}), 400
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
 
-        if filter_status == "All":
-            cur.execute(
-                "SELECT * FROM bills WHERE user_id = %s ORDER BY due_date ASC", (uid,)
-            )
-        else:
-            cur.execute(
-                "SELECT * FROM bills WHERE user_id = %s AND status = %s ORDER BY due_date ASC",
-                (uid, filter_status),
-            )
+            if filter_status == "All":
+                cur.execute(
+                    "SELECT * FROM bills WHERE user_id = %s ORDER BY due_date ASC", (uid,)
+                )
+            else:
+                cur.execute(
+                    "SELECT * FROM bills WHERE user_id = %s AND status = %s ORDER BY due_date ASC",
+                    (uid, filter_status),
+                )
 
-        bills = cur.fetchall()
-        cur.close()
+            bills = cur.fetchall()
+            cur.close()
 
-        return jsonify([dict(row) for row in bills])
+            return jsonify(bills)
     except psycopg2.Error as e:
         logger.error(f"Database error in get_bills: {e}")
         return jsonify({"status": "error", "message": "Database error"}), 500
-    finally:
-        if conn:
-            put_db_connection(conn)
 
 
 # === Category Routes ===
+@categories_bp.route("/categories/predict", methods=["POST"])
+def predict_categories():
+    """Scores SMS texts with the category model; returns the top-k per text."""
+    data = request.get_json(silent=True) or {}
+    errors = validate_payload(data, category_predict_schema)
+    if errors:
+        return jsonify({"status": "error", "message": errors}), 400
+    if not category_model.ready:
+        return jsonify({"status": "error", "message": "Category model not loaded"}), 503
+
+    top_k = max(1, data.get("top_k", CATEGORY_TOP_K))
+    predictions = category_model.predict(data["messages"], top_k=top_k)
+    return jsonify({
+        "status": "success",
+        "data": [
+            {
+                "category": top[0]["category"],
+                "confidence": top[0]["confidence"],
+                "confident": top[0]["confidence"] >= CATEGORY_CONFIDENCE,
+                "top_k": top,
+            }
+            for top in predictions
+        ],
+    }), 200
+
+
+@categories_bp.route("/categories/nearest", methods=["POST"])
+def nearest_categories():
+    """Categorizes SMS texts by their nearest labelled SMS in the embedding index."""
+    data = request.get_json(silent=True) or {}
+    errors = validate_payload(data, category_nearest_schema)
+    if errors:
+        return jsonify({"status": "error", "message": errors}), 400
+    if not sms_index.ready:
+        return jsonify({"status": "error", "message": "SMS index not loaded"}), 503
+
+    k = min(max(1, data.get("top_k", SMS_INDEX_K)), SMS_INDEX_MAX_K)
+    return jsonify({"status": "success", "data": sms_index.nearest(data["messages"], k=k)}), 200
+
+
 @categories_bp.route("/category-spending/<uid>", methods=["GET"])
+@cached_per_uid
 def category_spending(uid):
     """Calculates spending per category for a user."""
     txn_type = request.args.get("type")
@@ -521,61 +547,58 @@ def category_spending(uid):
     if sort not in ["asc", "desc"]:
         return jsonify({"status": "error", "message": "Invalid sort order"}), 400
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-
-        query = "SELECT category, SUM(amount) AS total_spent FROM sms_records WHERE uid = %s AND txn_type IN ('Credit', 'Debit')"
-        params = [uid]
-
-        if txn_type:
-            query += " AND txn_type = %s"
-            params.append(txn_type)
-
-        if period == "weekly":
-            query += " AND created_at >= NOW() - INTERVAL '7 days'"
-        elif period == "monthly":
-            query += " AND created_at >= NOW() - INTERVAL '30 days'"
-
-        query += " GROUP BY category"
-        query += f" ORDER BY total_spent {('ASC' if sort == 'asc' else 'DESC')}"
-
-        cur.execute(query, tuple(params))
-        results = cur.fetchall()
-        cur.close()
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            if period:
+                # Rolling 7/30-day windows cut across months, so read raw rows.
+                query = "SELECT category, SUM(amount) AS total_spent FROM sms_records WHERE uid = %s AND txn_type IN ('Credit', 'Debit')"
+            else:
+                query = "SELECT NULLIF(category, '') AS category, SUM(total) AS total_spent FROM sms_monthly_aggregates WHERE uid = %s"
+            params = [uid]
+
+            if txn_type:
+                query += " AND txn_type = %s"
+                params.append(txn_type)
+
+            if period == "weekly":
+                query += " AND created_at >= NOW() - INTERVAL '7 days'"
+            elif period == "monthly":
+                query += " AND created_at >= NOW() - INTERVAL '30 days'"
+
+            query += " GROUP BY category"
+            query += f" ORDER BY total_spent {('ASC' if sort == 'asc' else 'DESC')}"
+
+            cur.execute(query, tuple(params))
+            results = cur.fetchall()
+            cur.close()
 
-        return jsonify({"status": "success", "data": results})
+            return jsonify({"status": "success", "data": results})
     except psycopg2.Error as e:
         logger.error(f"Database error in category_spending: {e}")
         return jsonify({"status": "error", "message": "Database error"}), 500
-    finally:
-        if conn:
-            put_db_connection(conn)
 
 
 # === Budgets Routes ===
 @budgets_bp.route("/budgets/<uid>", methods=["GET"])
+@cached_per_uid
 def get_budgets(uid):
     """Fetches budgets for a user."""
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute(
-            "SELECT id, uid, name, cap, currency, period, created_at FROM budgets WHERE uid = %s",
-            (uid,),
-        )
-        budgets = cur.fetchall()
-        cur.close()
-
-        return jsonify({"budgets": [dict(b) for b in budgets]})
+        with db_connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(
+                "SELECT id, uid, name, cap, currency, period, created_at FROM budgets WHERE uid = %s",
+                (uid,),
+            )
+            budgets = cur.fetchall()
+            cur.close()
+
+            return jsonify({"budgets": [dict(b) for b in budgets]})
     except psycopg2.Error as e:
         logger.error(f"Database error in get_budgets: {e}")
         return jsonify({"status": "error", "message": "Database error"}), 500
-    finally:
-        if conn:
-            put_db_connection(conn)
 
 
 @budgets_bp.route("/budgets", methods=["POST"])
@@ -592,27 +615,22 @@ def create_budget():
     currency = data.get("currency", "INR")
     period = data.get("period")
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO budgets (uid, name, cap, currency, period) VALUES (%s, %s, %s, %s, %s) RETURNING id",
-            (uid, name, cap, currency, period),
-        )
-        budget_id = cur.fetchone()[0]
-        conn.commit()
-        cur.close()
-
-        return jsonify({"message": "Budget created", "id": budget_id}), 201
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO budgets (uid, name, cap, currency, period) VALUES (%s, %s, %s, %s, %s) RETURNING id",
+                (uid, name, cap, currency, period),
+            )
+            budget_id = cur.fetchone()[0]
+            conn.commit()
+            invalidate_uid(uid)
+            cur.close()
+
+            return jsonify({"message": "Budget created", "id": budget_id}), 201
     except psycopg2.Error as e:
         logger.error(f"Database error in create_budget: {e}")
-        if conn:
-            conn.rollback()
         return jsonify({"status": "error", "message": "Database error"}), 500
-    finally:
-        if conn:
-            put_db_connection(conn)
 
 
 @budgets_bp.route("/budgets/<int:budget_id>", methods=["PUT"])
@@ -623,66 +641,57 @@ def update_budget(budget_id):
     if errors:
         return jsonify({"status": "error", "message": errors}), 400
 
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            """UPDATE budgets
-            SET name = COALESCE(%s, name), cap = COALESCE(%s, cap), currency = COALESCE(%s, currency), period = COALESCE(%s, period)
-            WHERE id = %s""",
-            (
-                data.get("name"),
-                data.get("cap"),
-                data.get("currency"),
-                data.get("period"),
-                budget_id,
-            ),
-        )
-        conn.commit()
-
-        if cur.rowcount == 0:
-            cur.close()
-            return jsonify({"status": "error", "message": "Budget not found"}), 404
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """UPDATE budgets
+                SET name = COALESCE(%s, name), cap = COALESCE(%s, cap), currency = COALESCE(%s, currency), period = COALESCE(%s, period)
+                WHERE id = %s
+                RETURNING uid""",
+                (
+                    data.get("name"),
+                    data.get("cap"),
+                    data.get("currency"),
+                    data.get("period"),
+                    budget_id,
+                ),
+            )
+            conn.commit()
 
-        cur.close()
+            if cur.rowcount == 0:
+                cur.close()
+                return jsonify({"status": "error", "message": "Budget not found"}), 404
 
-        return jsonify({"message": "Budget updated"}), 200
+            invalidate_uid(cur.fetchone()[0])
+            cur.close()
+
+            return jsonify({"message": "Budget updated"}), 200
     except psycopg2.Error as e:
         logger.error(f"Database error in update_budget: {e}")
-        if conn:
-            conn.rollback()
         return jsonify({"status": "error", "message": "Database error"}), 500
-    finally:
-        if conn:
-            put_db_connection(conn)
 
 
 @budgets_bp.route("/budgets/<int:budget_id>", methods=["DELETE"])
 def delete_budget(budget_id):
     """Deletes a budget."""
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM budgets WHERE id = %s", (budget_id,))
-        conn.commit()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM budgets WHERE id = %s RETURNING uid", (budget_id,))
+            conn.commit()
 
-        if cur.rowcount == 0:
-            cur.close()
-            return jsonify({"status": "error", "message": "Budget not found"}), 404
+            if cur.rowcount == 0:
+                cur.close()
+                return jsonify({"status": "error", "message": "Budget not found"}), 404
 
-        cur.close()
+            invalidate_uid(cur.fetchone()[0])
+            cur.close()
 
-        return jsonify({"message": "Budget deleted"}), 200
+            return jsonify({"message": "Budget deleted"}), 200
     except psycopg2.Error as e:
         logger.error(f"Database error in delete_budget: {e}")
-        if conn:
-            conn.rollback()
         return jsonify({"status": "error", "message": "Database error"}), 500
-    finally:
-        if conn:
-            put_db_connection(conn)
 
 # === Wallets Route ===
 @wallets_bp.route("/wallets/<uid>", methods=["GET"])
@@ -697,6 +706,46 @@ def health_check():
     """Health check endpoint."""
     return jsonify({"status": "ok", "message": "✅ SpendSense Server is running!"})
 
+@health_bp.route("/parse-cache/stats", methods=["GET"])
+def parse_cache_stats():
+    """Reports SMS parse cache hit/miss/eviction counters."""
+    return jsonify({"status": "success", "data": parse_cache.stats()})
+
+@health_bp.route("/promo-filter/stats", methods=["GET"])
+def promo_filter_stats():
+    """Reports promotional filter counts and the LLM calls it avoided."""
+    return jsonify({"status": "success", "data": promo_filter.stats()})
+
+@health_bp.route("/category-model/stats", methods=["GET"])
+def category_model_stats():
+    """Reports category model batches, latency and how many parses skipped the LLM."""
+    return jsonify({"status": "success", "data": category_model.stats()})
+
+@health_bp.route("/models/stats", methods=["GET"])
+def model_registry_stats():
+    """Reports loaded model artifacts and how many of their bytes are memory-mapped."""
+    return jsonify({"status": "success", "data": model_registry.stats()})
+
+@health_bp.route("/sms-index/stats", methods=["GET"])
+def sms_index_stats():
+    """Reports SMS index rows per cell, search latency and near-duplicates flagged."""
+    return jsonify({"status": "success", "data": sms_index.stats()})
+
+@health_bp.route("/templates/stats", methods=["GET"])
+def template_stats():
+    """Reports learned SMS templates and per-sender hit rates."""
+    return jsonify({"status": "success", "data": template_learner.stats()})
+
+@health_bp.route("/response-cache/stats", methods=["GET"])
+def response_cache_stats_route():
+    """Reports read-endpoint response cache counters."""
+    return jsonify({"status": "success", "data": response_cache_stats()})
+
+@health_bp.route("/db-pool/stats", methods=["GET"])
+def db_pool_stats():
+    """Reports connection pool size, checkout wait times and exhaustion events."""
+    return jsonify({"status": "success", "data": pool_stats()})
+
 @app.route('/api/', methods=['GET'])
 def api_root():
     return jsonify({
@@ -713,14 +762,20 @@ app.register_blueprint(bills_bp, url_prefix="/api")
 app.register_blueprint(categories_bp, url_prefix="/api")
 app.register_blueprint(budgets_bp, url_prefix="/api")
 app.register_blueprint(wallets_bp, url_prefix="/api")
+app.register_blueprint(jobs_bp, url_prefix="/api")
+
+
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+}
 
 
 @app.after_request
 def set_security_headers(resp):
     """Set security headers for all responses."""
-    resp.headers["X-Content-Type-Options"] = "nosniff"
-    resp.headers["X-Frame-Options"] = "DENY"
-    resp.headers["X-XSS-Protection"] = "1; mode=block"
+    resp.headers.update(SECURITY_HEADERS)
     return resp
 
 
@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+from sklearn.pipeline import Pipeline
+
+from model_registry import model_registry
+
+load_dotenv()
+
+logger = logging.getLogger("spendsense.category_model")
+
+# === Config ===
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+CATEGORY_MODEL_ENABLED = os.getenv("CATEGORY_MODEL_ENABLED", "true").lower() == "true"
+CATEGORY_MODEL_PATH = os.getenv("CATEGORY_MODEL_PATH", os.path.join(MODELS_DIR, "category_classifier.pkl"))
+CATEGORY_ENCODER_PATH = os.getenv("CATEGORY_ENCODER_PATH", os.path.join(MODELS_DIR, "label_encoder.pkl"))
+CATEGORY_EMBEDDER = os.getenv("CATEGORY_EMBEDDER", "all-MiniLM-L6-v2")
+CATEGORY_CONFIDENCE = float(os.getenv("CATEGORY_CONFIDENCE", "0.7"))
+CATEGORY_TOP_K = int(os.getenv("CATEGORY_TOP_K", "3"))
+CATEGORY_BATCH_SIZE = int(os.getenv("CATEGORY_BATCH_SIZE", "64"))
+
+
+# === Embedders ===
+def load_embedder(name: str):
+    """Returns an object with ``encode(texts, batch_size) -> ndarray``.
+
+    Used for classifiers trained on sentence-transformer embeddings (the
+    shipped MiniLM model); ``sentence_transformers`` is imported here so
+    the API still starts without it.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(name, device="cpu")
+
+
+# === Model ===
+class CategoryModel:
+    """The trained category classifier, loaded once per process.
+
+    ``predict`` embeds a whole batch, scores it with a single
+    ``predict_proba`` call and returns each text's top-k categories.
+    Artifacts trained with ``categorization.py --backend hashing|tfidf`` are
+    pipelines that featurize raw text themselves, so no embedder (and no
+    torch) is loaded for them.
+    """
+
+    def __init__(self, model_path: str, encoder_path: str, embedder: str, enabled: bool = True):
+        self.model_path = model_path
+        self.encoder_path = encoder_path
+        self.embedder_name = embedder
+        self.clf = None
+        self.classes: Optional[np.ndarray] = None
+        self.embedder = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.predicted = 0
+        self.confident = 0
+        self.total_ms = 0.0
+        if enabled:
+            self.load()
+
+    @property
+    def ready(self) -> bool:
+        return self.clf is not None
+
+    def load(self) -> bool:
+        """Loads the classifier, label encoder and embedder; False leaves the model off."""
+        if not (os.path.exists(self.model_path) and os.path.exists(self.encoder_path)):
+            logger.warning("Category model or label encoder not found. Categories come from the LLM.")
+            return False
+        start = time.perf_counter()
+        try:
+            clf = model_registry.load(self.model_path)
+            encoder = model_registry.load(self.encoder_path)
+            if isinstance(clf, Pipeline):
+                embedder = None
+                self.embedder_name = f"pipeline:{type(clf.steps[0][1]).__name__}"
+            else:
+                embedder = load_embedder(self.embedder_name)
+        except Exception as e:
+            logger.warning(f"Category model unavailable ({e}). Categories come from the LLM.")
+            return False
+        self.embedder, self.clf = embedder, clf
+        # predict_proba columns follow clf.classes_, which index the encoder's labels.
+        self.classes = np.asarray(encoder.classes_)[clf.classes_]
+        logger.info(
+            f"✅ Category model loaded: {len(self.classes)} categories, "
+            f"embedder {self.embedder_name} ({time.perf_counter() - start:.1f}s)"
+        )
+        return True
+
+    def predict_proba(self, texts: Sequence[str], features: Optional[np.ndarray] = None) -> np.ndarray:
+        """Class probabilities for every text, one embedding batch and one predict_proba call.
+
+        ``features`` are embeddings of ``texts`` already computed with this
+        model's embedder; they are used instead of encoding again.
+        """
+        start = time.perf_counter()
+        if features is None and self.embedder is None:
+            features = list(texts)
+        elif features is None:
+            features = self.embedder.encode(list(texts), batch_size=CATEGORY_BATCH_SIZE)
+        probs = self.clf.predict_proba(features)
+        with self._lock:
+            self.batches += 1
+            self.predicted += len(texts)
+            self.total_ms += (time.perf_counter() - start) * 1000
+        return probs
+
+    def predict(
+        self, texts: Sequence[str], top_k: int = CATEGORY_TOP_K, features: Optional[np.ndarray] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Top-k ``{"category", "confidence"}`` per text, best first."""
+        if not texts:
+            return []
+        probs = self.predict_proba(texts, features)
+        top = np.argsort(-probs, axis=1)[:, :top_k]
+        return [
+            [{"category": str(self.classes[j]), "confidence": round(float(row[j]), 4)} for j in idx]
+            for row, idx in zip(probs, top)
+        ]
+
+    def record_confident(self, count: int) -> None:
+        with self._lock:
+            self.confident += count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "embedder": self.embedder_name,
+                "categories": len(self.classes) if self.classes is not None else 0,
+                "confidence_threshold": CATEGORY_CONFIDENCE,
+                "batches": self.batches,
+                "predicted": self.predicted,
+                "confident": self.confident,
+                "avg_ms_per_message": round(self.total_ms / self.predicted, 3) if self.predicted else None,
+            }
+
+
+category_model = CategoryModel(
+    CATEGORY_MODEL_PATH, CATEGORY_ENCODER_PATH, CATEGORY_EMBEDDER, CATEGORY_MODEL_ENABLED
+)
@@ -1,6 +1,12 @@
 import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from time import monotonic
+
 import psycopg2
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg2.pool import PoolError
 from psycopg2.extras import RealDictCursor
 import logging
 from dotenv import load_dotenv
@@ -11,6 +17,10 @@ logger = logging.getLogger("spendsense.database")
 
 POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
 POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))
+POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "5"))
 
 DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
@@ -24,13 +34,206 @@ _missing = [k for k, v in DB_CONFIG.items() if not v]
 if _missing:
     logger.warning(f"⚠️ Missing DB env vars: {', '.join(_missing)}")
 
-_db_pool: SimpleConnectionPool | None = None
+
+class PoolTimeout(PoolError):
+    """No connection became free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 pool with blocking checkout and health checks.
+
+    Checkout waits up to ``timeout`` seconds for a free connection instead of
+    raising at once. Connections older than ``max_lifetime`` or idle longer
+    than ``max_idle`` are closed and replaced. Every checkout sweeps them
+    from the whole idle queue, since it only hands out the most recently
+    used connection and would never reach the others. Ones idle longer than
+    ``ping_after`` are pinged before being handed out. Returned connections
+    are rolled back if a transaction was left open.
+    """
+
+    def __init__(self, minconn, maxconn, timeout=POOL_TIMEOUT, max_lifetime=POOL_MAX_LIFETIME,
+                 max_idle=POOL_MAX_IDLE, ping_after=POOL_PING_AFTER, **kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        self._kwargs = kwargs
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, returned_at), most recently used on the right
+        self._born = {}  # conn -> created_at
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.exhaustion_events = 0
+        self.timeouts = 0
+        self.recycled = 0
+        self.ping_failures = 0
+        for _ in range(minconn):
+            conn = self._connect()
+            self._size += 1
+            self._idle.append((conn, monotonic()))
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._kwargs)
+        self._born[conn] = monotonic()
+        return conn
+
+    def _discard(self, conn):
+        self._born.pop(conn, None)
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _expired(self, conn, returned_at, now):
+        return now - self._born.get(conn, now) > self.max_lifetime or now - returned_at > self.max_idle
+
+    def _sweep(self):
+        """Takes every expired connection out of the idle queue; call with the lock held."""
+        now = monotonic()
+        expired = [conn for conn, returned_at in self._idle if self._expired(conn, returned_at, now)]
+        if expired:
+            self._idle = deque(item for item in self._idle if not self._expired(item[0], item[1], now))
+            self._size -= len(expired)
+            self.recycled += len(expired)
+        return expired
+
+    def _healthy(self, conn, returned_at):
+        now = monotonic()
+        if conn.closed:
+            return False
+        if self._expired(conn, returned_at, now):
+            self.recycled += 1
+            return False
+        if now - returned_at > self.ping_after:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                self.ping_failures += 1
+                return False
+        return True
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        start = monotonic()
+        waited = False
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                expired = self._sweep()
+                while not self._idle and self._size >= self.maxconn:
+                    if not waited:
+                        self.exhaustion_events += 1
+                        waited = True
+                    remaining = start + timeout - monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"no connection available within {timeout}s")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                else:
+                    conn, returned_at = None, None
+                    self._size += 1
+                self._in_use += 1
+
+            for stale in expired:
+                self._discard(stale)
+            if conn is not None and not self._healthy(conn, returned_at):
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except psycopg2.Error:
+                    with self._cond:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+            break
+
+        wait = monotonic() - start
+        with self._cond:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+        return conn
+
+    def putconn(self, conn, close=False):
+        if not close and not conn.closed and conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                close = True
+        if close or conn.closed or self._closed:
+            self._discard(conn)
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append((conn, monotonic()))
+            self._in_use -= 1
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "max": self.maxconn,
+                "checkouts": self.checkouts,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "exhaustion_events": self.exhaustion_events,
+                "timeouts": self.timeouts,
+                "recycled": self.recycled,
+                "ping_failures": self.ping_failures,
+            }
+
+
+_db_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
 
 def init_pool():
     global _db_pool
-    if _db_pool is None:
-        _db_pool = SimpleConnectionPool(POOL_MIN, POOL_MAX, **DB_CONFIG)
-        logger.info(f"✅ DB pool initialized (min={POOL_MIN}, max={POOL_MAX})")
+    with _pool_lock:
+        if _db_pool is None:
+            _db_pool = ConnectionPool(POOL_MIN, POOL_MAX, **DB_CONFIG)
+            logger.info(f"✅ DB pool initialized (min={POOL_MIN}, max={POOL_MAX})")
+
+def reset_pool():
+    """Closes the pool and forgets it; the next checkout builds a fresh one.
+
+    A pre-forking server calls this in the master, so forked workers never
+    share the master's sockets.
+    """
+    global _db_pool
+    with _pool_lock:
+        if _db_pool is not None:
+            _db_pool.closeall()
+            _db_pool = None
 
 def get_db_connection():
     if _db_pool is None:
@@ -41,19 +244,36 @@ def put_db_connection(conn):
     if _db_pool and conn:
         _db_pool.putconn(conn)
 
+@contextmanager
+def db_connection():
+    """Checks a pooled connection out for a ``with`` block.
+
+    Rolls back if the block raises and always returns the connection, so
+    callers only commit on success.
+    """
+    conn = get_db_connection()
+    try:
+        yield conn
+    except BaseException:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            pass
+        raise
+    finally:
+        put_db_connection(conn)
+
+def pool_stats():
+    return _db_pool.stats() if _db_pool else {}
+
 def init_db():
-    conn = None
-    cur = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        with open('database.sql', 'r') as f:
-            cur.execute(f.read())
-        conn.commit()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            with open('database.sql', 'r') as f:
+                cur.execute(f.read())
+            conn.commit()
+            cur.close()
         logger.info("✅ Database initialized successfully from database.sql.")
     except Exception as e:
         logger.error(f"❌ DB Init Failed: {e}")
-        if conn: conn.rollback()
-    finally:
-        if cur: cur.close()
-        if conn: put_db_connection(conn)
\ No newline at end of file
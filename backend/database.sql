@@ -14,9 +14,13 @@ CREATE TABLE IF NOT EXISTS sms_records (
     date TIMESTAMP,                         -- Transaction date
     balance NUMERIC(15, 2),                 -- Remaining balance
     sender VARCHAR(255) NOT NULL,           -- SMS sender (bank, service)
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sms_hash CHAR(64)                       -- sha256 of whitespace-normalized SMS, for dedup
 );
 
+-- Added after first release; existing rows are hashed by `python maintenance.py backfill-sms-hash`.
+ALTER TABLE sms_records ADD COLUMN IF NOT EXISTS sms_hash CHAR(64);
+
 -- Bills table
 CREATE TABLE IF NOT EXISTS bills (
     id SERIAL PRIMARY KEY,
@@ -53,14 +57,65 @@ CREATE TABLE IF NOT EXISTS wallets (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Monthly rollup of sms_records per user, category and txn_type (kept in step by predict_bulk)
+CREATE TABLE IF NOT EXISTS sms_monthly_aggregates (
+    uid VARCHAR(255) NOT NULL,
+    month DATE NOT NULL,                    -- First day of the created_at month
+    category VARCHAR(100) NOT NULL,         -- '' when the record has no category
+    txn_type VARCHAR(50) NOT NULL,          -- Credit / Debit
+    total NUMERIC(15, 2),                   -- SUM(amount); NULL if no amounts
+    txn_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (uid, month, category, txn_type)
+);
+
+-- Parse cache table (shared tier of the SMS parse cache, keyed by normalized SMS hash)
+CREATE TABLE IF NOT EXISTS sms_parse_cache (
+    sms_hash CHAR(64) PRIMARY KEY,          -- sha256 of whitespace-normalized SMS
+    result JSONB NOT NULL,                  -- Parsed transaction fields
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Ingest jobs table (queue for /predictions-bulk?async=true, drained by ingest_worker.py)
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    id SERIAL PRIMARY KEY,
+    uid VARCHAR(255) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued', -- queued / running / done / failed
+    payload JSONB,                          -- Messages to ingest; cleared once the job finishes
+    total INTEGER NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,   -- Messages handled so far; the resume offset
+    inserted INTEGER NOT NULL DEFAULT 0,
+    duplicates INTEGER NOT NULL DEFAULT 0,
+    promotional INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    worker VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+-- Response cache versions (bumped on every write for a uid; read-endpoint cache keys include it)
+CREATE TABLE IF NOT EXISTS response_cache_versions (
+    uid VARCHAR(255) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
 -- Indexes for performance
 -- Note: CREATE INDEX IF NOT EXISTS is available in PostgreSQL 9.5+
 -- If using an older version, you might need to handle this differently.
-DO $
+DO $$
 BEGIN
     IF NOT EXISTS (SELECT 1 FROM pg_class c WHERE c.relname = 'idx_uid_sms' AND c.relkind = 'i') THEN
         CREATE INDEX idx_uid_sms ON sms_records(uid);
     END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_class c WHERE c.relname = 'idx_uid_sms_hash' AND c.relkind = 'i') THEN
+        CREATE UNIQUE INDEX idx_uid_sms_hash ON sms_records(uid, sms_hash);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_class c WHERE c.relname = 'idx_uid_created_id_sms' AND c.relkind = 'i') THEN
+        CREATE INDEX idx_uid_created_id_sms ON sms_records(uid, created_at DESC, id DESC);
+    END IF;
     IF NOT EXISTS (SELECT 1 FROM pg_class c WHERE c.relname = 'idx_uid_bills' AND c.relkind = 'i') THEN
         CREATE INDEX idx_uid_bills ON bills(user_id);
     END IF;
@@ -79,8 +134,11 @@ BEGIN
     IF NOT EXISTS (SELECT 1 FROM pg_class c WHERE c.relname = 'idx_uid_wallets' AND c.relkind = 'i') THEN
         CREATE INDEX idx_uid_wallets ON wallets(uid);
     END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_class c WHERE c.relname = 'idx_status_ingest_jobs' AND c.relkind = 'i') THEN
+        CREATE INDEX idx_status_ingest_jobs ON ingest_jobs(status, id) WHERE status IN ('queued', 'running');
+    END IF;
 END
-$;
+$$;
 
 -- Alter table commands (examples)
 -- These are commented out by default. Uncomment and modify as needed.
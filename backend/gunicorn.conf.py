@@ -0,0 +1,31 @@
+"""Gunicorn settings for the Flask API.
+
+Run from the ``backend`` directory:
+    gunicorn -c gunicorn.conf.py categorizer_API:app
+
+With ``preload_app`` the master imports the app, and with it every model
+artifact, once; forked workers share those pages copy-on-write instead of
+each unpickling its own copy.
+"""
+import gc
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def pre_fork(server, worker):
+    # The master opened DB connections while importing the app (init_db).
+    from database import reset_pool
+
+    reset_pool()
+    # Move the master's objects out of the collector's reach: a GC pass in a
+    # worker would otherwise write to their headers and un-share their pages.
+    gc.freeze()
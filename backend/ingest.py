@@ -0,0 +1,347 @@
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import aggregates
+from bulk_write import bulk_insert
+from category_model import CATEGORY_CONFIDENCE, category_model
+from llm_extraction import HUGGINGFACE_API_KEY, query_llm_bulk
+from parse_cache import parse_cache, sms_cache_key
+from promo_filter import promo_filter
+from sms_index import sms_index
+from sms_regex import parse_sms_with_regex
+from sms_templates import template_learner
+
+logger = logging.getLogger("spendsense.ingest")
+
+SMS_RECORD_COLUMNS = (
+    "uid", "sms", "category", "amount", "txn_type", "mode", "ref_no",
+    "account", "date", "balance", "sender", "created_at", "sms_hash",
+)
+
+
+# === Parsing ===
+def merge_llm_result(sms: str, llm_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Fills fields the LLM left empty with the regex parse."""
+    if not llm_result or not all(
+        llm_result.get(k) for k in ["amount", "txn_type", "vendor", "category"]
+    ):
+        regex_result = parse_sms_with_regex(sms)
+        return {**regex_result, **llm_result}
+    return llm_result
+
+
+def resolve_known_parses(
+    sms_list: List[str], senders: Optional[List[Optional[str]]] = None, embeddings=None
+):
+    """Parses what it can of a batch without calling the LLM.
+
+    Results are looked up by normalized-SMS hash, so repeated messages reach
+    the LLM at most once; messages matching a learned sender template are
+    filled by slot lookup. Returns ``(keys, parsed, pending)``: the hash of each message, results
+    already known from the parse cache, a sender template or a confident
+    category model prediction, and the (sms, sender) still needing the LLM,
+    once per distinct hash. ``embeddings`` (one row per message, from the
+    category model's embedder) spare the model encoding them again.
+    """
+    senders = senders or [None] * len(sms_list)
+    keys = [sms_cache_key(sms) for sms in sms_list]
+    parsed = parse_cache.get_many(keys)
+    pending = {}
+    for key, sms, sender in zip(keys, sms_list, senders):
+        if key in parsed or key in pending:
+            continue
+        templated = template_learner.extract(sms, sender)
+        if templated is not None:
+            parsed[key] = templated
+        else:
+            pending[key] = (sms, sender)
+    if pending and category_model.ready:
+        rows = None if embeddings is None else dict(zip(keys, embeddings))
+        classify_pending(parsed, pending, rows)
+    if pending and not HUGGINGFACE_API_KEY:
+        logger.warning("HF_API_KEY not set. Falling back to regex.")
+    return keys, parsed, pending
+
+
+def classify_pending(parsed, pending, embeddings=None) -> None:
+    """Settles pending messages with the in-process category model.
+
+    A message skips the LLM when the model's top category reaches
+    ``CATEGORY_CONFIDENCE`` and the regex parse found its amount and
+    direction; the other fields come from that regex parse. Like regex
+    fallbacks, these results are cheap to redo and are not cached.
+    """
+    keys = list(pending)
+    features = None if embeddings is None else np.stack([embeddings[key] for key in keys])
+    predictions = category_model.predict([pending[key][0] for key in keys], features=features)
+    settled = 0
+    for key, top_k in zip(keys, predictions):
+        if top_k[0]["confidence"] < CATEGORY_CONFIDENCE:
+            continue
+        regex_result = parse_sms_with_regex(pending[key][0])
+        if not (regex_result.get("amount") and regex_result.get("txn_type")):
+            continue
+        parsed[key] = {**regex_result, "category": top_k[0]["category"], "category_top_k": top_k}
+        del pending[key]
+        settled += 1
+    category_model.record_confident(settled)
+
+
+def finish_parses(keys, parsed, pending, llm_results) -> List[Dict[str, Any]]:
+    """Folds in the LLM answers for ``pending`` and returns the parses in input order.
+
+    Only LLM-backed parses are cached and taught to the template learner;
+    regex fallbacks are cheap to redo and should not pin a degraded result.
+    """
+    fresh = {}
+    for (key, (sms, sender)), llm_result in zip(pending.items(), llm_results):
+        if llm_result is None:
+            parsed[key] = parse_sms_with_regex(sms)
+        else:
+            parsed[key] = fresh[key] = merge_llm_result(sms, llm_result)
+            template_learner.learn(sms, sender, parsed[key])
+    parse_cache.set_many(fresh)
+    return [parsed[key] for key in keys]
+
+
+# === Batches ===
+def split_bulk_messages(messages: List[Dict[str, Any]]):
+    """Drops promotional messages and repeats within the payload.
+
+    The whole batch is scored by ``promo_filter`` in one pass. Returns
+    ``(candidates, promotional, llm_calls_avoided)``: the first message per
+    SMS hash, how many messages were promotional or empty, and how many
+    distinct non-empty messages the filter kept away from the parser.
+    """
+    flags = promo_filter.flag([msg.get("sms") for msg in messages])
+    candidates = {}
+    dropped = set()
+    promotional = 0
+    for msg, is_promo in zip(messages, flags):
+        sms = msg.get("sms")
+        if is_promo:
+            promotional += 1
+            if sms:
+                dropped.add(sms_cache_key(sms))
+            continue
+        candidates.setdefault(sms_cache_key(sms), msg)
+    llm_calls_avoided = len(dropped - candidates.keys())
+    promo_filter.record_avoided(llm_calls_avoided)
+    return candidates, promotional, llm_calls_avoided
+
+
+def build_sms_rows(uid: str, kept, parsed_list, timestamp: datetime):
+    """Turns parsed messages into sms_records rows and response entries keyed by hash."""
+    results = {}
+    insert_values = []
+    for (sms_hash, msg), parsed in zip(kept, parsed_list):
+        sms = msg.get("sms")
+        sender = msg.get("sender")
+        amount = float(parsed["amount"]) if parsed.get("amount") else None
+        balance = float(parsed["balance"]) if parsed.get("balance") else None
+        txn_type = parsed.get("txn_type")
+        category = parsed.get("category", "Other")
+        insert_values.append(
+            (
+                uid,
+                sms,
+                category,
+                amount,
+                txn_type,
+                parsed.get("mode"),
+                parsed.get("ref_no"),
+                parsed.get("account"),
+                parsed.get("date"),
+                balance,
+                sender,
+                timestamp,
+                sms_hash,
+            )
+        )
+        results[sms_hash] = {
+            "uid": uid,
+            "sms": sms,
+            "sender": sender,
+            "category": category,
+            "amount": amount,
+            "txn_type": txn_type,
+            "mode": parsed.get("mode"),
+            "ref_no": parsed.get("ref_no"),
+            "account": parsed.get("account"),
+            "date": parsed.get("date"),
+            "balance": balance,
+            "created_at": timestamp.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        if "category_top_k" in parsed:
+            results[sms_hash]["category_top_k"] = parsed["category_top_k"]
+    return insert_values, results
+
+
+def embed_for_ingest(sms_list: List[str]):
+    """``(index vectors, category model features)`` for one batch, encoded once.
+
+    Both are None without a loaded SMS index. The index vectors double as
+    category model features only when both use the same embedder object.
+    """
+    if not (sms_list and sms_index.ready):
+        return None, None
+    vectors = sms_index.embed(sms_list)
+    return vectors, vectors if sms_index.embedder is category_model.embedder else None
+
+
+def flag_near_duplicates(kept, results, vectors) -> None:
+    """Marks messages nearly identical to an indexed SMS with a ``near_duplicate`` entry."""
+    if vectors is None:
+        return
+    matches = sms_index.find_near_duplicates(vectors)
+    for (sms_hash, _), match in zip(kept, matches):
+        if match is not None:
+            results[sms_hash]["near_duplicate"] = match
+
+
+def bulk_prediction_body(
+    inserted_hashes, results, duplicates: int, promotional: int, llm_calls_avoided: int = 0
+) -> Dict[str, Any]:
+    """Builds the predict_bulk response from the hashes that were actually inserted."""
+    # Rows lost to a concurrent sync of the same messages count as duplicates.
+    data = [results[h] for h in inserted_hashes]
+    return {
+        "status": "success",
+        "count": len(data),
+        "skipped": {
+            "duplicates": duplicates + len(results) - len(data),
+            "promotional": promotional,
+        },
+        "llm_calls_avoided": llm_calls_avoided,
+        "data": data,
+    }
+
+
+# === Ingestion ===
+# Same placeholder trick as ``aggregates``: psycopg2 and asyncpg spell them differently.
+_EXISTING_HASHES = "SELECT sms_hash FROM sms_records WHERE uid = {uid} AND sms_hash = ANY({hashes})"
+
+
+def existing_hashes(cur, uid: str, sms_hashes: List[str]) -> set:
+    """The hashes among ``sms_hashes`` this user already synced."""
+    if not sms_hashes:
+        return set()
+    cur.execute(_EXISTING_HASHES.format(uid="%s", hashes="%s"), (uid, sms_hashes))
+    return {row[0] for row in cur.fetchall()}
+
+
+async def existing_hashes_async(conn, uid: str, sms_hashes: List[str]) -> set:
+    """``existing_hashes`` for an asyncpg connection or pool."""
+    if not sms_hashes:
+        return set()
+    rows = await conn.fetch(_EXISTING_HASHES.format(uid="$1", hashes="$2::bpchar[]"), uid, sms_hashes)
+    return {row["sms_hash"] for row in rows}
+
+
+class IngestBatch:
+    """One ``/predictions-bulk`` batch, from payload to response body.
+
+    Holds every step that does not touch ``sms_records`` or the LLM, so
+    ``ingest_messages`` and the async ``asgi_app.predict_bulk`` only differ
+    in how they run those::
+
+        batch = IngestBatch(uid, messages, timestamp)
+        batch.skip_existing(<hashes of batch.candidates already stored>)
+        texts = batch.resolve()                      # messages needing the LLM
+        insert_values = batch.finish(<LLM answers for texts>)
+        body = batch.body(<hashes actually inserted>)
+    """
+
+    def __init__(self, uid: str, messages: List[Dict[str, Any]], timestamp: datetime):
+        self.uid = uid
+        self.timestamp = timestamp
+        self.candidates, self.promotional, self.llm_calls_avoided = split_bulk_messages(messages)
+        self.duplicates = len(messages) - self.promotional - len(self.candidates)
+        self.kept = list(self.candidates.items())
+        self.results = {}
+        self._vectors = None
+        self._parses = None
+
+    def skip_existing(self, existing) -> None:
+        """Drops messages this user already synced, so they are never parsed."""
+        self.kept = [(h, msg) for h, msg in self.kept if h not in existing]
+        self.duplicates += len(self.candidates) - len(self.kept)
+
+    def resolve(self) -> List[str]:
+        """Embeds the kept messages once and settles all it can without the LLM.
+
+        Returns the texts still needing an LLM parse, in the order
+        ``finish`` expects their answers.
+        """
+        sms_list = [msg["sms"] for _, msg in self.kept]
+        self._vectors, features = embed_for_ingest(sms_list)
+        self._parses = resolve_known_parses(sms_list, [msg.get("sender") for _, msg in self.kept], features)
+        return [sms for sms, _ in self._parses[2].values()]
+
+    def finish(self, llm_results) -> List[tuple]:
+        """Folds in the LLM answers and returns the sms_records rows to insert."""
+        parsed_list = finish_parses(*self._parses, llm_results)
+        insert_values, self.results = build_sms_rows(self.uid, self.kept, parsed_list, self.timestamp)
+        flag_near_duplicates(self.kept, self.results, self._vectors)
+        return insert_values
+
+    def body(self, inserted_hashes) -> Dict[str, Any]:
+        """The response body, given the hashes the insert actually wrote."""
+        return bulk_prediction_body(
+            inserted_hashes, self.results, self.duplicates, self.promotional, self.llm_calls_avoided
+        )
+
+
+def ingest_messages(cur, uid: str, messages: List[Dict[str, Any]], timestamp: datetime) -> Dict[str, Any]:
+    """Parses one batch of messages and inserts the new ones on ``cur``.
+
+    Messages this user already synced are skipped before parsing. The
+    monthly rollup is updated on the same cursor; the caller commits.
+    Returns the ``/predictions-bulk`` response body.
+    """
+    batch = IngestBatch(uid, messages, timestamp)
+    batch.skip_existing(existing_hashes(cur, uid, list(batch.candidates)))
+    insert_values = batch.finish(query_llm_bulk(batch.resolve()))
+
+    inserted = []
+    if insert_values:
+        inserted = bulk_insert(
+            cur,
+            "sms_records",
+            SMS_RECORD_COLUMNS,
+            insert_values,
+            on_conflict="ON CONFLICT (uid, sms_hash) DO NOTHING",
+            returning=("sms_hash",),
+        )
+        aggregates.apply_inserted_records(cur, uid, [row[0] for row in inserted])
+    return batch.body([row[0] for row in inserted])
+
+
+# === Streaming ===
+def iter_ndjson(stream, max_line_bytes: int) -> Iterator[Tuple[int, Any, Optional[str]]]:
+    """Yields ``(line_no, obj, error)`` per non-blank line of an NDJSON body.
+
+    Reads one line at a time, so only the current line is held in memory.
+    A line longer than ``max_line_bytes`` is drained and reported as an error.
+    """
+    line_no = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        line_no += 1
+        if len(line) > max_line_bytes and not line.endswith(b"\n"):
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(max_line_bytes + 1)
+            yield line_no, None, f"line longer than {max_line_bytes} bytes"
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line), None
+        except ValueError:
+            yield line_no, None, "invalid JSON"
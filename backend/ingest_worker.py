@@ -0,0 +1,91 @@
+"""Worker pool that drains the ingest_jobs queue.
+
+Run from the ``backend`` directory, as many copies and on as many hosts as
+needed; jobs are claimed with ``FOR UPDATE SKIP LOCKED``:
+    python ingest_worker.py [--processes 2] [--chunk 200] [--poll 1.0]
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+import psycopg2
+
+from database import db_connection, init_db
+from jobs import INGEST_JOB_CHUNK, INGEST_JOB_MAX_ATTEMPTS, claim_job, finish_job, run_job
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger("spendsense.ingest_worker")
+
+
+def work(chunk_size: int, poll: float, stop) -> None:
+    """Claims and runs jobs until ``stop`` is set."""
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"👷 Ingest worker {worker} started")
+
+    while not stop.is_set():
+        try:
+            with db_connection() as conn:
+                cur = conn.cursor()
+                job = claim_job(cur, worker)
+                conn.commit()
+                if job is None:
+                    stop.wait(poll)
+                    continue
+
+                job_id, uid, _, total, processed, attempts = job
+                if attempts > INGEST_JOB_MAX_ATTEMPTS:
+                    finish_job(cur, job_id, worker, "failed", error=f"gave up after {attempts - 1} attempts")
+                    conn.commit()
+                    logger.error(f"Job {job_id} failed: too many attempts")
+                    continue
+
+                logger.info(f"Job {job_id} for {uid}: {processed}/{total} done, resuming")
+                start = time.perf_counter()
+                if run_job(conn, job, worker, chunk_size, stop.is_set):
+                    elapsed = time.perf_counter() - start
+                    logger.info(
+                        f"✅ Job {job_id} finished: {total - processed} messages in {elapsed:.1f}s"
+                    )
+        except psycopg2.Error as e:
+            logger.error(f"Database error in ingest worker: {e}")
+            stop.wait(poll)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SpendSense bulk SMS ingestion worker")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--chunk", type=int, default=INGEST_JOB_CHUNK, help="messages per commit")
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between empty polls")
+    args = parser.parse_args()
+
+    init_db()
+    # Spawn, not fork, so no child inherits the parent's pooled connections.
+    ctx = multiprocessing.get_context("spawn")
+    stop = ctx.Event()
+    if args.processes <= 1:
+        work(args.chunk, args.poll, stop)
+        return
+
+    procs = [
+        ctx.Process(target=work, args=(args.chunk, args.poll, stop))
+        for _ in range(args.processes)
+    ]
+    for proc in procs:
+        proc.start()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    for proc in procs:
+        proc.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extras import Json
+
+from ingest import ingest_messages
+from llm_extraction import LLM_TIME_BUDGET
+from response_cache import bump_version
+
+load_dotenv()
+
+logger = logging.getLogger("spendsense.jobs")
+
+# === Config ===
+INGEST_ASYNC_THRESHOLD = int(os.getenv("INGEST_ASYNC_THRESHOLD", "0"))  # 0: only on ?async=true
+INGEST_JOB_CHUNK = int(os.getenv("INGEST_JOB_CHUNK", "200"))
+INGEST_JOB_MAX_ATTEMPTS = int(os.getenv("INGEST_JOB_MAX_ATTEMPTS", "3"))
+INGEST_CHUNK_RETRIES = int(os.getenv("INGEST_CHUNK_RETRIES", "2"))
+# Seconds without a heartbeat before another worker may reclaim a job. A
+# heartbeat is sent before every chunk attempt, and one attempt can spend the
+# whole LLM time budget, so the default covers every attempt of a chunk plus
+# a margin for the database work around them.
+INGEST_JOB_STALE = float(
+    os.getenv("INGEST_JOB_STALE", LLM_TIME_BUDGET * (INGEST_CHUNK_RETRIES + 1) + 60)
+)
+
+# Formatted with psycopg2 or asyncpg placeholders, like ``aggregates._APPLY_INSERTED``.
+_ENQUEUE = "INSERT INTO ingest_jobs (uid, payload, total) VALUES ({uid}, {payload}, {total}) RETURNING id"
+
+# Takes the oldest queued job, or a running one whose worker stopped sending
+# heartbeats. SKIP LOCKED lets many workers poll without queueing on each
+# other's row locks.
+CLAIM_SQL = """
+    UPDATE ingest_jobs
+    SET status = 'running', worker = %s, attempts = attempts + 1,
+        started_at = COALESCE(started_at, NOW()), heartbeat_at = NOW()
+    WHERE id = (
+        SELECT id FROM ingest_jobs
+        WHERE status = 'queued'
+           OR (status = 'running' AND heartbeat_at < NOW() - make_interval(secs => %s))
+        ORDER BY id
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, uid, payload, total, processed, attempts
+"""
+
+
+# === Queue ===
+def wants_job(args, message_count: int) -> bool:
+    """True if a /predictions-bulk request should be queued instead of run inline."""
+    if args.get("async", "").lower() in ("1", "true", "yes"):
+        return True
+    return bool(INGEST_ASYNC_THRESHOLD) and message_count >= INGEST_ASYNC_THRESHOLD
+
+
+def accepted_body(job_id: int, total: int) -> Dict[str, Any]:
+    """The 202 body pointing the client at ``GET /api/jobs/<id>``."""
+    return {
+        "status": "accepted",
+        "job_id": job_id,
+        "total": total,
+        "status_url": f"/api/jobs/{job_id}",
+    }
+
+
+def enqueue_ingest(cur, uid: str, messages: List[Dict[str, Any]]) -> int:
+    """Queues a batch for ``ingest_worker.py``; the caller commits."""
+    cur.execute(_ENQUEUE.format(uid="%s", payload="%s", total="%s"), (uid, Json(messages), len(messages)))
+    return cur.fetchone()[0]
+
+
+async def enqueue_ingest_async(conn, uid: str, messages: List[Dict[str, Any]]) -> int:
+    """``enqueue_ingest`` for an asyncpg connection or pool."""
+    return await conn.fetchval(
+        _ENQUEUE.format(uid="$1", payload="$2::jsonb", total="$3"), uid, json.dumps(messages), len(messages)
+    )
+
+
+def claim_job(cur, worker: str) -> Optional[tuple]:
+    """Claims one job; returns (id, uid, payload, total, processed, attempts) or None."""
+    cur.execute(CLAIM_SQL, (worker, INGEST_JOB_STALE))
+    return cur.fetchone()
+
+
+# The job-updating helpers below only touch a job still held by ``worker`` and
+# return False once another worker has reclaimed it as stale, so a slow worker
+# can never advance counters alongside the new owner.
+def heartbeat(cur, job_id: int, worker: str) -> bool:
+    """Tells other workers this job is still being worked on; the caller commits."""
+    cur.execute("UPDATE ingest_jobs SET heartbeat_at = NOW() WHERE id = %s AND worker = %s", (job_id, worker))
+    return cur.rowcount > 0
+
+
+def record_chunk(
+    cur, job_id: int, worker: str, size: int, body: Optional[Dict[str, Any]], error: Optional[str] = None
+) -> bool:
+    """Advances a job past ``size`` messages; ``body`` is None if they failed."""
+    if body is None:
+        counts = (0, 0, 0, size)
+    else:
+        skipped = body["skipped"]
+        counts = (body["count"], skipped["duplicates"], skipped["promotional"], 0)
+    cur.execute(
+        """UPDATE ingest_jobs
+        SET processed = processed + %s, inserted = inserted + %s, duplicates = duplicates + %s,
+            promotional = promotional + %s, failed = failed + %s,
+            error = COALESCE(%s, error), heartbeat_at = NOW()
+        WHERE id = %s AND worker = %s""",
+        (size, *counts, error, job_id, worker),
+    )
+    return cur.rowcount > 0
+
+
+def finish_job(cur, job_id: int, worker: str, status: str, error: Optional[str] = None) -> bool:
+    """Marks a job done or failed and drops its payload."""
+    cur.execute(
+        """UPDATE ingest_jobs
+        SET status = %s, error = COALESCE(%s, error), payload = NULL,
+            finished_at = NOW(), heartbeat_at = NOW()
+        WHERE id = %s AND worker = %s""",
+        (status, error, job_id, worker),
+    )
+    return cur.rowcount > 0
+
+
+def release_job(cur, job_id: int, worker: str) -> bool:
+    """Hands a job back to the queue, e.g. when its worker shuts down."""
+    cur.execute(
+        """UPDATE ingest_jobs SET status = 'queued', worker = NULL, attempts = attempts - 1
+        WHERE id = %s AND worker = %s AND status = 'running'""",
+        (job_id, worker),
+    )
+    return cur.rowcount > 0
+
+
+# === Worker ===
+def run_job(
+    conn,
+    job: tuple,
+    worker: str,
+    chunk_size: int = INGEST_JOB_CHUNK,
+    should_stop: Callable[[], bool] = lambda: False,
+) -> bool:
+    """Ingests a job claimed by ``worker`` chunk by chunk, committing progress after each.
+
+    A chunk that still fails after ``INGEST_CHUNK_RETRIES`` retries is
+    counted as failed and skipped. Connection errors propagate, leaving the
+    job to be reclaimed from its last committed chunk once it goes stale.
+    Returns False if ``should_stop`` interrupted the job, or if another
+    worker reclaimed it; the chunk in progress is then rolled back.
+    """
+    job_id, uid, payload, total, offset, _ = job
+    cur = conn.cursor()
+
+    def lost() -> bool:
+        conn.rollback()
+        cur.close()
+        logger.warning(f"Job {job_id} was reclaimed by another worker at {offset}/{total}; stopping")
+        return False
+
+    while offset < total:
+        if should_stop():
+            release_job(cur, job_id, worker)
+            conn.commit()
+            logger.info(f"Job {job_id} released at {offset}/{total}")
+            return False
+
+        chunk = payload[offset:offset + max(1, chunk_size)]
+        for attempt in range(INGEST_CHUNK_RETRIES + 1):
+            if not heartbeat(cur, job_id, worker):
+                return lost()
+            conn.commit()
+            try:
+                body = ingest_messages(cur, uid, chunk, datetime.utcnow())
+                if not record_chunk(cur, job_id, worker, len(chunk), body):
+                    return lost()
+                if body["count"]:
+                    # Same transaction as the rows, so every API worker's cache sees them.
+                    bump_version(cur, uid)
+                conn.commit()
+                break
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                raise
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"Job {job_id} chunk at {offset} failed (attempt {attempt + 1}): {e}")
+                if attempt == INGEST_CHUNK_RETRIES:
+                    if not record_chunk(cur, job_id, worker, len(chunk), None, error=str(e)):
+                        return lost()
+                    conn.commit()
+        offset += len(chunk)
+
+    if not finish_job(cur, job_id, worker, "done"):
+        return lost()
+    conn.commit()
+    cur.close()
+    return True
+
+
+# === Status ===
+def get_job(cur, job_id: int) -> Optional[Dict[str, Any]]:
+    """Fetches a job's counters with progress and throughput; needs a RealDictCursor."""
+    cur.execute(
+        """SELECT id, uid, status, total, processed, inserted, duplicates, promotional, failed,
+            attempts, error, created_at, started_at, finished_at,
+            EXTRACT(EPOCH FROM COALESCE(finished_at, NOW()) - started_at)::float AS elapsed_s
+        FROM ingest_jobs WHERE id = %s""",
+        (job_id,),
+    )
+    job = cur.fetchone()
+    if job is None:
+        return None
+    elapsed = job.pop("elapsed_s")
+    job["progress"] = round(job["processed"] / job["total"], 4) if job["total"] else 1.0
+    job["elapsed_s"] = round(elapsed, 3) if elapsed is not None else None
+    job["messages_per_s"] = round(job["processed"] / elapsed, 2) if elapsed else None
+    return job
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, wait
+from time import monotonic, sleep
+from typing import Any, Dict, List, Optional
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from sms_regex import parse_sms_with_regex
+
+load_dotenv()
+
+logger = logging.getLogger("spendsense.llm")
+
+# === Config ===
+HUGGINGFACE_API_KEY = os.getenv("HF_API_KEY")
+HUGGINGFACE_MODEL = os.getenv("HF_MODEL", "mistralai/Mixtral-8x7B-Instruct-v0.1")
+HF_API_URL = os.getenv(
+    "HF_API_URL", f"https://api-inference.huggingface.co/models/{HUGGINGFACE_MODEL}"
+)
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "32"))
+LLM_BATCH_DEADLINE = float(os.getenv("LLM_BATCH_DEADLINE", "30"))
+LLM_TIME_BUDGET = float(os.getenv("LLM_TIME_BUDGET", "60"))
+LLM_RETRIES = 3
+LLM_RETRY_BACKOFF = 0.5
+LLM_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+# === HTTP Session for HuggingFace ===
+def build_http_session(pool_size: int = LLM_CONCURRENCY, retries: int = LLM_RETRIES) -> requests.Session:
+    """Builds a requests session with retry logic; ``retries=0`` leaves retrying to the caller."""
+    session = requests.Session()
+    retry = Retry(
+        total=retries, backoff_factor=LLM_RETRY_BACKOFF, status_forcelist=LLM_RETRY_STATUSES
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+http = build_http_session()
+# query_llm_bulk retries by hand against its deadline, so urllib3 must not retry behind its back.
+bulk_http = build_http_session(retries=0)
+
+
+# === LLM Extraction ===
+def build_llm_request(sms_body: str):
+    """Returns the (headers, payload) for asking the LLM about one SMS."""
+    prompt = f"""[INST] You are an expert financial transaction parser. Analyze the following SMS message and extract the transaction details.
+    Your response MUST be a single, valid JSON object and nothing else.
+    The JSON object should have these keys: "amount", "txn_type" (must be "Credit" or "Debit"), "vendor" (the merchant name, e.g., "Zomato", "Amazon"), "category" (e.g., "Food", "Shopping", "Salary", "Travel"), "mode" (e.g., "UPI", "Card", "ATM", "NetBanking"), "date".
+    If a value is not present, use null. Extract the amount as a number, without currency symbols.
+
+    SMS: "{sms_body}"
+    [/INST]"""
+
+    headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
+    payload = {"inputs": prompt, "parameters": {"max_new_tokens": 256, "return_full_text": False}}
+    return headers, payload
+
+
+def parse_llm_response(body: Any) -> Dict[str, Any]:
+    """Pulls the JSON object out of the LLM's generated text."""
+    response_text = body[0]["generated_text"]
+    json_match = re.search(r"\{.*\}", response_text, re.DOTALL)
+    if json_match:
+        parsed_json = json.loads(json_match.group(0))
+        logger.info(f"LLM successfully parsed: {parsed_json}")
+        return parsed_json
+    else:
+        raise ValueError("No valid JSON object found in LLM response")
+
+
+def query_llm(sms_body: str, timeout: float = LLM_TIMEOUT) -> Optional[Dict[str, Any]]:
+    """Asks the LLM for transaction details; returns None if it gave no answer."""
+    headers, payload = build_llm_request(sms_body)
+    try:
+        resp = http.post(HF_API_URL, headers=headers, json=payload, timeout=timeout)
+        resp.raise_for_status()
+        return parse_llm_response(resp.json())
+    except Exception as e:
+        logger.error(f"LLM parsing failed: {e}. Falling back to regex.")
+        return None
+
+
+def extract_transaction_details_with_llm(
+    sms_body: str, timeout: float = LLM_TIMEOUT
+) -> Dict[str, Any]:
+    """Extracts transaction details from an SMS using an LLM."""
+    if not HUGGINGFACE_API_KEY:
+        logger.warning("HF_API_KEY not set. Falling back to regex.")
+        return parse_sms_with_regex(sms_body)
+    result = query_llm(sms_body, timeout)
+    return result if result is not None else parse_sms_with_regex(sms_body)
+
+
+def query_llm_until(sms_body: str, deadline: float) -> Optional[Dict[str, Any]]:
+    """``query_llm`` without urllib3 retries, retried by hand until the ``monotonic()`` ``deadline``.
+
+    Each attempt gets ``min(LLM_TIMEOUT, time left)``. Connection errors,
+    timeouts and retryable statuses are retried with backoff while time is
+    left; any other failure gives up at once. The timeout bounds each socket
+    operation, so a server dribbling out a reply can still overrun it.
+    """
+    headers, payload = build_llm_request(sms_body)
+    for attempt in range(LLM_RETRIES + 1):
+        if attempt:
+            sleep(max(0.0, min(LLM_RETRY_BACKOFF * 2 ** (attempt - 1), deadline - monotonic())))
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            break
+        try:
+            resp = bulk_http.post(HF_API_URL, headers=headers, json=payload, timeout=min(LLM_TIMEOUT, remaining))
+            if resp.status_code in LLM_RETRY_STATUSES:
+                logger.warning(f"LLM returned {resp.status_code} (attempt {attempt + 1}).")
+                continue
+            resp.raise_for_status()
+            return parse_llm_response(resp.json())
+        except (requests.ConnectionError, requests.Timeout) as e:
+            logger.warning(f"LLM request failed (attempt {attempt + 1}): {e}")
+        except Exception as e:
+            logger.error(f"LLM parsing failed: {e}. Falling back to regex.")
+            return None
+    return None
+
+
+def query_llm_bulk(
+    sms_list: List[str],
+    concurrency: int = LLM_CONCURRENCY,
+    batch_size: int = LLM_BATCH_SIZE,
+    batch_deadline: float = LLM_BATCH_DEADLINE,
+    time_budget: float = LLM_TIME_BUDGET,
+) -> List[Optional[Dict[str, Any]]]:
+    """Queries the LLM for many SMS concurrently within a time budget.
+
+    Messages are submitted in batches of ``batch_size`` to at most
+    ``concurrency`` worker threads. A batch gets ``batch_deadline`` seconds and
+    the whole call gets ``time_budget`` seconds; requests retry only while
+    their batch's deadline allows (see ``query_llm_until``). Results keep
+    input order; messages without an LLM answer by then (or that failed)
+    are None.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+    results: List[Optional[Dict[str, Any]]] = [None] * len(sms_list)
+    if not sms_list or not HUGGINGFACE_API_KEY:
+        return results
+
+    budget_end = monotonic() + time_budget
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="llm")
+    try:
+        for start in range(0, len(sms_list), batch_size):
+            deadline = min(batch_deadline, budget_end - monotonic())
+            if deadline <= 0:
+                break
+            batch_end = monotonic() + deadline
+            futures = {
+                pool.submit(query_llm_until, sms_list[i], batch_end): i
+                for i in range(start, min(start + batch_size, len(sms_list)))
+            }
+            done, not_done = wait(futures, timeout=deadline)
+            for future in done:
+                results[futures[future]] = future.result()
+            for future in not_done:
+                future.cancel()
+            if not_done:
+                logger.warning(
+                    f"LLM batch deadline hit: {len(not_done)} of {len(futures)} messages fell back to regex."
+                )
+    finally:
+        # Never block the request on stragglers; they stop retrying at their batch's deadline.
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def extract_transaction_details_bulk(sms_list: List[str], **kwargs) -> List[Dict[str, Any]]:
+    """Extracts many SMS concurrently, falling back to regex once time runs out.
+
+    Accepts the same tuning keywords as ``query_llm_bulk``.
+    """
+    if sms_list and not HUGGINGFACE_API_KEY:
+        logger.warning("HF_API_KEY not set. Falling back to regex.")
+    results = query_llm_bulk(sms_list, **kwargs)
+    fallbacks = sum(1 for r in results if r is None)
+    if HUGGINGFACE_API_KEY and fallbacks:
+        logger.info(f"LLM answered {len(sms_list) - fallbacks}/{len(sms_list)} messages.")
+    return [
+        r if r is not None else parse_sms_with_regex(sms)
+        for sms, r in zip(sms_list, results)
+    ]
+
+
+# === Async Variants (ASGI mode) ===
+async def query_llm_async(
+    session, sms_body: str, timeout: float = LLM_TIMEOUT
+) -> Optional[Dict[str, Any]]:
+    """``query_llm`` over an ``aiohttp.ClientSession``."""
+    headers, payload = build_llm_request(sms_body)
+    try:
+        async with asyncio.timeout(timeout):
+            async with session.post(HF_API_URL, headers=headers, json=payload) as resp:
+                resp.raise_for_status()
+                return parse_llm_response(await resp.json(content_type=None))
+    except Exception as e:
+        logger.error(f"LLM parsing failed: {e}. Falling back to regex.")
+        return None
+
+
+async def query_llm_bulk_async(
+    session,
+    sms_list: List[str],
+    concurrency: int = LLM_CONCURRENCY,
+    time_budget: float = LLM_TIME_BUDGET,
+) -> List[Optional[Dict[str, Any]]]:
+    """``query_llm_bulk`` on the event loop instead of worker threads.
+
+    At most ``concurrency`` requests are in flight for this call; whatever
+    has not answered after ``time_budget`` seconds is cancelled and left None.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(sms_list)
+    if not sms_list or not HUGGINGFACE_API_KEY:
+        return results
+
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch(i: int) -> None:
+        async with slots:
+            results[i] = await query_llm_async(session, sms_list[i], min(LLM_TIMEOUT, time_budget))
+
+    tasks = [asyncio.create_task(fetch(i)) for i in range(len(sms_list))]
+    _, not_done = await asyncio.wait(tasks, timeout=time_budget)
+    for task in not_done:
+        task.cancel()
+    if not_done:
+        logger.warning(
+            f"LLM time budget hit: {len(not_done)} of {len(tasks)} messages fell back to regex."
+        )
+    return results
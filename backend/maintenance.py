@@ -0,0 +1,101 @@
+"""Maintenance commands for the SpendSense database.
+
+Run from the ``backend`` directory:
+    python maintenance.py backfill-sms-hash [--batch 1000] [--delete-duplicates]
+    python maintenance.py backfill-monthly-aggregates [--uid UID]
+"""
+import argparse
+import logging
+
+from psycopg2.extras import execute_values
+
+import aggregates
+from database import db_connection, init_db
+from parse_cache import sms_cache_key
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("spendsense.maintenance")
+
+
+def backfill_sms_hash(batch: int, delete_duplicates: bool) -> None:
+    """Hashes rows that predate the sms_hash column, oldest first.
+
+    The first row of each (uid, sms_hash) keeps the hash. Later copies stay
+    NULL, which the unique index allows, or are deleted with
+    ``--delete-duplicates``.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+        last_id, hashed, duplicates = 0, 0, 0
+        while True:
+            cur.execute(
+                "SELECT id, uid, sms FROM sms_records WHERE sms_hash IS NULL AND id > %s ORDER BY id LIMIT %s",
+                (last_id, batch),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            keyed = [(row_id, uid, sms_cache_key(sms)) for row_id, uid, sms in rows]
+            cur.execute(
+                "SELECT uid, sms_hash FROM sms_records WHERE sms_hash = ANY(%s)",
+                ([h for _, _, h in keyed],),
+            )
+            seen = set(cur.fetchall())
+            updates, dupes = [], []
+            for row_id, uid, sms_hash in keyed:
+                if (uid, sms_hash) in seen:
+                    dupes.append(row_id)
+                else:
+                    seen.add((uid, sms_hash))
+                    updates.append((row_id, sms_hash))
+
+            if updates:
+                execute_values(
+                    cur,
+                    "UPDATE sms_records AS s SET sms_hash = v.h FROM (VALUES %s) AS v(id, h) WHERE s.id = v.id",
+                    updates,
+                )
+            if dupes and delete_duplicates:
+                cur.execute("DELETE FROM sms_records WHERE id = ANY(%s)", (dupes,))
+            conn.commit()
+            hashed += len(updates)
+            duplicates += len(dupes)
+            logger.info(f"Backfilled up to id {last_id}: {hashed} hashed, {duplicates} duplicates")
+        cur.close()
+        action = "deleted" if delete_duplicates else "left unhashed"
+        logger.info(f"✅ sms_hash backfill done: {hashed} hashed, {duplicates} duplicates {action}.")
+
+
+def backfill_monthly_aggregates(uid=None) -> None:
+    """Rebuilds sms_monthly_aggregates from sms_records."""
+    with db_connection() as conn:
+        cur = conn.cursor()
+        rows = aggregates.rebuild(cur, uid)
+        conn.commit()
+        cur.close()
+        logger.info(f"✅ Monthly aggregates rebuilt: {rows} rollup rows.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SpendSense maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("backfill-sms-hash", help="hash sms_records rows that have no sms_hash")
+    p.add_argument("--batch", type=int, default=1000)
+    p.add_argument("--delete-duplicates", action="store_true")
+
+    p = sub.add_parser("backfill-monthly-aggregates", help="rebuild sms_monthly_aggregates from sms_records")
+    p.add_argument("--uid", help="only rebuild this user")
+
+    args = parser.parse_args()
+    init_db()
+    if args.command == "backfill-sms-hash":
+        backfill_sms_hash(args.batch, args.delete_duplicates)
+    elif args.command == "backfill-monthly-aggregates":
+        backfill_monthly_aggregates(args.uid)
+
+
+if __name__ == "__main__":
+    main()
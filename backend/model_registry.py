@@ -0,0 +1,93 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable
+
+import joblib
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("spendsense.model_registry")
+
+# === Config ===
+MODEL_MMAP = os.getenv("MODEL_MMAP", "true").lower() == "true"
+
+
+def _arrays(obj, depth: int = 0):
+    """Yields the numpy arrays held by an estimator, pipeline steps included."""
+    if isinstance(obj, np.ndarray):
+        yield obj
+    elif depth < 4 and isinstance(obj, (list, tuple)):
+        for item in obj:
+            yield from _arrays(item, depth + 1)
+    elif depth < 4 and hasattr(obj, "__dict__"):
+        for value in vars(obj).values():
+            yield from _arrays(value, depth + 1)
+
+
+# === Registry ===
+class ModelRegistry:
+    """Loads each model artifact once per process and hands out the same object.
+
+    Artifacts are joblib pickles, which store every numpy array as a raw
+    ``.npy`` block inside the file. With ``mmap_mode="r"`` those arrays come
+    back as read-only memory maps of the file, so all workers on a host read
+    one copy from the page cache instead of each holding its own. Under a
+    preloading server (``gunicorn.conf.py``) the master loads everything
+    before forking and the workers inherit it; nothing writes to the
+    arrays, so copy-on-write never duplicates them.
+    """
+
+    def __init__(self, mmap: bool = True):
+        self.mmap_mode = "r" if mmap else None
+        self._models: Dict[str, Any] = {}
+        self._load_ms: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def load(self, path: str):
+        """The artifact at ``path``, unpickled on first use."""
+        key = os.path.abspath(path)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                start = time.perf_counter()
+                model = joblib.load(key, mmap_mode=self.mmap_mode)
+                self._models[key] = model
+                self._load_ms[key] = (time.perf_counter() - start) * 1000
+                logger.info(f"📦 Loaded {key} ({self._load_ms[key]:.0f} ms, mmap={self.mmap_mode is not None})")
+        return model
+
+    def preload(self, paths: Iterable[str]) -> int:
+        """Loads every existing artifact in ``paths`` now; returns how many are loaded."""
+        loaded = 0
+        for path in paths:
+            if not os.path.exists(path):
+                logger.warning(f"Model {path} not found, not preloading it.")
+                continue
+            self.load(path)
+            loaded += 1
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = dict(self._models)
+        artifacts = {}
+        for key, model in models.items():
+            arrays = list(_arrays(model))
+            mapped = sum(a.nbytes for a in arrays if isinstance(a, np.memmap))
+            artifacts[os.path.basename(key)] = {
+                "type": type(model).__name__,
+                "load_ms": round(self._load_ms[key], 1),
+                "mapped_bytes": mapped,
+                "heap_bytes": sum(a.nbytes for a in arrays) - mapped,
+            }
+        return {"mmap": self.mmap_mode is not None, "pid": os.getpid(), "artifacts": artifacts}
+
+
+model_registry = ModelRegistry(MODEL_MMAP)
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+from database import db_connection
+
+load_dotenv()
+
+logger = logging.getLogger("spendsense.parse_cache")
+
+# === Config ===
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "10000"))
+PARSE_CACHE_TTL = float(os.getenv("PARSE_CACHE_TTL", "86400"))
+PARSE_CACHE_SHARED = os.getenv("PARSE_CACHE_SHARED", "").lower()  # "", "postgres" or "disk"
+PARSE_CACHE_PATH = os.getenv("PARSE_CACHE_PATH", ".cache/sms_parse_cache.sqlite3")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def sms_cache_key(sms: str) -> str:
+    """Hashes an SMS after trimming and collapsing whitespace."""
+    normalized = _WHITESPACE.sub(" ", sms or "").strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+# === In-Process Tier ===
+class LRUCache:
+    """Bounded, thread-safe LRU map whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# === Shared Tiers ===
+class PostgresParseStore:
+    """Shared tier in the ``sms_parse_cache`` table, visible to every worker."""
+
+    name = "postgres"
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        try:
+            with db_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    """SELECT sms_hash, result FROM sms_parse_cache
+                    WHERE sms_hash = ANY(%s) AND created_at > NOW() - make_interval(secs => %s)""",
+                    (keys, self.ttl),
+                )
+                rows = cur.fetchall()
+                cur.close()
+                conn.commit()
+                return {k: v for k, v in rows}
+        except psycopg2.Error as e:
+            logger.warning(f"Parse cache lookup failed: {e}")
+            return {}
+
+    def set_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        try:
+            with db_connection() as conn:
+                cur = conn.cursor()
+                execute_values(
+                    cur,
+                    """INSERT INTO sms_parse_cache (sms_hash, result) VALUES %s
+                    ON CONFLICT (sms_hash) DO UPDATE SET result = EXCLUDED.result, created_at = NOW()""",
+                    [(k, json.dumps(v)) for k, v in items.items()],
+                )
+                conn.commit()
+                cur.close()
+        except psycopg2.Error as e:
+            logger.warning(f"Parse cache write failed: {e}")
+
+
+class DiskParseStore:
+    """Shared tier in a local SQLite file, for workers on one host."""
+
+    name = "disk"
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sms_parse_cache (sms_hash TEXT PRIMARY KEY, result TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        if not keys:
+            return {}
+        rows = []
+        try:
+            with self._lock:
+                # Stay under SQLite's bound-parameter limit.
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows += self._conn.execute(
+                        f"SELECT sms_hash, result FROM sms_parse_cache WHERE created_at > strftime('%s','now') - ? AND sms_hash IN ({placeholders})",
+                        (self.ttl, *chunk),
+                    ).fetchall()
+            return {k: json.loads(v) for k, v in rows}
+        except sqlite3.Error as e:
+            logger.warning(f"Parse cache lookup failed: {e}")
+            return {}
+
+    def set_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO sms_parse_cache (sms_hash, result, created_at) VALUES (?, ?, strftime('%s','now'))",
+                    [(k, json.dumps(v)) for k, v in items.items()],
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Parse cache write failed: {e}")
+
+
+def build_shared_store():
+    """Returns the configured shared tier, or None when disabled."""
+    if PARSE_CACHE_SHARED == "postgres":
+        return PostgresParseStore(PARSE_CACHE_TTL)
+    if PARSE_CACHE_SHARED == "disk":
+        return DiskParseStore(PARSE_CACHE_PATH, PARSE_CACHE_TTL)
+    if PARSE_CACHE_SHARED:
+        logger.warning(f"Unknown PARSE_CACHE_SHARED={PARSE_CACHE_SHARED!r}; shared tier disabled.")
+    return None
+
+
+# === Two-Tier Cache ===
+class ParseCache:
+    """In-process LRU in front of an optional shared store, keyed by SMS hash."""
+
+    def __init__(self, local: LRUCache, shared=None):
+        self.local = local
+        self.shared = shared
+        self._lock = threading.Lock()
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self.local.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = dict(value)
+        if missing and self.shared is not None:
+            remote = self.shared.get_many(missing)
+            for key, value in remote.items():
+                self.local.set(key, value)
+            found.update(remote)
+            with self._lock:
+                self.shared_hits += len(remote)
+                self.shared_misses += len(missing) - len(remote)
+        return found
+
+    def set_many(self, items: Dict[str, Dict[str, Any]]) -> None:
+        if not items:
+            return
+        for key, value in items.items():
+            self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set_many(items)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"local": self.local.stats()}
+        if self.shared is not None:
+            with self._lock:
+                stats["shared"] = {
+                    "backend": self.shared.name,
+                    "hits": self.shared_hits,
+                    "misses": self.shared_misses,
+                }
+        return stats
+
+
+parse_cache = ParseCache(LRUCache(PARSE_CACHE_SIZE, PARSE_CACHE_TTL), build_shared_store())
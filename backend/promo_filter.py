@@ -0,0 +1,197 @@
+import logging
+import os
+import re
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("spendsense.promo_filter")
+
+# === Config ===
+PROMO_FILTER_ENABLED = os.getenv("PROMO_FILTER_ENABLED", "true").lower() == "true"
+PROMO_FILTER_MODEL = os.getenv(
+    "PROMO_FILTER_MODEL",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "promo_filter.npz"),
+)
+PROMO_FILTER_THRESHOLD = float(os.getenv("PROMO_FILTER_THRESHOLD", "0.7"))
+
+_TOKEN = re.compile(r"[a-z]+|\d+|[^\sa-z\d]")
+_DIGITS = re.compile(r"\d+")
+_HASH_CACHE_SIZE = 200_000
+
+
+# === Keyword Rule ===
+TXN_KEYWORDS = (
+    "debited",
+    "credited",
+    "withdrawn",
+    "payment",
+    "transfer",
+    "txn",
+    "transaction",
+    "purchase",
+)
+
+
+def has_transaction_keyword(text: str) -> bool:
+    text_lower = text.lower()
+    return any(word in text_lower for word in TXN_KEYWORDS)
+
+
+def is_promotional(text: Optional[str]) -> bool:
+    """Checks if an SMS is promotional based on keywords."""
+    if not text:
+        return True
+    text_lower = text.lower()
+    promo_keywords = [
+        "insurance",
+        "loan offer",
+        "apply now",
+        "limited period offer",
+        "download app",
+        "sale",
+        "discount",
+        "emi offer",
+    ]
+    if has_transaction_keyword(text_lower):
+        return False
+    if any(word in text_lower for word in promo_keywords):
+        return True
+    return False
+
+
+# === Features ===
+_BIGRAM_MIX = np.uint64(1_000_003)
+_hashes: Dict[str, int] = {}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word, number and symbol tokens; every number becomes ``0``."""
+    return _TOKEN.findall(_DIGITS.sub("0", text.lower()))
+
+
+def _token_hash(token: str) -> int:
+    if len(_hashes) >= _HASH_CACHE_SIZE:
+        _hashes.clear()
+    # crc32, not hash(): buckets must match across processes and runs.
+    h = _hashes[token] = zlib.crc32(token.encode("utf-8"))
+    return h
+
+
+def hashed_features(texts: Sequence[str], n_features: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Hashed unigram+bigram count features as CSR ``(data, indices, indptr)``.
+
+    Only unigrams are hashed in Python; bigram ids are mixed from adjacent
+    unigram hashes in NumPy. Each row is scaled by 1/sqrt(n-grams), so long
+    promotional blasts and one-line alerts score on the same scale.
+    """
+    hashes: List[int] = []
+    lengths = np.empty(len(texts), dtype=np.int64)
+    get = _hashes.get
+    for i, text in enumerate(texts):
+        tokens = tokenize(text or "")
+        hashes.extend([get(t) or _token_hash(t) for t in tokens])
+        lengths[i] = len(tokens)
+
+    uni = np.asarray(hashes, dtype=np.uint64)
+    uni_rows = np.repeat(np.arange(len(texts)), lengths)
+    # A bigram joins positions j and j+1 of the same text.
+    same_text = uni_rows[:-1] == uni_rows[1:]
+    bi = (uni[:-1] * _BIGRAM_MIX ^ uni[1:])[same_text]
+    bi_rows = uni_rows[:-1][same_text]
+
+    rows = np.concatenate([uni_rows, bi_rows])
+    order = np.argsort(rows, kind="stable")
+    indices = (np.concatenate([uni, bi]) % np.uint64(n_features)).astype(np.int64)[order]
+    counts = lengths + np.maximum(lengths - 1, 0)
+    indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    data = np.repeat(1.0 / np.sqrt(np.maximum(counts, 1)), counts).astype(np.float32)
+    return data, indices, indptr
+
+
+# === Model ===
+class PromoFilter:
+    """Scores whole batches of SMS with a linear model over hashed n-grams.
+
+    The model (``train_promo_filter.py``) predicts whether a message is
+    promotional or otherwise carries no transaction. A message with one of
+    the keyword rule's transaction words is always kept, whatever the model
+    says: dropping a real transaction costs more than parsing an ad. Without
+    a model file, or with ``PROMO_FILTER_ENABLED=false``, it falls back to
+    the keyword rule.
+    """
+
+    def __init__(self, path: str, threshold: float, enabled: bool = True):
+        self.path = path
+        self.threshold = threshold
+        self.weights: Optional[np.ndarray] = None
+        self.bias = 0.0
+        self.n_features = 0
+        self._lock = threading.Lock()
+        self.scored = 0
+        self.promotional = 0
+        self.llm_calls_avoided = 0
+        if enabled:
+            self.load()
+
+    def load(self) -> bool:
+        """Loads the model file; returns False and keeps the keyword rule if it is missing."""
+        if not os.path.exists(self.path):
+            logger.warning(f"Promo filter model {self.path} not found. Using keyword rule.")
+            return False
+        with np.load(self.path) as model:
+            self.weights = model["weights"].astype(np.float32)
+            self.bias = float(model["bias"])
+            self.n_features = int(model["n_features"])
+        logger.info(f"✅ Promo filter loaded ({self.n_features} features, threshold={self.threshold})")
+        return True
+
+    def score(self, texts: Sequence[str]) -> np.ndarray:
+        """Probability that each text is promotional, in one vectorised pass."""
+        data, indices, indptr = hashed_features(texts, self.n_features)
+        rows = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        logits = np.bincount(rows, weights=self.weights[indices] * data, minlength=len(texts)) + self.bias
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def flag(self, texts: Sequence[Optional[str]]) -> List[bool]:
+        """True for each text to drop before parsing; empty texts are always dropped."""
+        if self.weights is None:
+            flags = [is_promotional(text) for text in texts]
+        else:
+            # Bulk payloads repeat messages; score each distinct text once.
+            distinct = list(dict.fromkeys(text for text in texts if text))
+            promo = {}
+            if distinct:
+                probs = self.score(distinct)
+                promo = {
+                    text: bool(p >= self.threshold) and not has_transaction_keyword(text)
+                    for text, p in zip(distinct, probs)
+                }
+            flags = [promo[text] if text else True for text in texts]
+        with self._lock:
+            self.scored += len(texts)
+            self.promotional += sum(flags)
+        return flags
+
+    def record_avoided(self, count: int) -> None:
+        with self._lock:
+            self.llm_calls_avoided += count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "model": "hashed-ngram-linear" if self.weights is not None else "keywords",
+                "threshold": self.threshold,
+                "scored": self.scored,
+                "promotional": self.promotional,
+                "llm_calls_avoided": self.llm_calls_avoided,
+            }
+
+
+promo_filter = PromoFilter(PROMO_FILTER_MODEL, PROMO_FILTER_THRESHOLD, PROMO_FILTER_ENABLED)
@@ -0,0 +1,176 @@
+import hashlib
+import itertools
+import logging
+import os
+import threading
+from functools import wraps
+from typing import Any, Dict, Optional
+
+import psycopg2
+from dotenv import load_dotenv
+from flask import Response, make_response, request
+
+from database import db_connection
+from parse_cache import LRUCache
+
+load_dotenv()
+
+logger = logging.getLogger("spendsense.response_cache")
+
+# === Config ===
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+# postgres: uid versions shared by every process; memory: only for a single process.
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "postgres").lower()
+
+BUMP_VERSION_SQL = """
+    INSERT INTO response_cache_versions (uid, version) VALUES (%s, 1)
+    ON CONFLICT (uid) DO UPDATE SET version = response_cache_versions.version + 1
+"""
+
+
+# === Backends ===
+def bump_version(cur, uid: str) -> None:
+    """Invalidates ``uid``'s cached responses as part of the caller's write transaction."""
+    cur.execute(BUMP_VERSION_SQL, (uid,))
+
+
+class InProcessResponseBackend:
+    """Per-worker LRU of response bodies plus a version per uid.
+
+    Writes made by another process (other server workers, the ASGI app,
+    ``ingest_worker.py``) never reach these versions, so this backend is
+    only correct when one process serves and writes everything.
+
+    Versions live in a bounded LRU as well. A uid whose version was evicted
+    gets a fresh number from a process-wide counter, never a reused one, so
+    entries cached under its old version stay unreachable.
+
+    A replacement backend only needs the same five methods: ``get``,
+    ``set``, ``version``, ``bump`` and ``stats``.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_size: int, ttl: float):
+        self.entries = LRUCache(max_size, ttl)
+        self._versions = LRUCache(max_size, float("inf"))
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.entries.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self.entries.set(key, value)
+
+    def version(self, uid: str) -> int:
+        with self._lock:
+            version = self._versions.get(uid)
+            if version is None:
+                version = next(self._counter)
+                self._versions.set(uid, version)
+            return version
+
+    def bump(self, uid: str) -> None:
+        with self._lock:
+            self._versions.set(uid, next(self._counter))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self.entries.stats()}
+
+
+class PostgresResponseBackend(InProcessResponseBackend):
+    """Per-worker LRU of response bodies keyed by uid versions kept in Postgres.
+
+    Every cached read first looks up the uid's row in
+    ``response_cache_versions`` (one primary-key lookup), and every write
+    bumps it, from whichever process made the write. A bump in another
+    worker makes this worker's older entries unreachable on its next read.
+    """
+
+    name = "postgres"
+
+    def version(self, uid: str) -> int:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT version FROM response_cache_versions WHERE uid = %s", (uid,))
+            row = cur.fetchone()
+            conn.rollback()
+            cur.close()
+        return row[0] if row else 0
+
+    def bump(self, uid: str) -> None:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            bump_version(cur, uid)
+            conn.commit()
+            cur.close()
+
+
+if RESPONSE_CACHE_BACKEND == "memory":
+    _backend = InProcessResponseBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+else:
+    _backend = PostgresResponseBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+
+def set_backend(backend) -> None:
+    """Swaps in another response cache backend."""
+    global _backend
+    _backend = backend
+
+
+def invalidate_uid(uid: Optional[str]) -> None:
+    """Drops every cached read response for ``uid`` after a write has committed.
+
+    Bumping after the commit is safe: a read that raced the write was
+    cached under the old version, which the bump retires.
+    """
+    if not uid:
+        return
+    try:
+        _backend.bump(uid)
+    except psycopg2.Error as e:
+        # The write is already committed; its uid's entries expire with the TTL.
+        logger.error(f"Could not invalidate cached responses for {uid}: {e}")
+
+
+def response_cache_stats() -> Dict[str, Any]:
+    return {"enabled": RESPONSE_CACHE_ENABLED, **_backend.stats()}
+
+
+# === Decorator ===
+def cached_per_uid(view):
+    """Caches a GET view's 200 responses per uid and answers If-None-Match.
+
+    The key is the full path and query string plus the uid's current
+    version, so ``invalidate_uid`` makes every older entry unreachable.
+    """
+    @wraps(view)
+    def wrapper(uid, *args, **kwargs):
+        if not RESPONSE_CACHE_ENABLED:
+            return view(uid, *args, **kwargs)
+
+        try:
+            version = _backend.version(uid)
+        except psycopg2.Error as e:
+            logger.warning(f"Response cache version lookup failed, serving uncached: {e}")
+            return view(uid, *args, **kwargs)
+        key = f"{uid}:{version}:{request.full_path}"
+        cached = _backend.get(key)
+        if cached is not None:
+            body, etag = cached
+            resp = Response(body, status=200, mimetype="application/json")
+        else:
+            resp = make_response(view(uid, *args, **kwargs))
+            if resp.status_code != 200:
+                return resp
+            body = resp.get_data()
+            etag = hashlib.sha1(body).hexdigest()
+            _backend.set(key, (body, etag))
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp.make_conditional(request)
+
+    return wrapper
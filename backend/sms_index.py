@@ -0,0 +1,332 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from category_model import CATEGORY_BATCH_SIZE, MODELS_DIR, category_model, load_embedder
+
+load_dotenv()
+
+logger = logging.getLogger("spendsense.sms_index")
+
+# === Config ===
+SMS_INDEX_ENABLED = os.getenv("SMS_INDEX_ENABLED", "true").lower() == "true"
+SMS_INDEX_DIR = os.getenv("SMS_INDEX_DIR", os.path.join(MODELS_DIR, "sms_index"))
+SMS_INDEX_NPROBE = int(os.getenv("SMS_INDEX_NPROBE", "3"))
+SMS_INDEX_K = int(os.getenv("SMS_INDEX_K", "5"))
+SMS_INDEX_MAX_K = 50  # largest k a request may ask for (validation.category_nearest_schema)
+NEAR_DUPLICATE_SIMILARITY = float(os.getenv("NEAR_DUPLICATE_SIMILARITY", "0.95"))
+
+_SEARCH_BLOCK = 16_384  # rows of one cell scored per matrix product
+
+
+def normalize(vectors) -> np.ndarray:
+    """Rows scaled to unit length, so a dot product is the cosine similarity."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def shared_embedder(name: str):
+    """The category model's embedder when it is ``name``, so the process loads one copy."""
+    if category_model.embedder is not None and category_model.embedder_name == name:
+        return category_model.embedder
+    return load_embedder(name)
+
+
+# === Index ===
+class SmsIndex:
+    """Approximate nearest-neighbour (IVF) index over labelled SMS embeddings.
+
+    The KMeans centroids trained on the MiniLM embeddings
+    (``models/op/kmeans_sms_model.pkl``) are the coarse cells: every vector
+    is filed under its nearest centroid, and a query only scores the
+    ``nprobe`` cells nearest to it, brute force, one matrix product per
+    cell. The index directory holds flat append-only files read as memory
+    maps, so preforked workers share one copy through the page cache:
+
+    - ``vectors.f32``: unit-length float32 rows;
+    - ``labels.i32``: each row's category, an index into ``meta.json``;
+    - ``cells.i32``: each row's cell. Written last, so its length is the
+      row count readers trust;
+    - ``centroids.npy`` and ``meta.json`` (width, embedder, categories,
+      last indexed ``sms_records`` id).
+
+    ``add`` appends rows without re-clustering or rewriting old ones, and
+    every search first picks up rows another process appended. One writer
+    at a time (``build_sms_index.py``).
+    """
+
+    def __init__(self, path: str, enabled: bool = True):
+        self.path = path
+        self.embedder = None
+        self.centroids: Optional[np.ndarray] = None
+        self.meta: Dict[str, Any] = {}
+        self.size = 0
+        self._vectors = self._labels = None
+        self._lists: List[np.ndarray] = []
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.queries = 0
+        self.near_duplicates = 0
+        self.total_ms = 0.0
+        if enabled:
+            self.load()
+
+    @property
+    def ready(self) -> bool:
+        return self.embedder is not None and self.size > 0
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @classmethod
+    def create(cls, path: str, centroids: np.ndarray, embedder: str) -> "SmsIndex":
+        """An empty index at ``path`` whose cells are ``centroids``."""
+        os.makedirs(path, exist_ok=True)
+        centroids = np.asarray(centroids, dtype=np.float32)
+        np.save(os.path.join(path, "centroids.npy"), centroids)
+        for name in ("vectors.f32", "labels.i32", "cells.i32"):
+            open(os.path.join(path, name), "wb").close()
+        index = cls(path, enabled=False)
+        index._write_meta({
+            "dim": centroids.shape[1], "embedder": embedder, "categories": [], "db_last_id": 0, "db_recent_ids": [],
+        })
+        index.open()
+        return index
+
+    def open(self) -> None:
+        """Reads the centroids and metadata, then maps every complete row."""
+        self.centroids = np.load(self._file("centroids.npy"))
+        # Nearest centroid by Euclidean distance: argmax of q.c - |c|^2 / 2.
+        self._half_norms = 0.5 * (self.centroids ** 2).sum(axis=1)
+        with open(self._file("meta.json")) as f:
+            self.meta = json.load(f)
+        self.size = 0
+        self._lists = [np.empty(0, dtype=np.int64) for _ in range(len(self.centroids))]
+        self.refresh()
+
+    def load(self) -> bool:
+        """Opens the index and its embedder; False leaves the index off."""
+        if not os.path.exists(self._file("meta.json")):
+            logger.warning("SMS index not found. Near-duplicate flags and nearest-SMS categories are off.")
+            return False
+        start = time.perf_counter()
+        try:
+            self.open()
+            embedder = shared_embedder(self.meta["embedder"])
+        except Exception as e:
+            logger.warning(f"SMS index unavailable ({e}). Near-duplicate flags and nearest-SMS categories are off.")
+            return False
+        self.embedder = embedder
+        logger.info(
+            f"✅ SMS index loaded: {self.size} rows in {len(self._lists)} cells, "
+            f"embedder {self.meta['embedder']} ({time.perf_counter() - start:.1f}s)"
+        )
+        return True
+
+    def _write_meta(self, meta: Dict[str, Any]) -> None:
+        tmp = self._file(f"meta.json.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, self._file("meta.json"))
+        self.meta = meta
+
+    def _complete_rows(self) -> int:
+        """Rows present in all three files; anything past it is an interrupted append."""
+        return min(
+            os.path.getsize(self._file("cells.i32")) // 4,
+            os.path.getsize(self._file("labels.i32")) // 4,
+            os.path.getsize(self._file("vectors.f32")) // (4 * self.meta["dim"]),
+        )
+
+    def _truncate(self) -> None:
+        """Cuts every file back to the complete rows, so the next append lines up (writer only)."""
+        rows = self._complete_rows()
+        for name, width in (("vectors.f32", 4 * self.meta["dim"]), ("labels.i32", 4), ("cells.i32", 4)):
+            path = self._file(name)
+            if os.path.getsize(path) != rows * width:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * width)
+
+    def refresh(self) -> int:
+        """Maps rows appended since the last call; returns the row count."""
+        dim = self.meta["dim"]
+        size = self._complete_rows()
+        if size <= self.size:
+            return self.size
+        with self._lock:
+            if size <= self.size:
+                return self.size
+            with open(self._file("meta.json")) as f:
+                meta = json.load(f)
+            vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r", shape=(size, dim))
+            labels = np.memmap(self._file("labels.i32"), dtype=np.int32, mode="r", shape=(size,))
+            cells = np.memmap(self._file("cells.i32"), dtype=np.int32, mode="r", shape=(size,))
+            # Only the new rows are bucketed; existing cell lists are extended.
+            new = np.asarray(cells[self.size:])
+            order = np.argsort(new, kind="stable") + self.size
+            counts = np.bincount(new, minlength=len(self._lists))
+            lists = [
+                np.concatenate([old, part]) if len(part) else old
+                for old, part in zip(self._lists, np.split(order, np.cumsum(counts)[:-1]))
+            ]
+            self.meta, self._vectors, self._labels, self._lists = meta, vectors, labels, lists
+            self.size = size
+        return size
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """The cell of each (unit-length) vector."""
+        return np.argmax(vectors @ self.centroids.T - self._half_norms, axis=1).astype(np.int32)
+
+    def add(self, vectors, categories: Sequence[str], checkpoint: Optional[Dict[str, Any]] = None) -> int:
+        """Appends labelled vectors; returns how many were stored (rows with NaN are skipped).
+
+        ``checkpoint`` (the ``db_*`` fields of ``build_sms_index``) is merged
+        into the metadata once the rows are written.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.meta["dim"])
+        keep = np.isfinite(vectors).all(axis=1)
+        vectors = normalize(vectors[keep])
+        categories = [c for c, k in zip(categories, keep) if k]
+
+        meta = dict(self.meta, categories=list(self.meta["categories"]))
+        codes = {c: i for i, c in enumerate(meta["categories"])}
+        for category in categories:
+            if category not in codes:
+                codes[category] = len(meta["categories"])
+                meta["categories"].append(category)
+        # New categories are named before any row uses them.
+        if meta["categories"] != self.meta["categories"]:
+            self._write_meta(meta)
+
+        if len(vectors):
+            # A crashed append may have left rows in vectors.f32 / labels.i32 only.
+            self._truncate()
+            labels = np.array([codes[c] for c in categories], dtype=np.int32)
+            for name, data in (("vectors.f32", vectors), ("labels.i32", labels), ("cells.i32", self.assign(vectors))):
+                with open(self._file(name), "ab") as f:
+                    f.write(np.ascontiguousarray(data).tobytes())
+        if checkpoint is not None:
+            self._write_meta(dict(meta, **checkpoint))
+        self.refresh()
+        return len(vectors)
+
+    def search(self, vectors, k: int = SMS_INDEX_K, nprobe: int = SMS_INDEX_NPROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """(similarities, rows) of the ``k`` nearest indexed rows per query, best first.
+
+        Missing neighbours (fewer than ``k`` rows in the probed cells) are
+        row ``-1`` with similarity ``-inf``.
+        """
+        start = time.perf_counter()
+        k = max(1, min(k, SMS_INDEX_MAX_K))
+        self.refresh()
+        queries = normalize(vectors)
+        sims = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        # One consistent snapshot: refresh() may swap in longer lists for a longer memmap.
+        with self._lock:
+            stored, lists = self._vectors, self._lists
+        if stored is None or not len(queries):
+            return sims, rows
+
+        probes = np.argsort(-(queries @ self.centroids.T - self._half_norms), axis=1)[:, :nprobe]
+        for cell in np.unique(probes):
+            q = np.flatnonzero((probes == cell).any(axis=1))
+            members = lists[cell]
+            for block in range(0, len(members), _SEARCH_BLOCK):
+                ids = members[block:block + _SEARCH_BLOCK]
+                scores = queries[q] @ stored[ids].T
+                if scores.shape[1] > k:
+                    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                    scores, ids = np.take_along_axis(scores, top, axis=1), ids[top]
+                else:
+                    ids = np.broadcast_to(ids, scores.shape)
+                merged_sims = np.concatenate([sims[q], scores], axis=1)
+                merged_rows = np.concatenate([rows[q], ids], axis=1)
+                top = np.argpartition(-merged_sims, k - 1, axis=1)[:, :k]
+                sims[q] = np.take_along_axis(merged_sims, top, axis=1)
+                rows[q] = np.take_along_axis(merged_rows, top, axis=1)
+
+        order = np.argsort(-sims, axis=1)
+        sims, rows = np.take_along_axis(sims, order, axis=1), np.take_along_axis(rows, order, axis=1)
+        with self._lock:
+            self.searches += 1
+            self.queries += len(queries)
+            self.total_ms += (time.perf_counter() - start) * 1000
+        return sims, rows
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.embedder.encode(list(texts), batch_size=CATEGORY_BATCH_SIZE)
+
+    def categories_of(self, rows: np.ndarray) -> List[str]:
+        names = self.meta["categories"]
+        return [names[code] for code in self._labels[rows]]
+
+    def nearest(self, texts: Sequence[str], k: int = SMS_INDEX_K) -> List[Dict[str, Any]]:
+        """kNN categorization: each text's neighbours and their similarity-weighted vote."""
+        if not texts:
+            return []
+        sims, rows = self.search(self.embed(texts), k)
+        results = []
+        for sim_row, id_row in zip(sims, rows):
+            found = id_row >= 0
+            neighbours = [
+                {"row": int(row), "category": category, "similarity": round(float(sim), 4)}
+                for row, sim, category in zip(id_row[found], sim_row[found], self.categories_of(id_row[found]))
+            ]
+            votes = defaultdict(float)
+            for n in neighbours:
+                votes[n["category"]] += max(n["similarity"], 0.0)
+            total = sum(votes.values())
+            best = max(votes, key=votes.get) if total else None
+            results.append({
+                "category": best,
+                "score": round(votes[best] / total, 4) if total else 0.0,
+                "near_duplicate": bool(neighbours) and neighbours[0]["similarity"] >= NEAR_DUPLICATE_SIMILARITY,
+                "neighbours": neighbours,
+            })
+        return results
+
+    def find_near_duplicates(
+        self, vectors: np.ndarray, threshold: float = NEAR_DUPLICATE_SIMILARITY
+    ) -> List[Optional[Dict[str, Any]]]:
+        """For each embedding (from ``embed``), its closest indexed SMS if at least ``threshold`` similar."""
+        if not len(vectors):
+            return []
+        sims, rows = self.search(vectors, k=1)
+        hits = sims[:, 0] >= threshold
+        categories = iter(self.categories_of(rows[hits, 0]))
+        matches = [
+            {"row": int(row), "category": next(categories), "similarity": round(float(sim), 4)} if hit else None
+            for hit, row, sim in zip(hits, rows[:, 0], sims[:, 0])
+        ]
+        with self._lock:
+            self.near_duplicates += int(hits.sum())
+        return matches
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = [len(cell) for cell in self._lists]
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "rows": self.size,
+                "cells": len(sizes),
+                "cell_rows": {"min": min(sizes), "max": max(sizes)} if sizes else None,
+                "nprobe": SMS_INDEX_NPROBE,
+                "categories": len(self.meta.get("categories", [])),
+                "near_duplicate_similarity": NEAR_DUPLICATE_SIMILARITY,
+                "searches": self.searches,
+                "queries": self.queries,
+                "near_duplicates": self.near_duplicates,
+                "avg_ms_per_query": round(self.total_ms / self.queries, 3) if self.queries else None,
+            }
+
+
+sms_index = SmsIndex(SMS_INDEX_DIR, SMS_INDEX_ENABLED)
@@ -0,0 +1,90 @@
+import re
+from typing import Dict, Optional
+
+# === Compiled Extraction Engine ===
+# Every field pattern is an alternative inside one zero-width lookahead, so a
+# single `finditer` pass visits each offset once and reports whichever field
+# starts there. Being zero-width, matches may overlap exactly like the old
+# independent `re.search` calls did (e.g. the "Rs" inside "Avl Bal Rs 500").
+# Alternatives never start on the same text, except "refund" which is both a
+# Credit keyword and a "Ref" prefix; the ref branch captures both.
+_FIELD_PATTERNS = [
+    r"(?P<ref>(?:(?=(?P<refund>(?i:\brefunded?\b)))|)"
+    r"(?i:(?:Ref(?:erence)?(?:\s*No)?\.?)\s*[:\-]?\s*(?P<ref_no>[A-Za-z0-9\-_/]+)))",
+    r"\b(?i:(?P<debit>debited?|spent|withdrawn|deducted|purchas(?:e|ed))"
+    r"|(?P<credit>credited?|received|deposited|refunded?)"
+    r"|(?P<upi>UPI|GPay|PhonePe|Paytm)"
+    r"|(?P<atm>ATM|Cash)"
+    r"|(?P<netbanking>NEFT|IMPS|RTGS|Net\s*Banking))\b",
+    r"(?P<amount>(?i:(?:INR|Rs\.?|₹)\s*([\d,]+\.?\d*)))",
+    r"(?P<account>(?i:(?:A/c(?:\s*XX)?\s*)(?P<account_no>\d+)))",
+    r"(?P<date>\d{1,2}[-/][A-Za-z]{3}[-/]\d{2,4}|\d{1,2}[-/]\d{1,2}[-/]\d{2,4})",
+    r"(?P<balance>(?i:(?:Avl Bal|balance)[\s:]*[₹Rs\.]*\s*(?P<balance_value>[\d,]+\.?\d*)))",
+]
+
+# Every character an alternative can start on, spelled out case by case
+# (including the Unicode letters IGNORECASE folds onto them) so the engine
+# can skip other offsets with a plain charset test.
+_FIELD_START = r"(?=[\d₹AaBbCcDdGgIiNnPpRrSsUuWwİıſ])"
+
+SMS_SCANNER = re.compile(_FIELD_START + "(?=" + "|".join(_FIELD_PATTERNS) + ")")
+
+_AMOUNT_GROUP = SMS_SCANNER.groupindex["amount"] + 1
+
+
+def parse_sms_with_regex(sms: str) -> Dict[str, Optional[str]]:
+    """Parses an SMS using regex as a fallback."""
+    if not sms:
+        return {}
+    data = {
+        "amount": None,
+        "txn_type": None,
+        "mode": None,
+        "ref_no": None,
+        "account": None,
+        "date": None,
+        "balance": None,
+        "vendor": None,
+        "category": "Other",
+    }
+    debit = credit = upi = atm = netbanking = False
+    for match in SMS_SCANNER.finditer(sms):
+        field = match.lastgroup
+        if field == "amount":
+            if data["amount"] is None:
+                data["amount"] = match.group(_AMOUNT_GROUP).replace(",", "")
+        elif field == "ref":
+            if data["ref_no"] is None:
+                data["ref_no"] = match.group("ref_no")
+            if match.group("refund") is not None:
+                credit = True
+        elif field == "account":
+            if data["account"] is None:
+                data["account"] = match.group("account_no")
+        elif field == "date":
+            if data["date"] is None:
+                data["date"] = match.group("date")
+        elif field == "balance":
+            if data["balance"] is None:
+                data["balance"] = match.group("balance_value").replace(",", "")
+        elif field == "debit":
+            debit = True
+        elif field == "credit":
+            credit = True
+        elif field == "upi":
+            upi = True
+        elif field == "atm":
+            atm = True
+        elif field == "netbanking":
+            netbanking = True
+    if debit:
+        data["txn_type"] = "Debit"
+    elif credit:
+        data["txn_type"] = "Credit"
+    if upi:
+        data["mode"] = "UPI"
+    elif atm:
+        data["mode"] = "ATM"
+    elif netbanking:
+        data["mode"] = "NetBanking"
+    return data
@@ -0,0 +1,194 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from sms_regex import parse_sms_with_regex
+
+load_dotenv()
+
+logger = logging.getLogger("spendsense.templates")
+
+# === Config ===
+TEMPLATE_MAX = int(os.getenv("TEMPLATE_MAX", "5000"))
+
+# Dates, amounts, account masks, refs and times: any token carrying a digit.
+_SLOT = re.compile(
+    r"\d{1,2}[-/][A-Za-z]{3}[-/]\d{2,4}|[^\W\d]*\d(?:[\w\-/.,:]*\w)?"
+)
+_NUMBER_SLOT = re.compile(r"[^\W\d]*\.?(\d[\d,]*(?:\.\d+)?)")
+_WHITESPACE = re.compile(r"\s+")
+_DIGIT = re.compile(r"\d")
+# DLT headers look like "VM-HDFCBK" or "AD-HDFCBK-S"; the 6-char core is the bank.
+_SENDER = re.compile(r"^(?:[A-Z]{2}-)?([A-Z0-9]{6})(?:-[A-Z])?$")
+
+REQUIRED_FIELDS = ("amount", "txn_type", "vendor", "category")
+
+
+def normalize_sender(sender: Optional[str]) -> str:
+    """Reduces a DLT sender header to its bank code (VM-HDFCBK -> HDFCBK)."""
+    sender = (sender or "").strip().upper()
+    match = _SENDER.match(sender)
+    return match.group(1) if match else sender
+
+
+def skeletonize(sms: str) -> Tuple[str, List[str]]:
+    """Masks every digit-bearing token; returns (skeleton, slot values)."""
+    text = _WHITESPACE.sub(" ", sms or "").strip()
+    slots = _SLOT.findall(text)
+    return _SLOT.sub("#", text), slots
+
+
+def _as_text(value: Any) -> str:
+    return str(value).strip()
+
+
+def _number(value: str) -> Optional[str]:
+    """Returns the bare number in a slot like "Rs.1,200.50" -> "1200.50"."""
+    match = _NUMBER_SLOT.fullmatch(value)
+    return match.group(1).replace(",", "") if match else None
+
+
+def _same_number(a: Optional[str], b: Optional[str]) -> bool:
+    try:
+        return a is not None and b is not None and float(a) == float(b)
+    except ValueError:
+        return False
+
+
+def _locate(value: Any, slots: List[str]) -> List[Tuple[int, str]]:
+    """Returns every (slot index, transform) that reproduces ``value``."""
+    text = _as_text(value)
+    number = _number(text)
+    found = []
+    for i, slot in enumerate(slots):
+        if slot == text:
+            found.append((i, "raw"))
+        elif _same_number(number, _number(slot)):
+            found.append((i, "number"))
+        elif re.sub(r"\D", "", slot) == text:
+            found.append((i, "digits"))
+    return found
+
+
+def _apply(slot: str, transform: str) -> Optional[str]:
+    if transform == "number":
+        return _number(slot)
+    if transform == "digits":
+        return re.sub(r"\D", "", slot)
+    return slot
+
+
+class Template:
+    """Field recipe for one (sender, skeleton): slot lookups and constants."""
+
+    __slots__ = ("slots", "constants", "regex_fields")
+
+    def __init__(self, slots, constants, regex_fields):
+        self.slots = slots
+        self.constants = constants
+        self.regex_fields = regex_fields
+
+    def extract(self, sms: str, slot_values: List[str]) -> Optional[Dict[str, Any]]:
+        result = dict(self.constants)
+        for field, (index, transform) in self.slots.items():
+            value = _apply(slot_values[index], transform)
+            if value is None:
+                return None
+            result[field] = value
+        if self.regex_fields:
+            regex_result = parse_sms_with_regex(sms)
+            for field in self.regex_fields:
+                result[field] = regex_result.get(field)
+        return result
+
+
+def learn_template(sms: str, parsed: Dict[str, Any]) -> Optional[Template]:
+    """Derives a Template from one successful parse, or None if ambiguous.
+
+    A value carrying digits must come from exactly one slot (or match the
+    regex parse); anything else is a constant of the skeleton. Ambiguous
+    samples (e.g. amount equal to balance) are skipped and learned later.
+    """
+    if not all(parsed.get(k) for k in REQUIRED_FIELDS):
+        return None
+    _, slot_values = skeletonize(sms)
+    regex_result = None
+    slots, constants, regex_fields = {}, {}, []
+    for field, value in parsed.items():
+        if value is None or not _DIGIT.search(_as_text(value)):
+            constants[field] = value
+            continue
+        found = _locate(value, slot_values)
+        if len(found) == 1:
+            slots[field] = found[0]
+            continue
+        if regex_result is None:
+            regex_result = parse_sms_with_regex(sms)
+        if regex_result.get(field) is not None and _as_text(regex_result[field]) == _as_text(value):
+            regex_fields.append(field)
+            continue
+        return None
+    return Template(slots, constants, regex_fields)
+
+
+# === Learner ===
+class TemplateLearner:
+    """Remembers templates per (sender, skeleton) and extracts by slot lookup."""
+
+    def __init__(self, max_templates: int = TEMPLATE_MAX):
+        self.max_templates = max_templates
+        self._templates: "OrderedDict[Tuple[str, str], Template]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0, "learned": 0})
+
+    @staticmethod
+    def _key(sender: Optional[str], skeleton: str) -> Tuple[str, str]:
+        digest = hashlib.sha1(skeleton.encode("utf-8")).hexdigest()
+        return normalize_sender(sender), digest
+
+    def extract(self, sms: str, sender: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Returns the parse for a known skeleton, or None on a miss."""
+        skeleton, slot_values = skeletonize(sms)
+        key = self._key(sender, skeleton)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+        result = template.extract(sms, slot_values) if template is not None else None
+        with self._lock:
+            self._stats[key[0]]["hits" if result is not None else "misses"] += 1
+        return result
+
+    def learn(self, sms: str, sender: Optional[str], parsed: Dict[str, Any]) -> bool:
+        """Stores the template behind a successful parse; True if learned."""
+        skeleton, _ = skeletonize(sms)
+        key = self._key(sender, skeleton)
+        with self._lock:
+            if key in self._templates:
+                return False
+        template = learn_template(sms, parsed)
+        if template is None:
+            return False
+        with self._lock:
+            self._templates[key] = template
+            self._stats[key[0]]["learned"] += 1
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            senders = {}
+            for sender, s in self._stats.items():
+                lookups = s["hits"] + s["misses"]
+                senders[sender] = {**s, "hit_rate": round(s["hits"] / lookups, 4) if lookups else 0.0}
+            return {"templates": len(self._templates), "senders": senders}
+
+
+template_learner = TemplateLearner()
@@ -0,0 +1,162 @@
+"""Trains the hashed n-gram promotional SMS filter used by ``promo_filter``.
+
+None of the datasets says whether a message is a transaction, so labels are
+derived: a message counts as a transaction if it has an amount with a
+currency and a transaction word (debited, paid, withdrawal, ...) and no
+marketing cue. Everything else (offers, data-pack blasts, OTPs,
+account notices) is labelled promotional. The linear model generalises
+these labels to wordings the rules miss.
+
+Scores on a split of the weak labels only show how well the model copies
+the rules, so the report also scores ``promo_filter_eval.csv``: real
+messages labelled by hand, kept out of training. It is scored the way
+``promo_filter`` serves, transaction-keyword veto included. Classes are
+not reweighted: promotional messages are the minority, and upweighting
+them pushes the intercept (the score of a message with no known tokens)
+towards "promotional", which drops unfamiliar bank alerts.
+
+Run from the ``backend`` directory:
+    python train_promo_filter.py [--bits 18] [--C 16.0]
+"""
+import argparse
+import ast
+import glob
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+from promo_filter import (
+    PROMO_FILTER_MODEL,
+    PROMO_FILTER_THRESHOLD,
+    has_transaction_keyword,
+    hashed_features,
+    is_promotional,
+)
+
+# === CONFIGURATION ===
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(BACKEND_DIR, "categorized_sms.csv")
+EVAL_PATH = os.path.join(BACKEND_DIR, "promo_filter_eval.csv")
+DATASETS_DIR = os.path.join(BACKEND_DIR, "..", "models", "datasets")
+
+AMOUNT = re.compile(r"(?i)(?:inr|rs\.?|₹|aed|usd|\$)\s*[\d,]+(?:\.\d+)?")
+TXN_VERB = re.compile(
+    r"(?i)\b(debit(?:ed)?|credit(?:ed)?|withdrawn|withdrawal|spent|paid|payment|sent|received|transferred|"
+    r"deposit(?:ed)?|recharged|renewed|refund(?:ed)?|purchase|trx|txn|transaction|top-up|added|order|emi)\b"
+)
+PROMO_CUE = re.compile(
+    r"(?i)(click|offer|t&c|apply now|download|hurry|limited|\bwin\b|\bfree\b|starting|recharge with|"
+    r"data pack|discount|\bsale\b|upto|up to|visit now|\bbhk\b|launch)"
+)
+
+
+def weak_label(text: str) -> int:
+    """1 if promotional / no transaction, 0 if the message reports a transaction."""
+    if not AMOUNT.search(text):
+        return 1
+    if TXN_VERB.search(text) and not PROMO_CUE.search(text):
+        return 0
+    return 1
+
+
+def load_texts():
+    """SMS bodies from categorized_sms.csv and every dataset sheet, deduplicated."""
+    texts = []
+    for raw in pd.read_csv(CSV_PATH)["sms"].dropna().astype(str):
+        try:
+            value = ast.literal_eval(raw)
+            raw = value.get("message", "") if isinstance(value, dict) else str(value)
+        except (ValueError, SyntaxError):
+            pass
+        texts.append(raw)
+
+    for path in sorted(glob.glob(os.path.join(DATASETS_DIR, "*.csv"))):
+        df = pd.read_csv(path)
+        column = next((c for c in df.columns if c.lower() == "sms"), None)
+        if column:
+            texts.extend(df[column].dropna().astype(str))
+    for path in sorted(glob.glob(os.path.join(DATASETS_DIR, "*.xlsx"))):
+        for df in pd.read_excel(path, sheet_name=None).values():
+            column = next((c for c in df.columns if str(c).lower() == "sms"), None)
+            if column:
+                texts.extend(df[column].dropna().astype(str))
+
+    unique = {}
+    for text in texts:
+        text = text.strip()
+        if text:
+            unique.setdefault(" ".join(text.lower().split()), text)
+    return list(unique.values())
+
+
+def to_matrix(texts, n_features):
+    data, indices, indptr = hashed_features(texts, n_features)
+    return csr_matrix((data, indices, indptr), shape=(len(texts), n_features))
+
+
+def report(name, y_true, y_pred):
+    y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+    txn = y_true == 0
+    print(
+        f"• {name:<22} accuracy {np.mean(y_true == y_pred):.3f}  "
+        f"transactions kept {np.mean(y_pred[txn] == 0):.3f}  "
+        f"promotional dropped {np.mean(y_pred[~txn] == 1):.3f}"
+    )
+
+
+def flags(probs, texts, threshold):
+    """``promo_filter.flag`` on precomputed scores: threshold, then the keyword veto."""
+    return [int(p >= threshold and not has_transaction_keyword(t)) for p, t in zip(probs, texts)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bits", type=int, default=18, help="log2 of the hashed feature space")
+    parser.add_argument("--C", type=float, default=16.0, help="inverse regularisation strength")
+    parser.add_argument("--threshold", type=float, default=PROMO_FILTER_THRESHOLD)
+    parser.add_argument("--output", default=PROMO_FILTER_MODEL)
+    args = parser.parse_args()
+
+    n_features = 1 << args.bits
+    hand = pd.read_csv(EVAL_PATH)
+    held_out = {" ".join(text.lower().split()) for text in hand["sms"]}
+    texts = [t for t in load_texts() if " ".join(t.lower().split()) not in held_out]
+    labels = [weak_label(text) for text in texts]
+    print(f"📨 {len(texts)} unique messages, {sum(labels)} labelled promotional")
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        texts, labels, test_size=0.2, random_state=42, stratify=labels
+    )
+    clf = LogisticRegression(C=args.C, max_iter=5000)
+    clf.fit(to_matrix(X_train, n_features), y_train)
+
+    print("Weak-label split (agreement with the labelling rules):")
+    probs = clf.predict_proba(to_matrix(X_test, n_features))[:, 1]
+    report("keyword rule", y_test, [int(is_promotional(t)) for t in X_test])
+    report("hashed n-gram model", y_test, flags(probs, X_test, args.threshold))
+
+    print(f"Hand-labelled sample ({len(hand)} messages, {EVAL_PATH}):")
+    hand_texts = hand["sms"].tolist()
+    probs = clf.predict_proba(to_matrix(hand_texts, n_features))[:, 1]
+    report("keyword rule", hand["promotional"], [int(is_promotional(t)) for t in hand_texts])
+    report("hashed n-gram model", hand["promotional"], flags(probs, hand_texts, args.threshold))
+
+    # Refit on every weak label for the shipped artifact; the hand-labelled sample stays out.
+    clf.fit(to_matrix(texts, n_features), labels)
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    np.savez_compressed(
+        args.output,
+        weights=clf.coef_[0].astype(np.float32),
+        bias=np.float32(clf.intercept_[0]),
+        n_features=np.int64(n_features),
+    )
+    print(f"💾 Saved {args.output} ({os.path.getsize(args.output) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Times each stage of the categorization.py training pipeline.
+
+Runs load, embed, SMOTE, split, fit and evaluate one after another through
+categorization.py's stage functions. For each stage it records wall time,
+peak RSS (the kernel's high-water mark, reset before every stage) and
+throughput in rows/sec, and writes everything to a JSON report. Plots are
+saved as PNG files with the Agg backend, so it runs headless. Artifacts
+are only written with ``--save``.
+
+With ``minilm`` the embed stage goes through the on-disk embedding cache,
+so once the training set is cached it times lookups, not encoding. Use
+``--cold-cache`` to give every run an empty temporary cache so each one
+encodes the whole set; the report records the cache hits and misses.
+
+With ``--baseline`` the report is compared with an earlier one. The run
+fails (exit code 1) if any stage slowed down by more than
+``--max-slowdown`` percent. Stages shorter than ``--min-seconds`` in the
+baseline are skipped, since their timings are mostly noise.
+
+Run from the ``models`` directory:
+    python benchmark_training.py [--backend hashing] [--repeat 3] [--cold-cache] [--output bench/report.json]
+                                 [--baseline bench/baseline.json] [--max-slowdown 20]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import sklearn
+
+import categorization as training
+from features import FEATURE_BACKENDS, embedding_cache
+
+# === CONFIGURATION ===
+REPORT_FILE = "bench/training_report.json"
+PLOTS_DIR = "bench/plots"
+
+
+# === MEASUREMENT ===
+def reset_peak_rss():
+    """Resets VmHWM so the next reading covers one stage only; False if the kernel won't."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Process-wide peak since start (kB on Linux, bytes on macOS).
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Stages:
+    """Runs stages, keeping each one's fastest time across repeats."""
+
+    def __init__(self):
+        self.results = {}
+        self.per_stage_rss = True
+
+    def run(self, name, rows, fn, *args):
+        self.per_stage_rss &= reset_peak_rss()
+        start = time.perf_counter()
+        out = fn(*args)
+        seconds = time.perf_counter() - start
+        n = rows(out) if callable(rows) else rows
+        previous = self.results.get(name)
+        if previous is None or seconds < previous["seconds"]:
+            self.results[name] = {
+                "seconds": round(seconds, 4),
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                "rows": n,
+                "rows_per_s": round(n / seconds, 1) if seconds else None,
+            }
+        return out
+
+
+def run_pipeline(stages, backend, save, cache=None):
+    X_raw, y_raw = stages.run("load", lambda out: len(out[0]), training.load_data)
+    le, y_encoded = training.encode_labels(y_raw)
+    X_embedded, vectorizer = stages.run("embed", len(X_raw), training.build_features, X_raw, backend, cache)
+    X_balanced, y_balanced = stages.run("smote", lambda out: len(out[1]), training.balance, X_embedded, y_encoded)
+    X_train, X_test, y_train, y_test = stages.run("split", len(y_balanced), training.split, X_balanced, y_balanced)
+    clf = stages.run("fit", len(y_train), training.train, X_train, y_train)
+    y_pred, metrics = stages.run("evaluate", len(y_test), training.evaluate, clf, X_test, y_test, le)
+    if save:
+        training.save(clf, le, vectorizer, backend)
+    return clf, le, (X_train, y_train, X_test, y_test, y_pred, y_balanced), metrics
+
+
+# === REGRESSION CHECK ===
+def compare(report, baseline, max_slowdown, min_seconds):
+    """Prints per-stage changes; returns the stages slower than allowed."""
+    regressions = []
+    print(f"\n{'stage':<10} {'baseline s':>11} {'now s':>9} {'change':>8}")
+    for name, now in report["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if before is None:
+            continue
+        change = (now["seconds"] / before["seconds"] - 1) * 100 if before["seconds"] else 0.0
+        checked = before["seconds"] >= min_seconds
+        flag = ""
+        if checked and change > max_slowdown:
+            regressions.append(name)
+            flag = "  ❌"
+        elif not checked:
+            flag = "  (too short to check)"
+        print(f"{name:<10} {before['seconds']:>11.3f} {now['seconds']:>9.3f} {change:>+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=FEATURE_BACKENDS, default="minilm")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per stage; the fastest is reported")
+    parser.add_argument("--output", default=REPORT_FILE)
+    parser.add_argument("--plots-dir", default=PLOTS_DIR)
+    parser.add_argument("--no-plots", action="store_true")
+    parser.add_argument("--save", action="store_true", help="also write the trained artifacts")
+    parser.add_argument(
+        "--cold-cache", action="store_true", help="minilm: embed every run into an empty temporary cache"
+    )
+    parser.add_argument("--baseline", help="earlier report to check against")
+    parser.add_argument("--max-slowdown", type=float, default=20.0, help="allowed slowdown per stage, in percent")
+    parser.add_argument("--min-seconds", type=float, default=0.25, help="skip baseline stages shorter than this")
+    args = parser.parse_args()
+
+    stages = Stages()
+    cache_counts = {"cold": args.cold_cache, "hits": 0, "misses": 0}
+    start = time.perf_counter()
+    for i in range(args.repeat):
+        with tempfile.TemporaryDirectory(prefix="bench-embeddings-") as tmp:
+            cache = None
+            if args.backend == "minilm":
+                cache = embedding_cache(tmp) if args.cold_cache else embedding_cache()
+            clf, le, data, metrics = run_pipeline(stages, args.backend, args.save and i == 0, cache)
+        if cache is not None:
+            cache_counts["hits"] += cache.hits
+            cache_counts["misses"] += cache.misses
+    total = time.perf_counter() - start
+
+    if not args.no_plots:
+        X_train, y_train, X_test, y_test, y_pred, y_balanced = data
+        training.plot(clf, le, X_train, y_train, X_test, y_test, y_pred, y_balanced, args.backend, args.plots_dir)
+        print(f"🖼️  Plots saved under {args.plots_dir}/")
+
+    report = {
+        "backend": args.backend,
+        "repeat": args.repeat,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sklearn": sklearn.__version__,
+        "cpu_count": os.cpu_count(),
+        "per_stage_rss": stages.per_stage_rss,
+        "embedding_cache": cache_counts if args.backend == "minilm" else None,
+        "total_seconds": round(total, 2),
+        "metrics": metrics,
+        "stages": stages.results,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'stage':<10} {'seconds':>9} {'peak RSS MB':>12} {'rows':>8} {'rows/s':>11}")
+    for name, row in stages.results.items():
+        rate = f"{row['rows_per_s']:>11,.0f}" if row["rows_per_s"] else f"{'-':>11}"
+        print(f"{name:<10} {row['seconds']:>9.3f} {row['peak_rss_mb']:>12.1f} {row['rows']:>8} {rate}")
+    if report["embedding_cache"]:
+        print(f"🗃️  Embedding cache: {cache_counts['hits']} hits, {cache_counts['misses']} misses")
+    print(f"💾 Saved {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("backend") != args.backend:
+            print(f"⚠️ Baseline was run with backend {baseline.get('backend')!r}, not {args.backend!r}")
+        if cache_counts["hits"] or (baseline.get("embedding_cache") or {}).get("hits"):
+            print("⚠️ Embed timings include embedding cache hits; use --cold-cache for both runs to time encoding")
+        regressions = compare(report, baseline, args.max_slowdown, args.min_seconds)
+        if regressions:
+            print(f"❌ Slower than baseline by more than {args.max_slowdown:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"✅ No stage slower than baseline by more than {args.max_slowdown:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import argparse
 import pandas as pd
 import numpy as np
 import os
@@ -7,111 +8,176 @@ import seaborn as sns
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import classification_report, confusion_matrix
-from sklearn.decomposition import PCA
-from sentence_transformers import SentenceTransformer
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, f1_score
+from sklearn.decomposition import PCA, TruncatedSVD
+from sklearn.pipeline import Pipeline
 from imblearn.over_sampling import SMOTE
-from tqdm import tqdm
+
+from features import FEATURE_BACKENDS, TRAINING_FILE, artifact_paths, build_vectorizer, embed, load_training_data
 
 # === CONFIGURATION ===
-INPUT_FILE = "datasets/SMS_Categorized_Expanded_Final.xlsx"
-MODEL_PATH = "models/category_classifier.pkl"
-ENCODER_PATH = "models/label_encoder.pkl"
+INPUT_FILE = TRAINING_FILE
+PLOTS_DIR = "plots"
 
-# === LOAD DATA ===
-df = pd.read_excel(INPUT_FILE)
-df = df[["SMS", "Category"]].dropna()
 
-# === CLEAN CATEGORY LABELS ===
-df["Category"] = df["Category"].astype(str).str.strip().str.title()
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the SMS category classifier.")
+    parser.add_argument(
+        "--backend", choices=FEATURE_BACKENDS, default="minilm",
+        help="minilm: sentence-transformer embeddings; hashing/tfidf: sparse n-grams, no torch needed",
+    )
+    parser.add_argument("--headless", action="store_true", help="save plots under --plots-dir instead of showing them")
+    parser.add_argument("--plots-dir", default=PLOTS_DIR)
+    return parser.parse_args(argv)
+
+
+# === LOAD DATA ===
+def load_data(path=INPUT_FILE):
+    """SMS texts and title-cased categories, rare classes (<6 samples) removed."""
+    return load_training_data(path)
 
-# === REMOVE RARE CLASSES (<6 samples) ===
-class_counts = df["Category"].value_counts()
-valid_classes = class_counts[class_counts >= 6].index
-df = df[df["Category"].isin(valid_classes)]
 
 # === LABEL ENCODING ===
-X_raw = df["SMS"].astype(str).tolist()
-y_raw = df["Category"].astype(str).tolist()
+def encode_labels(y_raw):
+    le = LabelEncoder()
+    return le, le.fit_transform(y_raw)
 
-le = LabelEncoder()
-y_encoded = le.fit_transform(y_raw)
 
 # === EMBEDDINGS ===
-print("🔄 Generating SMS embeddings for full dataset...")
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-X_embedded = embedder.encode(X_raw, show_progress_bar=True)
+def build_features(X_raw, backend, cache=None):
+    """(features, fitted vectorizer or None for MiniLM); ``cache`` overrides the default embedding cache."""
+    if backend == "minilm":
+        print("🔄 Generating SMS embeddings for full dataset...")
+        return embed(X_raw, cache), None
+    print(f"🔄 Building {backend} n-gram features for full dataset...")
+    vectorizer = build_vectorizer(backend)
+    return vectorizer.fit_transform(X_raw), vectorizer
+
 
 # === APPLY SMOTE (FIXED: k_neighbors=1) ===
-print("🧪 Applying SMOTE to balance class distribution...")
-smote = SMOTE(random_state=42, k_neighbors=1)
-X_balanced, y_balanced = smote.fit_resample(X_embedded, y_encoded)
+def balance(X_embedded, y_encoded):
+    print("🧪 Applying SMOTE to balance class distribution...")
+    smote = SMOTE(random_state=42, k_neighbors=1)
+    return smote.fit_resample(X_embedded, y_encoded)
+
 
 # === SPLIT TRAIN/TEST ON BALANCED DATA ===
-X_train, X_test, y_train, y_test = train_test_split(
-    X_balanced, y_balanced, test_size=0.2, random_state=42, stratify=y_balanced
-)
+def split(X_balanced, y_balanced):
+    return train_test_split(
+        X_balanced, y_balanced, test_size=0.2, random_state=42, stratify=y_balanced
+    )
+
 
 # === TRAINING MODEL ===
-print("🎯 Training classifier...")
-clf = LogisticRegression(max_iter=1000)
-clf.fit(X_train, y_train)
+def train(X_train, y_train):
+    print("🎯 Training classifier...")
+    clf = LogisticRegression(max_iter=1000)
+    clf.fit(X_train, y_train)
+    return clf
+
 
 # === SAVE MODEL AND ENCODER ===
-os.makedirs("models", exist_ok=True)
-joblib.dump(clf, MODEL_PATH)
-joblib.dump(le, ENCODER_PATH)
+def save(clf, le, vectorizer, backend):
+    model_path, encoder_path = artifact_paths(backend)
+    os.makedirs("models", exist_ok=True)
+    if vectorizer is None:
+        joblib.dump(clf, model_path)
+    else:
+        # The API feeds raw text to pipelines, so the vectorizer ships with the model.
+        joblib.dump(Pipeline([("features", vectorizer), ("clf", clf)]), model_path)
+    joblib.dump(le, encoder_path)
+    print(f"💾 Saved {model_path} and {encoder_path}")
+
 
 # === EVALUATION ===
-y_pred = clf.predict(X_test)
+def evaluate(clf, X_test, y_test, le):
+    """Prints the classification report; returns predictions and headline metrics."""
+    y_pred = clf.predict(X_test)
+    print("📊 Classification Report:")
+    print(classification_report(
+        y_test,
+        y_pred,
+        labels=np.arange(len(le.classes_)),
+        target_names=le.classes_
+    ))
+    metrics = {
+        "accuracy": round(float(accuracy_score(y_test, y_pred)), 4),
+        "macro_f1": round(float(f1_score(y_test, y_pred, average="macro")), 4),
+    }
+    return y_pred, metrics
 
-print("📊 Classification Report:")
-print(classification_report(
-    y_test,
-    y_pred,
-    labels=np.arange(len(le.classes_)),
-    target_names=le.classes_
-))
 
 # === VISUALIZATIONS ===
-
-## 1. Class Distribution After SMOTE
-plt.figure(figsize=(12, 6))
-pd.Series(le.inverse_transform(y_balanced)).value_counts().plot(kind='bar', color='teal')
-plt.title("Category Distribution After SMOTE")
-plt.xlabel("Category")
-plt.ylabel("Frequency")
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.show()
-
-## 2. Confusion Matrix
-cm = confusion_matrix(y_test, y_pred)
-plt.figure(figsize=(12, 10))
-sns.heatmap(cm, annot=True, fmt="d", xticklabels=le.classes_, yticklabels=le.classes_, cmap="Blues")
-plt.title("Confusion Matrix")
-plt.xlabel("Predicted")
-plt.ylabel("Actual")
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.show()
-decision_scores = clf.decision_function(X_test)
-plt.figure(figsize=(12, 6))
-for i, class_label in enumerate(le.classes_):
-    plt.hist(decision_scores[:, i], bins=30, alpha=0.4, label=class_label)
-plt.title("Decision Function Scores per Class")
-plt.xlabel("Score")
-plt.ylabel("Frequency")
-plt.legend(loc="upper right")
-plt.tight_layout()
-plt.show()
-pca = PCA(n_components=2)
-X_2d = pca.fit_transform(X_train)
-plt.figure(figsize=(10, 6))
-scatter = plt.scatter(X_2d[:, 0], X_2d[:, 1], c=y_train, cmap="tab10", alpha=0.7)
-plt.title("PCA of SMS Embeddings")
-plt.xlabel("PC1")
-plt.ylabel("PC2")
-plt.legend(*scatter.legend_elements(), title="Classes")
-plt.tight_layout()
-plt.show()
+def finish(name, plots_dir):
+    """Shows the current figure, or saves it when plots_dir is set (headless)."""
+    plt.tight_layout()
+    if plots_dir:
+        os.makedirs(plots_dir, exist_ok=True)
+        plt.savefig(os.path.join(plots_dir, f"{name}.png"), dpi=120)
+        plt.close()
+    else:
+        plt.show()
+
+
+def plot(clf, le, X_train, y_train, X_test, y_test, y_pred, y_balanced, backend, plots_dir=None):
+    ## 1. Class Distribution After SMOTE
+    plt.figure(figsize=(12, 6))
+    pd.Series(le.inverse_transform(y_balanced)).value_counts().plot(kind='bar', color='teal')
+    plt.title("Category Distribution After SMOTE")
+    plt.xlabel("Category")
+    plt.ylabel("Frequency")
+    plt.xticks(rotation=45)
+    finish("class_distribution", plots_dir)
+
+    ## 2. Confusion Matrix
+    cm = confusion_matrix(y_test, y_pred)
+    plt.figure(figsize=(12, 10))
+    sns.heatmap(cm, annot=True, fmt="d", xticklabels=le.classes_, yticklabels=le.classes_, cmap="Blues")
+    plt.title("Confusion Matrix")
+    plt.xlabel("Predicted")
+    plt.ylabel("Actual")
+    plt.xticks(rotation=45)
+    finish("confusion_matrix", plots_dir)
+
+    decision_scores = clf.decision_function(X_test)
+    plt.figure(figsize=(12, 6))
+    for i, class_label in enumerate(le.classes_):
+        plt.hist(decision_scores[:, i], bins=30, alpha=0.4, label=class_label)
+    plt.title("Decision Function Scores per Class")
+    plt.xlabel("Score")
+    plt.ylabel("Frequency")
+    plt.legend(loc="upper right")
+    finish("decision_scores", plots_dir)
+
+    pca = PCA(n_components=2) if backend == "minilm" else TruncatedSVD(n_components=2)
+    X_2d = pca.fit_transform(X_train)
+    plt.figure(figsize=(10, 6))
+    scatter = plt.scatter(X_2d[:, 0], X_2d[:, 1], c=y_train, cmap="tab10", alpha=0.7)
+    plt.title("PCA of SMS Embeddings")
+    plt.xlabel("PC1")
+    plt.ylabel("PC2")
+    plt.legend(*scatter.legend_elements(), title="Classes")
+    finish("pca", plots_dir)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.headless:
+        plt.switch_backend("Agg")
+
+    X_raw, y_raw = load_data()
+    le, y_encoded = encode_labels(y_raw)
+    X_embedded, vectorizer = build_features(X_raw, args.backend)
+    X_balanced, y_balanced = balance(X_embedded, y_encoded)
+    X_train, X_test, y_train, y_test = split(X_balanced, y_balanced)
+    clf = train(X_train, y_train)
+    save(clf, le, vectorizer, args.backend)
+    y_pred, _ = evaluate(clf, X_test, y_test, le)
+    plot(
+        clf, le, X_train, y_train, X_test, y_test, y_pred, y_balanced, args.backend,
+        plots_dir=args.plots_dir if args.headless else None,
+    )
+
+
+if __name__ == "__main__":
+    main()
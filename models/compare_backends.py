@@ -0,0 +1,155 @@
+"""Compares category classifier feature backends on accuracy, latency and RSS.
+
+Each backend is trained on the same stratified split (SMOTE on the training
+part only, so synthetic samples never leak into the test set). The report
+gives accuracy and macro-F1, fit time, per-message latency for single
+messages and for batches, and what a fresh worker pays to serve it: time
+to import and load the model and its peak RSS, measured in a subprocess.
+
+Run from the ``models`` directory:
+    python compare_backends.py [--backends minilm hashing tfidf] [--output report.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from imblearn.over_sampling import SMOTE
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
+
+from features import FEATURE_BACKENDS, build_vectorizer, load_embedder, load_training_data
+
+# === CONFIGURATION ===
+BATCH_SIZE = 64
+LATENCY_SAMPLES = 200
+
+# Runs in a fresh interpreter: what one worker pays to load an artifact and
+# score a message. VmHWM, unlike ru_maxrss, is not inherited across fork+exec.
+STARTUP_PROBE = """
+import sys, time
+start = time.perf_counter()
+import joblib
+backend, path = sys.argv[1:3]
+model = joblib.load(path)
+if backend == "minilm":
+    from features import load_embedder
+    model.predict(load_embedder().encode(["Rs 250 debited at Swiggy"]))
+else:
+    model.predict(["Rs 250 debited at Swiggy"])
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    rss = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+print(elapsed, rss / 1024)
+"""
+
+
+def featurizer(backend):
+    """(vectorizer or None, fit_transform, transform) for a backend."""
+    if backend == "minilm":
+        embedder = load_embedder()
+        encode = lambda texts: embedder.encode(texts, batch_size=BATCH_SIZE)
+        return None, encode, encode
+    vectorizer = build_vectorizer(backend)
+    return vectorizer, vectorizer.fit_transform, vectorizer.transform
+
+
+def startup_cost(backend, artifact):
+    """(seconds, peak RSS in MB) for a fresh process to load and use an artifact."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.pkl")
+        joblib.dump(artifact, path)
+        out = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE, backend, path],
+            capture_output=True, text=True, check=True,
+        )
+    seconds, rss = out.stdout.split()[-2:]
+    return float(seconds), float(rss)
+
+
+def evaluate(backend, X_train, X_test, y_train, y_test):
+    vectorizer, fit_transform, transform = featurizer(backend)
+
+    start = time.perf_counter()
+    features = fit_transform(X_train)
+    X_balanced, y_balanced = SMOTE(random_state=42, k_neighbors=1).fit_resample(features, y_train)
+    clf = LogisticRegression(max_iter=1000)
+    clf.fit(X_balanced, y_balanced)
+    fit_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = clf.predict(transform(X_test))
+    batch_ms = (time.perf_counter() - start) * 1000 / len(X_test)
+
+    sample = X_test[:LATENCY_SAMPLES]
+    start = time.perf_counter()
+    for text in sample:
+        clf.predict_proba(transform([text]))
+    single_ms = (time.perf_counter() - start) * 1000 / len(sample)
+
+    # Same artifact categorization.py would save for this backend.
+    artifact = clf if vectorizer is None else Pipeline([("features", vectorizer), ("clf", clf)])
+    startup_s, rss_mb = startup_cost(backend, artifact)
+    return {
+        "accuracy": round(accuracy_score(y_test, y_pred), 4),
+        "macro_f1": round(f1_score(y_test, y_pred, average="macro"), 4),
+        "fit_s": round(fit_s, 2),
+        "single_ms": round(single_ms, 3),
+        "batch_ms_per_message": round(batch_ms, 4),
+        "startup_s": round(startup_s, 2),
+        "peak_rss_mb": round(rss_mb, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", choices=FEATURE_BACKENDS, default=list(FEATURE_BACKENDS))
+    parser.add_argument("--output", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    texts, labels = load_training_data()
+    y = LabelEncoder().fit_transform(labels)
+    X_train, X_test, y_train, y_test = train_test_split(
+        texts, y, test_size=0.2, random_state=42, stratify=y
+    )
+    print(f"📨 {len(X_train)} train / {len(X_test)} test messages, {len(np.unique(y))} categories")
+
+    report = {}
+    for backend in args.backends:
+        print(f"🔄 {backend}...")
+        try:
+            report[backend] = evaluate(backend, X_train, X_test, y_train, y_test)
+        except subprocess.CalledProcessError as e:
+            report[backend] = {"unavailable": e.stderr.strip().splitlines()[-1]}
+        except (ImportError, OSError) as e:
+            # minilm needs sentence-transformers and the downloaded weights.
+            report[backend] = {"unavailable": str(e)}
+
+    print(f"\n{'backend':<9} {'acc':>6} {'macroF1':>8} {'fit s':>7} {'1 msg ms':>9} "
+          f"{'batch ms':>9} {'start s':>8} {'RSS MB':>7}")
+    for backend, row in report.items():
+        if "unavailable" in row:
+            print(f"{backend:<9} unavailable: {row['unavailable']}")
+            continue
+        print(
+            f"{backend:<9} {row['accuracy']:>6.3f} {row['macro_f1']:>8.3f} {row['fit_s']:>7.2f} "
+            f"{row['single_ms']:>9.3f} {row['batch_ms_per_message']:>9.4f} "
+            f"{row['startup_s']:>8.2f} {row['peak_rss_mb']:>7.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
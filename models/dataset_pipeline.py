@@ -0,0 +1,212 @@
+"""Chunked, multi-process runner for the SMS dataset cleaning pipeline.
+
+Chains the steps of ``cleaner.py`` (clean, dedup, filter) and
+``reclassification.py`` (reclassify "Other") over one input file:
+
+    python dataset_pipeline.py [--input datasets/Extracted_SMS_Labeled.xlsx]
+                               [--output datasets/SMS_Categorized_Cleaned_Final_Reclassified.xlsx]
+                               [--stages clean dedup reclassify] [--chunk-size 100000] [--workers 4]
+
+An ``.xlsx`` input is converted once to a columnar intermediate under
+``.cache/pipeline`` (Parquet when pyarrow is installed, otherwise CSV read
+back with ``memory_map=True``) and reused while it is newer than the
+workbook. Chunks of that file go to a process pool, where every row-local
+step runs as vectorized pandas string operations. The parent only drops
+duplicates (by a 64-bit hash of the SMS, first occurrence wins, as
+``drop_duplicates`` does) and appends each chunk to the output in input
+order. Row-local steps commute with dedup, so the result matches running
+the two scripts one after the other.
+"""
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
+# === CONFIGURATION ===
+INPUT_FILE = "datasets/Extracted_SMS_Labeled.xlsx"
+OUTPUT_FILE = "datasets/SMS_Categorized_Cleaned_Final_Reclassified.xlsx"
+INTERMEDIATE_DIR = ".cache/pipeline"
+STAGES = ("clean", "dedup", "reclassify")
+CHUNK_SIZE = 100_000
+XLSX_MAX_ROWS = 1_048_575
+
+
+# === STAGES ===
+def clean(df):
+    """cleaner.py steps 1-4: drop blanks, lowercase SMS, title-case Category."""
+    df = df[[df.columns[0], "Category"]].dropna()
+    df.columns = ["SMS", "Category"]
+    return pd.DataFrame({
+        "SMS": df["SMS"].astype(str).str.strip().str.lower(),
+        "Category": df["Category"].astype(str).str.strip().str.title(),
+    })
+
+
+def keep_mask(df):
+    """cleaner.py steps 6-7: drop very short messages and "Unknown" labels."""
+    return (df["SMS"].str.len() > 10) & (df["Category"] != "Unknown")
+
+
+def reclassify(df):
+    """reclassification.py: new categories for "Other" rows, first matching rule wins."""
+    category = df["Category"].astype(str).str.strip().str.title()
+    other = category == "Other"
+    text = df.loc[other, "SMS"].astype(str).str.lower()
+    has = lambda word: text.str.contains(word, regex=False)
+    cheque = has("cheque") | has("chq")
+    rules = [
+        (cheque & has("deposited"), "Cheque Deposit"),
+        (cheque & has("cleared"), "Cheque Clearance"),
+        (cheque, "Cheque"),
+        (has("trx") & has("card"), "Card Transaction"),
+        (has("payment of") | has("bill"), "Bill Payment"),
+        (has("aed") & has("debited"), "International Debit"),
+        (has("upi"), "Upi Transaction"),
+    ]
+    category[other] = np.select([mask for mask, _ in rules], [name for _, name in rules], default="Other")
+    return category
+
+
+def process_chunk(df, stages):
+    """Runs every row-local stage on one chunk (in a worker process)."""
+    if "clean" in stages:
+        df = clean(df)
+        keep = keep_mask(df).to_numpy()
+    else:
+        keep = np.ones(len(df), dtype=bool)
+    if "reclassify" in stages:
+        df = df.assign(Category=reclassify(df))
+    return df.reset_index(drop=True), keep
+
+
+# === I/O ===
+def to_intermediate(path):
+    """A columnar copy of an .xlsx input, rebuilt only when the workbook is newer."""
+    if not path.endswith(".xlsx"):
+        return path
+    ext = ".parquet" if pyarrow else ".csv"
+    target = os.path.join(INTERMEDIATE_DIR, os.path.basename(path)[: -len(".xlsx")] + ext)
+    if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(path):
+        print(f"📦 Converting {path} -> {target}")
+        os.makedirs(INTERMEDIATE_DIR, exist_ok=True)
+        df = pd.read_excel(path, dtype=str)
+        if ext == ".parquet":
+            df.to_parquet(target, index=False)
+        else:
+            df.to_csv(target, index=False)
+    return target
+
+
+def read_chunks(path, chunk_size):
+    if path.endswith(".parquet"):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        # Only empty cells are missing, as in the workbook ("NA" is an SMS).
+        yield from pd.read_csv(
+            path, chunksize=chunk_size, dtype=str, keep_default_na=False, na_values=[""], memory_map=True
+        )
+
+
+class ChunkWriter:
+    """Appends chunks to a .parquet or .csv file; .xlsx is written once at the end."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._parquet = None
+        self._frames = []
+        if path.endswith(".parquet") and pyarrow is None:
+            raise SystemExit("Writing Parquet needs pyarrow; use a .csv or .xlsx output.")
+
+    def write(self, df):
+        if self.path.endswith(".xlsx"):
+            self._frames.append(df)
+        elif self.path.endswith(".parquet"):
+            table = pyarrow.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self.path.endswith(".xlsx"):
+            if self.rows > XLSX_MAX_ROWS:
+                raise SystemExit(f"{self.rows} rows do not fit in a workbook; use a .parquet or .csv output.")
+            df = pd.concat(self._frames, ignore_index=True) if self._frames else pd.DataFrame(columns=["SMS", "Category"])
+            df.to_excel(self.path, index=False)
+
+
+# === RUNNER ===
+def bounded_map(pool, fn, items, limit, *args):
+    """Like ``pool.map`` (results in order) but reads ``items`` lazily, ``limit`` at a time."""
+    if pool is None:
+        yield from (fn(item, *args) for item in items)
+        return
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item, *args))
+        if len(pending) >= limit:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run(input_path, output_path, stages, chunk_size, workers):
+    source = to_intermediate(input_path)
+    writer = ChunkWriter(output_path)
+    seen = set()
+    rows_in = 0
+    start = time.perf_counter()
+    # One worker: process in place rather than pickling every chunk to a child.
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for df, keep in bounded_map(pool, process_chunk, read_chunks(source, chunk_size), 2 * workers, stages):
+            rows_in += len(keep)
+            if "dedup" in stages:
+                # hash() is only stable within one process, so dedup stays here.
+                first = np.ones(len(df), dtype=bool)
+                for i, sms in enumerate(df["SMS"].tolist()):
+                    h = hash(sms)
+                    if h in seen:
+                        first[i] = False
+                    else:
+                        seen.add(h)
+                keep = keep & first
+            writer.write(df[keep])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"✅ Saved {writer.rows} of {rows_in} rows to {output_path} in {elapsed:.1f}s "
+          f"({rows_in / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    run(args.input, args.output, set(args.stages), args.chunk_size, args.workers)
+
+
+if __name__ == "__main__":
+    main()
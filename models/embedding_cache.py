@@ -0,0 +1,129 @@
+"""On-disk content-hash -> vector cache shared by the training scripts.
+
+Each namespace (one per model: ``all-MiniLM-L6-v2`` embeddings, the zero-shot
+label scores of ``labeler.py``) is a directory holding:
+
+- ``vectors.f32``: float32 rows, appended and read back as a memory map;
+- ``index.txt``: one content hash per line, line i naming row i;
+- ``meta.json``: the vector width, checked on open.
+
+``encode`` normalizes and deduplicates texts, looks every distinct text up,
+sends only the misses to the model in batches and appends them. Re-running
+a script after a label fix re-encodes nothing.
+"""
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+from tqdm import tqdm
+
+# === CONFIGURATION ===
+CACHE_DIR = ".cache/embeddings"
+BATCH_SIZE = 256
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class EmbeddingCache:
+    def __init__(self, namespace, dim, lowercase=False, cache_dir=CACHE_DIR):
+        """``lowercase`` folds case before hashing; only for uncased models."""
+        self.dir = os.path.join(cache_dir, namespace)
+        self.dim = dim
+        self.lowercase = lowercase
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.index_path = os.path.join(self.dir, "index.txt")
+        os.makedirs(self.dir, exist_ok=True)
+
+        meta_path = os.path.join(self.dir, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta["dim"] != dim:
+                raise ValueError(f"{self.dir} holds {meta['dim']}-d vectors, not {dim}-d")
+        else:
+            with open(meta_path, "w") as f:
+                json.dump({"dim": dim, "dtype": "float32"}, f)
+
+        keys = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                keys = f.read().split()
+        # A run killed mid-append may leave a partial row or unindexed rows.
+        rows = os.path.getsize(self.vectors_path) // (4 * dim) if os.path.exists(self.vectors_path) else 0
+        keys = keys[:rows]
+        self.index = {key: row for row, key in enumerate(keys)}
+        self._truncate(len(keys))
+        # Texts ``encode`` found in the cache, and distinct texts it had to encode.
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.index)
+
+    def _truncate(self, rows):
+        """Drops anything past the last complete, indexed row."""
+        if os.path.exists(self.vectors_path) and os.path.getsize(self.vectors_path) != rows * 4 * self.dim:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(rows * 4 * self.dim)
+        with open(self.index_path, "w") as f:
+            f.write("".join(key + "\n" for key in self.index))
+
+    def key(self, text):
+        text = _WHITESPACE.sub(" ", text).strip()
+        if self.lowercase:
+            text = text.lower()
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def vectors(self):
+        """All cached rows as a read-only memory map."""
+        if not self.index:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self.index), self.dim))
+
+    def append(self, keys, vectors):
+        """Stores new rows; rows containing NaN (failed encodes) are skipped."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        keep = [i for i, key in enumerate(keys) if key not in self.index and np.isfinite(vectors[i]).all()]
+        if not keep:
+            return
+        # Vectors first: a crash before the index is written only leaves rows the next open drops.
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors[keep]).tobytes())
+        with open(self.index_path, "a") as f:
+            for i in keep:
+                self.index[keys[i]] = len(self.index)
+                f.write(keys[i] + "\n")
+
+    def missing(self, texts):
+        """Distinct uncached texts as ``{key: text}``, first occurrence kept, in order."""
+        misses = {}
+        for text in texts:
+            key = self.key(text)
+            if key not in self.index:
+                misses.setdefault(key, text)
+        return misses
+
+    def lookup(self, texts):
+        """Cached vectors for ``texts`` in order; NaN rows for texts not in the cache."""
+        rows = np.array([self.index.get(self.key(text), -1) for text in texts], dtype=np.int64)
+        out = np.full((len(texts), self.dim), np.nan, dtype=np.float32)
+        hit = rows >= 0
+        out[hit] = self.vectors()[rows[hit]]
+        return out
+
+    def encode(self, texts, encode_fn, batch_size=BATCH_SIZE):
+        """Vectors for ``texts`` in order; ``encode_fn(list_of_texts) -> (n, dim) array`` runs on misses only.
+
+        Rows ``encode_fn`` returns as NaN (failures) come back as NaN.
+        """
+        misses = self.missing(texts)
+        print(f"🗃️  {len(texts)} texts, {len(misses)} distinct ones not cached yet")
+        self.hits += sum(self.key(text) in self.index for text in texts)
+        self.misses += len(misses)
+        keys = list(misses)
+        for start in tqdm(range(0, len(keys), batch_size), disable=not keys):
+            batch = keys[start:start + batch_size]
+            self.append(batch, encode_fn([misses[key] for key in batch]))
+        return self.lookup(texts)
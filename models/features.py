@@ -0,0 +1,75 @@
+"""Feature backends for the SMS category classifier.
+
+``minilm`` encodes messages with the all-MiniLM-L6-v2 sentence-transformer
+(torch, ~90 MB of weights); the classifier is saved on its own and the API
+loads the same embedder to serve it. ``hashing`` and ``tfidf`` are sparse
+word n-gram features from scikit-learn; the classifier is saved as a
+``Pipeline`` with its vectorizer, so the API scores raw text without torch.
+"""
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+
+from embedding_cache import CACHE_DIR, EmbeddingCache
+
+# === CONFIGURATION ===
+FEATURE_BACKENDS = ("minilm", "hashing", "tfidf")
+EMBEDDER_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+HASHING_FEATURES = 2 ** 14
+TRAINING_FILE = "datasets/SMS_Categorized_Expanded_Final.xlsx"
+
+
+def load_training_data(path=TRAINING_FILE):
+    """(texts, categories) with categorization.py's cleaning: title-cased labels, classes of 6+ rows."""
+    df = pd.read_excel(path)
+    df = df[["SMS", "Category"]].dropna()
+    df["Category"] = df["Category"].astype(str).str.strip().str.title()
+    counts = df["Category"].value_counts()
+    df = df[df["Category"].isin(counts[counts >= 6].index)]
+    return df["SMS"].astype(str).tolist(), df["Category"].astype(str).tolist()
+
+
+def build_vectorizer(backend: str):
+    """Unfitted vectorizer for a sparse backend."""
+    if backend == "hashing":
+        return HashingVectorizer(
+            n_features=HASHING_FEATURES, ngram_range=(1, 2), alternate_sign=False, norm="l2"
+        )
+    if backend == "tfidf":
+        return TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=2)
+    raise ValueError(f"{backend!r} is not a sparse backend")
+
+
+def load_embedder():
+    """The MiniLM sentence-transformer; imported lazily so sparse backends skip torch."""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(EMBEDDER_NAME)
+
+
+def embedding_cache(cache_dir=CACHE_DIR):
+    """The on-disk cache of MiniLM embeddings."""
+    # MiniLM's tokenizer is uncased, so case variants share one cache entry.
+    return EmbeddingCache(EMBEDDER_NAME, EMBEDDING_DIM, lowercase=True, cache_dir=cache_dir)
+
+
+def embed(texts, cache=None):
+    """MiniLM embeddings via the on-disk cache; the model loads only if some text is new."""
+    if cache is None:
+        cache = embedding_cache()
+    embedder = None
+
+    def encode(batch):
+        nonlocal embedder
+        if embedder is None:
+            embedder = load_embedder()
+        return embedder.encode(batch)
+
+    return cache.encode(texts, encode)
+
+
+def artifact_paths(backend: str):
+    """(model, encoder) paths; MiniLM keeps the original names the API ships with."""
+    if backend == "minilm":
+        return "models/category_classifier.pkl", "models/label_encoder.pkl"
+    return f"models/category_classifier_{backend}.pkl", f"models/label_encoder_{backend}.pkl"
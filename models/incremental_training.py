@@ -0,0 +1,252 @@
+"""Incrementally updates the API's category classifier with newly ingested SMS.
+
+The first run bootstraps an ``SGDClassifier(loss="log_loss")`` on the
+training workbook. Every later run reads only the rows added since the last
+checkpoint, either ``sms_records`` rows past the last seen id or rows
+appended to a CSV export, and updates the model with ``partial_fit``.
+SERIAL ids are handed out at insert time, not at commit, so a row can
+become visible after a higher id was read; each run re-reads the
+``ID_LAG`` ids below the checkpoint and skips the ones already trained.
+Features come from the embedding cache (``minilm``) or the stateless hashing
+vectorizer, so old rows are never encoded again and a run costs in
+proportion to the new rows. A sample of the bootstrap rows (``--replay``,
+relative to the new rows) is mixed into each update so categories missing
+from recent traffic do not fade.
+
+The label space is the API's label encoder, which this script never
+rewrites. Categories the encoder does not know are skipped and need a full
+``categorization.py`` run. The updated classifier is written next to the
+API's artifact and moved over it with ``os.replace``. A process loading it
+sees the old file or the new one, never a partial write, and workers that
+memory-mapped the old file keep reading it until they restart.
+
+    python incremental_training.py [--source db|csv] [--csv export.csv]
+                                   [--backend minilm|hashing] [--replay 1.0]
+"""
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import psycopg2
+import scipy.sparse as sp
+from dotenv import load_dotenv
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from features import build_vectorizer, embed, load_training_data
+
+# === CONFIGURATION ===
+API_MODEL_PATH = "../backend/models/category_classifier.pkl"
+API_ENCODER_PATH = "../backend/models/label_encoder.pkl"
+STATE_DIR = "models/incremental"
+FETCH_SIZE = 5000
+BOOTSTRAP_EPOCHS = 5
+INCREMENTAL_BACKENDS = ("minilm", "hashing")  # TF-IDF needs a refit vocabulary
+ID_LAG = 10_000  # sms_records ids re-read below the checkpoint
+
+
+# === FEATURES ===
+def featurize(texts, backend):
+    if backend == "minilm":
+        return embed(texts)
+    return build_vectorizer(backend).transform(texts)
+
+
+def stack(a, b):
+    return sp.vstack([a, b]).tocsr() if sp.issparse(a) else np.vstack([a, b])
+
+
+def encode_labels(categories, encoder):
+    """(known mask, encoded labels for the known rows) using the API's encoder."""
+    categories = pd.Series(categories, dtype=str).str.strip().str.title()
+    known = categories.isin(encoder.classes_).to_numpy()
+    return known, encoder.transform(categories[known])
+
+
+# === STATE ===
+class Trainer:
+    """The SGD model plus its checkpoint, stored per feature backend under STATE_DIR."""
+
+    def __init__(self, backend, encoder, epochs, replay, seed=42):
+        self.backend = backend
+        self.encoder = encoder
+        self.classes = np.arange(len(encoder.classes_))
+        self.epochs = epochs
+        self.replay = replay
+        self.rng = np.random.default_rng(seed)
+        self.dir = os.path.join(STATE_DIR, backend)
+        self.model_path = os.path.join(self.dir, "sgd.pkl")
+        self.checkpoint_path = os.path.join(self.dir, "checkpoint.json")
+        self.replay_path = os.path.join(self.dir, "replay.csv")
+        os.makedirs(self.dir, exist_ok=True)
+
+        if os.path.exists(self.model_path):
+            self.clf = joblib.load(self.model_path)
+            with open(self.checkpoint_path) as f:
+                self.checkpoint = json.load(f)
+            self.replay_set = pd.read_csv(self.replay_path, keep_default_na=False)
+        else:
+            self.clf = SGDClassifier(loss="log_loss", random_state=seed)
+            self.checkpoint = {"db_last_id": 0, "db_recent_ids": [], "csv_rows": {}, "trained_rows": 0}
+            self.bootstrap()
+
+    def bootstrap(self):
+        texts, categories = load_training_data()
+        known, y = encode_labels(categories, self.encoder)
+        texts = [t for t, k in zip(texts, known) if k]
+        print(f"🧱 Bootstrapping on {len(texts)} training rows ({self.backend} features)")
+        X = featurize(texts, self.backend)
+        for _ in range(BOOTSTRAP_EPOCHS):
+            order = self.rng.permutation(len(y))
+            self.clf.partial_fit(X[order], y[order], classes=self.classes)
+        pd.DataFrame({"sms": texts, "label": y}).to_csv(self.replay_path, index=False)
+        self.replay_set = pd.read_csv(self.replay_path, keep_default_na=False)
+        self.checkpoint["trained_rows"] = len(y)
+        self.save()
+
+    def update(self, texts, categories):
+        """One partial_fit pass (per epoch) over new rows plus a replay sample.
+
+        Returns (rows used, rows skipped, accuracy on the new rows before the update).
+        """
+        known, y = encode_labels(categories, self.encoder)
+        texts = [t for t, k in zip(texts, known) if k]
+        if not texts:
+            return 0, int((~known).sum()), None
+        X = featurize(texts, self.backend)
+        accuracy = float(self.clf.score(X, y))
+
+        n_replay = min(int(self.replay * len(y)), len(self.replay_set))
+        if n_replay:
+            sample = self.replay_set.sample(n_replay, random_state=int(self.rng.integers(2 ** 31)))
+            X = stack(X, featurize(sample["sms"].astype(str).tolist(), self.backend))
+            y = np.concatenate([y, sample["label"].to_numpy()])
+        for _ in range(self.epochs):
+            order = self.rng.permutation(len(y))
+            self.clf.partial_fit(X[order], y[order], classes=self.classes)
+        self.checkpoint["trained_rows"] += len(texts)
+        return len(texts), int((~known).sum()), accuracy
+
+    def save(self):
+        """Writes the model, then the checkpoint that points past the rows it has seen."""
+        atomic_dump(self.clf, self.model_path)
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.checkpoint, f, indent=2)
+        os.replace(tmp, self.checkpoint_path)
+
+    def artifact(self):
+        """What the API loads: the bare classifier, or a Pipeline that featurizes raw text."""
+        if self.backend == "minilm":
+            return self.clf
+        return Pipeline([("features", build_vectorizer(self.backend)), ("clf", self.clf)])
+
+
+def atomic_dump(obj, path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(obj, tmp)
+    os.replace(tmp, path)
+
+
+# === SOURCES ===
+def db_batches(last_id, seen):
+    """Yields (ids, texts, categories) for categorized sms_records rows past ``last_id`` not in ``seen``."""
+    load_dotenv()
+    conn = psycopg2.connect(
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT", "5432"),
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+    )
+    try:
+        with conn.cursor(name="incremental_training") as cur:
+            cur.itersize = FETCH_SIZE
+            cur.execute(
+                "SELECT id, sms, category FROM sms_records WHERE id > %s AND category IS NOT NULL ORDER BY id",
+                (last_id,),
+            )
+            while True:
+                rows = cur.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                rows = [r for r in rows if r[0] not in seen]
+                if rows:
+                    yield [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows]
+    finally:
+        conn.close()
+
+
+def advance_db_checkpoint(checkpoint, ids):
+    """Moves the checkpoint past ``ids``, keeping the ids within ``ID_LAG`` of it."""
+    last_id = max(checkpoint["db_last_id"], *ids)
+    recent = set(checkpoint["db_recent_ids"]).union(ids)
+    checkpoint["db_last_id"] = last_id
+    checkpoint["db_recent_ids"] = sorted(i for i in recent if i > last_id - ID_LAG)
+
+
+def csv_batches(path, offset):
+    """Yields (rows consumed so far, texts, categories) for rows past ``offset`` of an export."""
+    reader = pd.read_csv(
+        path, usecols=["sms", "category"], skiprows=range(1, offset + 1),
+        chunksize=FETCH_SIZE, dtype=str, keep_default_na=False, na_values=[""],
+    )
+    for chunk in reader:
+        offset += len(chunk)
+        chunk = chunk.dropna()
+        yield offset, chunk["sms"].tolist(), chunk["category"].tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", choices=("db", "csv"), default="db")
+    parser.add_argument("--csv", help="sms_records export with sms and category columns (--source csv)")
+    parser.add_argument("--backend", choices=INCREMENTAL_BACKENDS, default="minilm")
+    parser.add_argument("--epochs", type=int, default=1, help="partial_fit passes per batch")
+    parser.add_argument("--replay", type=float, default=1.0, help="bootstrap rows mixed in per new row")
+    parser.add_argument("--output", default=API_MODEL_PATH)
+    args = parser.parse_args()
+    if args.source == "csv" and not args.csv:
+        parser.error("--source csv needs --csv")
+
+    start = time.perf_counter()
+    trainer = Trainer(args.backend, joblib.load(API_ENCODER_PATH), args.epochs, args.replay)
+    checkpoint = trainer.checkpoint
+    if args.source == "db":
+        if "db_recent_ids" in checkpoint:
+            batches = db_batches(checkpoint["db_last_id"] - ID_LAG, set(checkpoint["db_recent_ids"]))
+        else:
+            # Checkpoint from before the re-read window: start it at the last id.
+            checkpoint["db_recent_ids"] = []
+            batches = db_batches(checkpoint["db_last_id"], set())
+    else:
+        csv_key = os.path.abspath(args.csv)
+        batches = csv_batches(args.csv, checkpoint["csv_rows"].get(csv_key, 0))
+
+    used = skipped = 0
+    for position, texts, categories in batches:
+        n, n_skipped, accuracy = trainer.update(texts, categories)
+        used += n
+        skipped += n_skipped
+        if args.source == "db":
+            advance_db_checkpoint(checkpoint, position)
+        else:
+            checkpoint["csv_rows"][csv_key] = position
+        # Checkpoint per batch: a crash resumes after the last saved batch.
+        trainer.save()
+        if accuracy is not None:
+            print(f"• {n} new rows, accuracy before update {accuracy:.3f}")
+
+    atomic_dump(trainer.artifact(), args.output)
+    print(
+        f"✅ {used} new rows trained ({skipped} with unknown categories skipped) in "
+        f"{time.perf_counter() - start:.1f}s; {checkpoint['trained_rows']} rows total. Saved {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,31 @@
+"""Labels SMS with a zero-shot classifier (BART-MNLI) over the spending categories.
+
+Identical messages are scored once. Scores go to the on-disk embedding
+cache one chunk at a time, so that cache doubles as the checkpoint: a
+crashed or interrupted run picks up where it stopped, and reruns only score
+new messages. ``--workers N`` scores chunks in N processes, each running
+torch on its share of the CPU threads. Progress shows messages/sec and ETA.
+
+    python labeler.py [--limit 10] [--workers 4] [--batch-size 16]
+"""
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
 import pandas as pd
-from transformers import pipeline
 from tqdm import tqdm
 
+from embedding_cache import EmbeddingCache
+
 # === CONFIGURATION ===
 INPUT_FILE = "datasets/Extracted_SMS.xlsx"           # Input Excel file
 OUTPUT_FILE = "datasets/labeled_SMS_free.xlsx"       # Output Excel file
+ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
+BATCH_SIZE = 16                                      # Messages per forward pass
+CHUNK_SIZE = 128                                     # Messages scored between checkpoints
 
 # === SPENDING CATEGORY LABELS (NO MODE, JUST PURPOSE) ===
 labels = [
@@ -28,30 +49,122 @@ labels = [
     "Other"
 ]
 
-# === LOAD FIRST 10 SMS FROM FILE ===
-df = pd.read_excel(INPUT_FILE)
-sms_col = df.columns[0]
-df = df.dropna(subset=[sms_col]).reset_index(drop=True)  # Remove blank rows
-df = df.iloc[:10]  # ⬅️ Only use first 10 for testing
-sms_list = df[sms_col].astype(str).tolist()
-
-# === LOAD HUGGING FACE ZERO-SHOT CLASSIFIER ===
-print("🔍 Loading Hugging Face zero-shot classification model...")
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-
-# === LABEL EACH SMS ===
-predicted_labels = []
-print("🏷️  Predicting categories for each SMS...")
-for sms in tqdm(sms_list):
+# === ZERO-SHOT SCORING ===
+classifier = None
+batch_size = BATCH_SIZE
+
+
+def init_worker(threads, forward_batch):
+    """Per-process setup: torch thread count and forward-pass batch size."""
+    global batch_size
+    import torch
+
+    torch.set_num_threads(threads)
+    batch_size = forward_batch
+
+
+def classify(batch):
+    """Zero-shot results for a list of messages, loading the model on first use."""
+    global classifier
+    if classifier is None:
+        from transformers import pipeline
+
+        print(f"🔍 Loading Hugging Face zero-shot classification model (pid {os.getpid()})...")
+        classifier = pipeline("zero-shot-classification", model=ZERO_SHOT_MODEL)
+    results = classifier(batch, labels, multi_label=False, batch_size=batch_size)
+    return [results] if isinstance(results, dict) else results
+
+
+def zero_shot_scores(batch):
+    """One row of scores per message, columns in ``labels`` order; NaN if it failed."""
+    scores = np.full((len(batch), len(labels)), np.nan, dtype=np.float32)
     try:
-        result = classifier(sms, labels, multi_label=False)
-        category = result['labels'][0]
+        results = classify(batch)
     except Exception as e:
         print("❌ Error:", e)
-        category = "Unknown"
-    predicted_labels.append(category)
+        # Retry one by one so a single bad message doesn't sink its batch.
+        results = []
+        for sms in batch:
+            try:
+                results.append(classify([sms])[0])
+            except Exception as e:
+                print("❌ Error:", e)
+                results.append(None)
+    for row, result in zip(scores, results):
+        if result is not None:
+            row[[labels.index(label) for label in result["labels"]]] = result["scores"]
+    return scores
+
+
+def score_chunks(chunks, workers, threads, forward_batch):
+    """Yields ``(keys, scores)`` for each ``(keys, texts)`` chunk as it finishes.
+
+    Runs in this process, or across ``workers`` processes in completion order.
+    """
+    if workers <= 1:
+        init_worker(threads, forward_batch)
+        for keys, texts in chunks:
+            yield keys, zero_shot_scores(texts)
+        return
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(threads, forward_batch)) as pool:
+        futures = {pool.submit(zero_shot_scores, texts): keys for keys, texts in chunks}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--limit", type=int, help="only label the first N messages")
+    parser.add_argument("--workers", type=int, default=1, help="scoring processes")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="messages per forward pass")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="messages per checkpoint")
+    args = parser.parse_args()
+
+    # === LOAD SMS FROM FILE ===
+    df = pd.read_excel(args.input)
+    sms_col = df.columns[0]
+    df = df.dropna(subset=[sms_col]).reset_index(drop=True)  # Remove blank rows
+    if args.limit:
+        df = df.iloc[:args.limit]
+    sms_list = df[sms_col].astype(str).tolist()
+
+    # === LABEL EACH SMS ===
+    # Scores are cached per message and label set; failed messages are not
+    # cached, so the next run retries them.
+    label_set = hashlib.sha1("|".join(labels).encode("utf-8")).hexdigest()[:8]
+    cache = EmbeddingCache(f"{ZERO_SHOT_MODEL.split('/')[-1]}-{label_set}", len(labels))
+    todo = cache.missing(sms_list)
+    print(f"🏷️  {len(sms_list)} messages, {len(todo)} distinct ones still to score")
+
+    keys = list(todo)
+    chunks = [
+        (keys[i:i + args.chunk_size], [todo[key] for key in keys[i:i + args.chunk_size]])
+        for i in range(0, len(keys), args.chunk_size)
+    ]
+    threads = max(1, (os.cpu_count() or 1) // max(1, args.workers))
+    start = time.perf_counter()
+    # tqdm shows messages/sec and the ETA; each finished chunk is a checkpoint.
+    with tqdm(total=len(keys), unit="msg", desc="Scoring") as progress:
+        for chunk_keys, scores in score_chunks(chunks, args.workers, threads, args.batch_size):
+            cache.append(chunk_keys, scores)
+            progress.update(len(chunk_keys))
+    if keys:
+        elapsed = time.perf_counter() - start
+        print(f"⏱️  Scored {len(keys)} messages in {elapsed:.1f}s ({len(keys) / elapsed:.2f} msg/s)")
+
+    scores = cache.lookup(sms_list)
+    scored = np.isfinite(scores).all(axis=1)
+    predicted_labels = [
+        labels[i] if ok else "Unknown" for i, ok in zip(np.nan_to_num(scores, nan=-1).argmax(axis=1), scored)
+    ]
+
+    # === ASSIGN & SAVE LABELED OUTPUT ===
+    df["category"] = predicted_labels
+    df.to_excel(args.output, index=False)
+    print(f"✅ Labeled SMS data saved to: {args.output}")
+
 
-# === ASSIGN & SAVE LABELED OUTPUT ===
-df["category"] = predicted_labels
-df.to_excel(OUTPUT_FILE, index=False)
-print(f"✅ Labeled SMS data saved to: {OUTPUT_FILE}")
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import pandas as pd
 
+from dataset_pipeline import reclassify
+
 # === Load Your Cleaned Dataset ===
 INPUT_FILE = "datasets/SMS_Categorized_Cleaned_Final.xlsx"
 df = pd.read_excel(INPUT_FILE)
@@ -7,35 +9,9 @@ df = pd.read_excel(INPUT_FILE)
 # === Normalize Categories ===
 df["Category"] = df["Category"].astype(str).str.strip().str.title()
 
-# === Define NLP-Enhanced Reclassification Function ===
-def reclassify_other(sms):
-    text = sms.lower()
-    
-    if "cheque" in text or "chq" in text:
-        if "deposited" in text:
-            return "Cheque Deposit"
-        elif "cleared" in text:
-            return "Cheque Clearance"
-        else:
-            return "Cheque"
-    
-    if "trx" in text and "card" in text:
-        return "Card Transaction"
-    
-    if "payment of" in text or "bill" in text:
-        return "Bill Payment"
-    
-    if "aed" in text and "debited" in text:
-        return "International Debit"
-    
-    if "upi" in text:
-        return "Upi Transaction"
-    
-    return "Other"
-
-# === Apply Only to 'Other' Category ===
-mask_other = df["Category"] == "Other"
-df.loc[mask_other, "Category"] = df.loc[mask_other, "SMS"].apply(reclassify_other)
+# === Reclassify Only the 'Other' Category ===
+# Vectorized keyword rules shared with dataset_pipeline.py.
+df["Category"] = reclassify(df)
 
 # === Save Updated File ===
 OUTPUT_FILE = "SMS_Categorized_Cleaned_Final_Reclassified.xlsx"